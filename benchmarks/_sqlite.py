@@ -0,0 +1,47 @@
+"""Shared helpers for benchmarks: an in-memory SQLite stand-in for the three MySQL schemas."""
+import time
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.dialects.mysql import TINYINT
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from models.users_alma_models import Base as BaseUsersAlma
+from models.vanity_hr_models import Base as BaseVanityHr
+from models.vanity_attendance_models import Base as BaseVanityAttendance
+
+SCHEMAS = ("USERS_ALMA", "vanity_hr", "vanity_attendance")
+
+
+@compiles(TINYINT, "sqlite")
+def _tinyint_sqlite(_type, _compiler, **_kw):
+    return "INTEGER"
+
+
+def sqlite_engine(latency: float = 0.0, path: str = ":memory:"):
+    """SQLite engine with each MySQL schema ATTACHed; `latency` adds a fake round-trip per query."""
+    engine = create_engine(
+        "sqlite://" if path == ":memory:" else f"sqlite:///{path}",
+        poolclass=StaticPool,
+        connect_args={"check_same_thread": False},
+    )
+
+    @event.listens_for(engine, "connect")
+    def _attach(dbapi_conn, _record):
+        for schema in SCHEMAS:
+            target = ":memory:" if path == ":memory:" else f"{path}.{schema}"
+            dbapi_conn.execute(f"ATTACH DATABASE '{target}' AS {schema}")
+
+    if latency:
+        @event.listens_for(engine, "before_cursor_execute")
+        def _delay(*_args):
+            time.sleep(latency)
+
+    for base in (BaseUsersAlma, BaseVanityHr, BaseVanityAttendance):
+        base.metadata.create_all(engine)
+    return engine
+
+
+def sqlite_sessionmaker(engine):
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -0,0 +1,134 @@
+"""
+Attendance analytics over a synthetic year: modules.attendance_analytics on --rows
+asistencia_registros (SQLite file), plus the compute step done row by row in Python
+(dict join on numero_empleado + weekday) as the baseline.
+
+Reports load / compute / write seconds for a first run (every row written) and a
+second run over the same data (nothing changed, nothing written).
+
+    python -m benchmarks.attendance_analytics --rows 1000000
+"""
+import argparse
+import math
+import os
+import random
+import tempfile
+import time
+from datetime import date, time as time_cls, timedelta
+
+
+def _seed(rows: int, sucursales: int):
+    from sqlalchemy import insert
+
+    from models.vanity_attendance_models import AsistenciaRegistros
+    from models.vanity_hr_models import DataEmpleadas, HorarioEmpleadas
+    from modules import database
+    from modules.attendance_analytics import WEEKDAYS
+
+    rng = random.Random(7)
+    start = date(2025, 1, 1)
+    days = [start + timedelta(days=i) for i in range(365)]
+    worked = [d for d in days if d.weekday() < 6]
+    socias = math.ceil(rows / len(worked))
+
+    session = database.SessionVanityHr()
+    session.execute(insert(DataEmpleadas.__table__), [
+        {"numero_empleado": f"E{i:05d}", "sucursal": f"sucursal_{i % sucursales}",
+         "estatus": "activo", "fecha_ingreso": date(2024, 1, 1)}
+        for i in range(socias)
+    ])
+    session.execute(insert(HorarioEmpleadas.__table__), [
+        {"numero_empleado": f"E{i:05d}", "dia_semana": WEEKDAYS[d],
+         "hora_entrada_teorica": time_cls(9 + i % 3), "hora_salida_teorica": time_cls(18 if d < 5 else 14)}
+        for i in range(socias) for d in range(6)
+    ])
+    session.commit()
+
+    batch, written = [], 0
+    for i in range(socias):
+        for day in worked:
+            if written >= rows:
+                break
+            falta = rng.random() < 0.03
+            entrada = 9 * 60 + (i % 3) * 60 + rng.randint(-10, 25)
+            salida = (18 if day.weekday() < 5 else 14) * 60 + rng.randint(-15, 45)
+            batch.append({
+                "numero_empleado": f"E{i:05d}", "fecha": day,
+                "hora_entrada_real": None if falta else time_cls(entrada // 60, entrada % 60),
+                "hora_salida_real": None if falta else time_cls(salida // 60, salida % 60),
+                "sucursal_registro": f"sucursal_{i % sucursales}",
+            })
+            written += 1
+            if len(batch) == 50_000:
+                session.execute(insert(AsistenciaRegistros.__table__), batch)
+                batch.clear()
+    if batch:
+        session.execute(insert(AsistenciaRegistros.__table__), batch)
+    session.commit()
+    session.close()
+    return socias, days[0], days[-1]
+
+
+def _python_compute(attendance, schedule):
+    """Baseline: the same computation one row at a time with a dict join."""
+    horario = {}
+    for numero, i in schedule.index.items():
+        for weekday in range(7):
+            if not math.isnan(schedule.entrada[i, weekday]):
+                horario[(i, weekday)] = (schedule.entrada[i, weekday], schedule.salida[i, weekday])
+    retrasos, extras = [], []
+    for empleada, dia, entrada, salida in zip(attendance.empleada.tolist(), attendance.dia.tolist(),
+                                              attendance.entrada.tolist(), attendance.salida.tolist()):
+        teorico = horario.get((empleada, (dia + 3) % 7))
+        if teorico is None or math.isnan(entrada):
+            retrasos.append(None)
+        else:
+            retrasos.append(max(0, math.floor(entrada - teorico[0])))
+        if teorico is None or math.isnan(salida):
+            extras.append(None)
+        else:
+            extras.append(max(0, math.floor(salida - teorico[1])))
+    return retrasos, extras
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--sucursales", type=int, default=12)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'attendance.sqlite3')}"
+        from modules import attendance_analytics as analytics
+        from modules import database
+
+        database.create_all_tables()
+        started = time.perf_counter()
+        socias, start, end = _seed(args.rows, args.sucursales)
+        print(f"seeded {args.rows} rows ({socias} socias, {args.sucursales} sucursales) "
+              f"in {time.perf_counter() - started:.1f}s")
+
+        for label in ("first run", "second run"):
+            stats = analytics.recompute_attendance(start, end)
+            print(f"{label:<11} load {stats['load_seconds']:6.2f}s  compute {stats['compute_seconds']:6.3f}s  "
+                  f"write {stats['write_seconds']:6.2f}s  updated {stats['updated']:>8}  "
+                  f"late {stats['late']}  overtime {stats['overtime']}  absences {stats['absences']}")
+
+        hr, att = database.SessionVanityHr(), database.SessionVanityAttendance()
+        schedule = analytics.load_schedule(hr)
+        attendance = analytics.load_attendance(att, schedule, analytics.ASISTENCIA.c.fecha.between(start, end))
+        hr.close()
+        att.close()
+        started = time.perf_counter()
+        analytics.compute(attendance, schedule, start, end)
+        vectorized = time.perf_counter() - started
+        started = time.perf_counter()
+        _python_compute(attendance, schedule)
+        python = time.perf_counter() - started
+        print(f"compute only: NumPy {vectorized * 1000:.1f} ms vs. Python loop {python * 1000:.1f} ms "
+              f"({python / vectorized:.0f}x)")
+        database.dispose_engines()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Full vs. incremental attendance recompute when --changed of the rows changed.
+
+Seeds --rows asistencia_registros (same synthetic year as benchmarks.attendance_analytics)
+and processes them once. Then half of the change budget arrives as new checadas and the
+other half as schedule changes of a few socias, invalidating their whole year through
+mark_attendance_dirty. The incremental run goes first; the full run afterwards (with
+rewrite, so it recomputes every row) must find nothing left to update.
+
+    python -m benchmarks.attendance_incremental --rows 1000000 --changed 0.01
+"""
+import argparse
+import os
+import tempfile
+import time
+from datetime import time as time_cls, timedelta
+
+from benchmarks.attendance_analytics import _seed
+
+
+def _report(label: str, stats: dict):
+    total = stats["load_seconds"] + stats["compute_seconds"] + stats["write_seconds"]
+    print(f"{label:<13} rows {stats['rows']:>8}  load {stats['load_seconds']:6.2f}s  "
+          f"compute {stats['compute_seconds']:6.3f}s  write {stats['write_seconds']:6.2f}s  "
+          f"total {total:6.2f}s  updated {stats['updated']:>7}")
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--changed", type=float, default=0.01)
+    parser.add_argument("--sucursales", type=int, default=12)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'attendance.sqlite3')}"
+        from sqlalchemy import insert, update
+
+        from models.vanity_attendance_models import AsistenciaRegistros
+        from models.vanity_hr_models import HorarioEmpleadas
+        from modules import attendance_analytics as analytics
+        from modules import database
+
+        database.create_all_tables()
+        socias, start, end = _seed(args.rows, args.sucursales)
+        _report("initial", analytics.recompute_incremental())
+
+        # La mitad del cambio: checadas nuevas en los días siguientes al rango
+        budget = int(args.rows * args.changed)
+        session = database.SessionVanityAttendance()
+        nuevas = [
+            {"numero_empleado": f"E{i % socias:05d}", "fecha": end + timedelta(days=1 + i // socias),
+             "hora_entrada_real": time_cls(9, 40), "hora_salida_real": time_cls(18, 30),
+             "sucursal_registro": f"sucursal_{i % socias % args.sucursales}"}
+            for i in range(budget // 2)
+        ]
+        session.execute(insert(AsistenciaRegistros.__table__), nuevas)
+        session.commit()
+        session.close()
+
+        # La otra mitad: cambio de horario de unas cuantas socias, invalidando todo su año
+        filas_por_socia = args.rows / socias
+        cambiadas = [f"E{i:05d}" for i in range(max(1, round(budget / 2 / filas_por_socia)))]
+        session = database.SessionVanityHr()
+        session.execute(update(HorarioEmpleadas).where(HorarioEmpleadas.numero_empleado.in_(cambiadas))
+                        .values(hora_entrada_teorica=time_cls(8, 30)))
+        session.commit()
+        session.close()
+        database.mark_attendance_dirty(cambiadas, start)
+        print(f"changed: {len(nuevas)} new rows + schedules of {len(cambiadas)} socias "
+              f"(~{round(len(cambiadas) * filas_por_socia)} rows)")
+
+        incremental = _report("incremental", analytics.recompute_incremental())
+        full_stats = analytics.recompute_attendance(start, nuevas[-1]["fecha"], rewrite=True)
+        full = _report("full", full_stats)
+        print(f"incremental is {full / incremental:.0f}x faster; rows the full run still had to fix: "
+              f"{full_stats['updated']} (0 = the incremental run caught every change)")
+        database.dispose_engines()
+
+
+if __name__ == "__main__":
+    main()
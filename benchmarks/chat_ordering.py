@@ -0,0 +1,99 @@
+"""
+Head-of-line blocking: sequential processing vs. ChatOrderedUpdateProcessor.
+
+--slow-chats users hit a handler that waits --slow-ms (the n8n webhook in
+finalizar), while --chats other users send quick messages. Reports p50/p99
+latency for the fast chats, total time, and checks that every chat's updates
+ran in arrival order.
+
+    python -m benchmarks.chat_ordering --chats 200 --messages 5 --slow-ms 2000
+"""
+import argparse
+import asyncio
+import random
+import time
+
+from telegram import Update
+from telegram.ext import SimpleUpdateProcessor
+
+from modules.update_processor import ChatOrderedUpdateProcessor
+
+
+def _update(update_id: int, chat_id: int) -> Update:
+    return Update.de_json(
+        {
+            "update_id": update_id,
+            "message": {
+                "message_id": update_id,
+                "date": 0,
+                "chat": {"id": chat_id, "type": "private"},
+                "from": {"id": chat_id, "is_bot": False, "first_name": "Socia"},
+                "text": "hola",
+            },
+        },
+        None,
+    )
+
+
+async def _run(processor, schedule, slow_chats, slow_s, fast_s, concurrent):
+    seen = {}
+    latencies = []
+
+    async def handle(update, chat_id, sent):
+        await asyncio.sleep(slow_s if chat_id in slow_chats else fast_s)
+        seen.setdefault(chat_id, []).append(update.update_id)
+        if chat_id not in slow_chats:
+            latencies.append(time.perf_counter() - sent)
+
+    start = time.perf_counter()
+    tasks = []
+    for update_id, chat_id in schedule:
+        update = _update(update_id, chat_id)
+        # Todo el lote llega junto en t0: la latencia incluye la espera en cola
+        coroutine = handle(update, chat_id, start)
+        if concurrent:
+            # Igual que Application: una tarea por update, creada en orden de llegada
+            tasks.append(asyncio.create_task(processor.process_update(update, coroutine)))
+        else:
+            await processor.process_update(update, coroutine)
+    await asyncio.gather(*tasks)
+    total = time.perf_counter() - start
+
+    ordered = all(ids == sorted(ids) for ids in seen.values())
+    latencies.sort()
+    return total, latencies[len(latencies) // 2], latencies[int(len(latencies) * 0.99) - 1], ordered
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--chats", type=int, default=200)
+    parser.add_argument("--slow-chats", type=int, default=3)
+    parser.add_argument("--messages", type=int, default=5, help="messages per chat")
+    parser.add_argument("--slow-ms", type=float, default=2000)
+    parser.add_argument("--fast-ms", type=float, default=5)
+    parser.add_argument("--concurrency", type=int, default=32)
+    args = parser.parse_args()
+
+    random.seed(3)
+    chats = list(range(1, args.chats + args.slow_chats + 1))
+    slow_chats = set(chats[: args.slow_chats])
+    schedule = [chat_id for chat_id in chats for _ in range(args.messages)]
+    random.shuffle(schedule)
+    schedule = list(enumerate(schedule))
+
+    slow_s, fast_s = args.slow_ms / 1000, args.fast_ms / 1000
+    runs = (
+        ("sequential", SimpleUpdateProcessor(1), False),
+        ("chat-ordered", ChatOrderedUpdateProcessor(args.concurrency), True),
+    )
+    for label, processor, concurrent in runs:
+        total, p50, p99, ordered = asyncio.run(_run(processor, schedule, slow_chats, slow_s, fast_s, concurrent))
+        print(f"{label:>12}: total={total:.2f}s fast-chat p50={p50 * 1000:.0f}ms p99={p99 * 1000:.0f}ms "
+              f"per-chat order preserved={ordered}")
+        if isinstance(processor, ChatOrderedUpdateProcessor):
+            stats = processor.processor_stats()
+            print(f"{'':>12}  max per-chat depth={stats['max_chat_depth']}, processed={stats['processed']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""
+Branch rush on /entrada: --socias check in within --window seconds over a DB with --rtt-ms per query.
+
+"per check-in DB" is the straightforward handler: look up the socia, her horario for today
+and an existing checada, then insert and commit, all through run_db. "index + writer" is
+modules.attendance: lookup in the preloaded ScheduleIndex, retraso computed inline, row
+handed to the batched AttendanceWriter. Reports handler latency and DB statements per mode.
+
+    python -m benchmarks.checkin_rush --socias 300 --window 1 --rtt-ms 5
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime, time as time_cls
+from types import SimpleNamespace
+
+
+def _p99(samples):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+
+
+class _Message:
+    def __init__(self, text):
+        self.text = text
+        self.replies = []
+
+    async def reply_text(self, text, **_kwargs):
+        self.replies.append(text)
+
+
+def _update(telegram_id: int, text: str):
+    user = SimpleNamespace(id=telegram_id, username=f"socia{telegram_id}")
+    return SimpleNamespace(effective_user=user, message=_Message(text))
+
+
+def _seed(socias: int):
+    from sqlalchemy import insert
+
+    from models.vanity_hr_models import DataEmpleadas, HorarioEmpleadas
+    from modules import database
+    from modules.attendance_analytics import WEEKDAYS
+
+    session = database.SessionVanityHr()
+    session.execute(insert(DataEmpleadas.__table__), [
+        {"numero_empleado": f"E{i:05d}", "sucursal": "sucursal_0", "estatus": "activo", "telegram_chat_id": 1000 + i}
+        for i in range(socias)
+    ])
+    session.execute(insert(HorarioEmpleadas.__table__), [
+        {"numero_empleado": f"E{i:05d}", "telegram_id": 1000 + i, "dia_semana": dia,
+         "hora_entrada_teorica": time_cls(10), "hora_salida_teorica": time_cls(19)}
+        for i in range(socias) for dia in WEEKDAYS
+    ])
+    session.commit()
+    session.close()
+
+
+def _per_checkin_db(telegram_id: int):
+    """Baseline: every lookup and the insert go to the DB inside the handler."""
+    from models.vanity_attendance_models import AsistenciaRegistros
+    from models.vanity_hr_models import DataEmpleadas, HorarioEmpleadas
+    from modules import database
+    from modules.attendance import _minutos_despues
+    from modules.attendance_analytics import WEEKDAYS
+
+    ahora = datetime.now().replace(microsecond=0)
+    hr = database.SessionVanityHr()
+    try:
+        empleada = hr.query(DataEmpleadas).filter(DataEmpleadas.telegram_chat_id == telegram_id).first()
+        horario = hr.query(HorarioEmpleadas).filter_by(
+            telegram_id=telegram_id, dia_semana=WEEKDAYS[ahora.weekday()]).first()
+    finally:
+        hr.close()
+    session = database.SessionVanityAttendance()
+    try:
+        previa = session.query(AsistenciaRegistros).filter_by(
+            numero_empleado=empleada.numero_empleado, fecha=ahora.date()).first()
+        if previa is None:
+            session.add(AsistenciaRegistros(
+                numero_empleado=empleada.numero_empleado, fecha=ahora.date(), hora_entrada_real=ahora.time(),
+                minutos_retraso=_minutos_despues(ahora.time(), horario.hora_entrada_teorica) if horario else None,
+                sucursal_registro=empleada.sucursal, telegram_id_usado=telegram_id,
+            ))
+            session.commit()
+    finally:
+        session.close()
+
+
+async def _rush(handler, socias: int, window: float):
+    rng = random.Random(3)
+    samples = []
+
+    async def socia(i: int):
+        await asyncio.sleep(rng.random() * window)
+        started = time.perf_counter()
+        await handler(_update(1000 + i, "/entrada"), None)
+        samples.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(socia(i) for i in range(socias)))
+    return samples, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--socias", type=int, default=300)
+    parser.add_argument("--window", type=float, default=1.0)
+    parser.add_argument("--rtt-ms", type=float, default=5.0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'checkin.sqlite3')}"
+        from sqlalchemy import delete, event, func, select
+
+        from modules import attendance, database
+        from modules.logger import flush_request_logs
+
+        database.create_all_tables()
+        _seed(args.socias)
+        engine = database.engine_vanity_attendance.get()
+        statements = {"count": 0}
+
+        @event.listens_for(engine, "before_cursor_execute")
+        def _round_trip(*_args):
+            statements["count"] += 1
+            time.sleep(args.rtt_ms / 1000)
+
+        async def per_checkin(update, _context):
+            await database.run_db(_per_checkin_db, update.effective_user.id)
+            await update.message.reply_text("✅")
+
+        def reset():
+            session = database.SessionVanityAttendance()
+            session.execute(delete(attendance.ASISTENCIA))
+            session.commit()
+            session.close()
+            attendance.schedule_index.load()
+
+        for label, handler in (("per check-in DB", per_checkin), ("index + writer", attendance.entrada)):
+            reset()
+            statements["count"] = 0
+            samples, elapsed = asyncio.run(_rush(handler, args.socias, args.window))
+            during = statements["count"]
+            attendance.flush_attendance()
+            session = database.SessionVanityAttendance()
+            stored = session.scalar(select(func.count()).select_from(attendance.ASISTENCIA))
+            session.close()
+            print(f"{label:<16} p50 {statistics.median(samples) * 1000:7.1f} ms  p99 {_p99(samples) * 1000:7.1f} ms  "
+                  f"rush {elapsed:5.2f}s  statements during rush {during:>5}  after flush {statements['count']:>5}  "
+                  f"rows {stored}")
+        print("writer:", attendance.attendance_stats())
+        flush_request_logs()
+        database.dispose_engines()
+
+
+if __name__ == "__main__":
+    main()
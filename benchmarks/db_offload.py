@@ -0,0 +1,71 @@
+"""
+Handler latency vs. DB latency: blocking calls vs. the DB executor (modules.database.run_db).
+
+Simulates N users hitting a handler that does one DB round-trip (time.sleep) plus a
+"fast" handler that never touches the DB. With blocking calls the fast handler's p99
+grows with DB latency; with run_db it stays flat.
+
+    python -m benchmarks.db_offload --users 50 --latencies 0.005 0.02 0.05
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from modules.database import run_db
+
+
+def _p99(samples):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+
+
+async def _db_handler(latency: float, offload: bool):
+    if offload:
+        await run_db(time.sleep, latency)
+    else:
+        time.sleep(latency)
+
+
+async def _scenario(users: int, latency: float, offload: bool):
+    fast_samples = []
+
+    async def db_user():
+        for _ in range(5):
+            await _db_handler(latency, offload)
+            await asyncio.sleep(0.01)
+
+    async def fast_user():
+        # Handler latency = how late the loop wakes us up for a 1 ms timer
+        for _ in range(50):
+            start = time.perf_counter()
+            await asyncio.sleep(0.001)
+            fast_samples.append(time.perf_counter() - start - 0.001)
+
+    tasks = [db_user() for _ in range(users)]
+    tasks += [fast_user() for _ in range(10)]
+    await asyncio.gather(*tasks)
+    return fast_samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--latencies", type=float, nargs="+", default=[0.005, 0.02, 0.05])
+    args = parser.parse_args()
+
+    print(f"{'db_latency_ms':>14} {'mode':>9} {'fast_p50_ms':>12} {'fast_p99_ms':>12}")
+    for latency in args.latencies:
+        for offload in (False, True):
+            samples = asyncio.run(_scenario(args.users, latency, offload))
+            mode = "run_db" if offload else "blocking"
+            print(
+                f"{latency * 1000:>14.1f} {mode:>9} "
+                f"{statistics.median(samples) * 1000:>12.2f} {_p99(samples) * 1000:>12.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Pool checkout cost by pre-ping strategy (DB_POOL_PRE_PING): always / idle / never.
+
+Each statement and each ping pays a simulated --rtt-ms network round-trip (a wrapped
+SQLite connection), so "always" shows the extra round-trip on every checkout that
+"idle" only pays for connections unused longer than DB_POOL_PING_IDLE.
+
+    python -m benchmarks.db_pool --queries 500 --rtt-ms 1
+"""
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+
+from sqlalchemy import text
+
+from modules import database
+
+
+class _SlowCursor:
+    def __init__(self, cursor, rtt: float, counter: dict):
+        self._cursor = cursor
+        self._rtt = rtt
+        self._counter = counter
+
+    def execute(self, *args, **kwargs):
+        time.sleep(self._rtt)
+        self._counter["round_trips"] += 1
+        return self._cursor.execute(*args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+class _SlowConnection:
+    def __init__(self, conn, rtt: float, counter: dict):
+        self._conn = conn
+        self._rtt = rtt
+        self._counter = counter
+
+    def cursor(self, *args, **kwargs):
+        return _SlowCursor(self._conn.cursor(*args, **kwargs), self._rtt, self._counter)
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+
+def _run(strategy: str, queries: int, rtt: float, path: str) -> tuple:
+    os.environ["DB_BENCH_POOL_PRE_PING"] = strategy
+    counter = {"round_trips": 0}
+    url = f"sqlite:///{path}"
+    engine = database._create_pooled_engine("BENCH", url)
+    # Mismo pool y eventos, pero cada conexión paga la latencia simulada
+    engine.pool._creator = lambda *_args: _SlowConnection(sqlite3.connect(path, check_same_thread=False), rtt, counter)
+
+    start = time.perf_counter()
+    for _ in range(queries):
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+    elapsed = time.perf_counter() - start
+    engine.dispose()
+    return elapsed, counter["round_trips"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--rtt-ms", type=float, default=1.0)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(prefix="vanessa-pool-"), "pool.sqlite3")
+    for strategy in database.PRE_PING_STRATEGIES:
+        elapsed, round_trips = _run(strategy, args.queries, args.rtt_ms / 1000, path)
+        print(f"{strategy:>7}: {elapsed / args.queries * 1000:.2f} ms/query, "
+              f"{round_trips / args.queries:.2f} round-trips/query")
+
+
+if __name__ == "__main__":
+    main()
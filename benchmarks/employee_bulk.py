@@ -0,0 +1,113 @@
+"""
+Bulk data_empleadas import/export (modules.employee_io): rows/sec and peak RSS.
+
+Generates a synthetic CSV of --rows socias and, each in a fresh process so the
+peak RSS (ru_maxrss) belongs to that mode alone, on a temporary SQLite file:
+
+  import, per-row upsert   one INSERT .. ON CONFLICT per row, one transaction per chunk
+  import, executemany      employee_io.import_empleadas (one executemany per chunk)
+  export, .all()           whole result set loaded, then written as JSONL
+  export, keyset pages     employee_io.export_empleadas (one page of rows at a time)
+
+    python -m benchmarks.employee_bulk --rows 100000
+"""
+import argparse
+import csv
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+
+from models.vanity_hr_models import DataEmpleadas
+
+COLUMNS = [column.name for column in DataEmpleadas.__table__.columns]
+
+
+def _write_csv(path: str, rows: int):
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=COLUMNS)
+        writer.writeheader()
+        for i in range(rows):
+            writer.writerow({
+                "numero_empleado": f"E{i:07d}", "puesto": "belleza", "sucursal": "plaza_cima",
+                "fecha_ingreso": "13/01/2026", "nombre": f"nombre {i}", "apellido_paterno": "pérez",
+                "apellido_materno": "lópez", "fecha_nacimiento": "1995-12-13",
+                "rfc": f"rfc{i:010d}", "curp": f"curp{i:014d}", "email": f"socia{i}@example.com",
+                "telefono_celular": "8441234567", "domicilio_calle": "victoria",
+                "domicilio_numero_exterior": str(i % 500), "domicilio_colonia": "centro",
+                "domicilio_codigo_postal": "25000", "domicilio_ciudad": "saltillo",
+                "domicilio_estado": "coahuila", "emergencia_nombre": "mamá",
+                "emergencia_telefono": "8441111111", "telegram_chat_id": str(900000 + i),
+            })
+
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss está en KiB en Linux y en bytes en macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _worker(mode: str, db_path: str, csv_path: str, out_path: str, chunk_size: int, results):
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+    from sqlalchemy import select
+
+    from modules import database, employee_io
+
+    database.create_all_tables()
+    start = time.perf_counter()
+    if mode.startswith("import"):
+        if mode == "import, per-row upsert":
+            def per_row(session, rows):
+                for row in rows:
+                    database._upsert_empleada(session, row)
+            employee_io.upsert_empleadas = per_row
+        stats = employee_io.import_empleadas(employee_io.read_rows(csv_path), chunk_size)
+        rows = stats["imported"]
+    elif mode == "export, .all()":
+        session = database.SessionVanityHr()
+        with open(out_path, "w", encoding="utf-8") as f:
+            result = session.execute(select(employee_io.TABLE).order_by(employee_io.TABLE.c.numero_empleado)).all()
+            for row in result:
+                f.write(employee_io.json.dumps(
+                    dict(zip(COLUMNS, map(employee_io._serialize, row))), ensure_ascii=False) + "\n")
+        session.close()
+        rows = len(result)
+    else:
+        rows = employee_io.export_empleadas(out_path, "jsonl", chunk_size)["exported"]
+    elapsed = time.perf_counter() - start
+    results.put({"mode": mode, "rows": rows, "seconds": elapsed, "rss_mb": _peak_rss_mb()})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    ctx = multiprocessing.get_context("spawn")
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, "empleadas.csv")
+        _write_csv(csv_path, args.rows)
+        runs = [
+            ("import, per-row upsert", os.path.join(tmp, "per_row.db")),
+            ("import, executemany", os.path.join(tmp, "bulk.db")),
+            ("export, .all()", os.path.join(tmp, "bulk.db")),
+            ("export, keyset pages", os.path.join(tmp, "bulk.db")),
+        ]
+        print(f"{args.rows} rows, chunk {args.chunk_size}")
+        print(f"{'mode':<24} {'rows':>8} {'seconds':>8} {'rows/s':>9} {'peak RSS':>10}")
+        for mode, db_path in runs:
+            results = ctx.Queue()
+            process = ctx.Process(target=_worker, args=(
+                mode, db_path, csv_path, os.path.join(tmp, "out.jsonl"), args.chunk_size, results))
+            process.start()
+            result = results.get()
+            process.join()
+            print(f"{mode:<24} {result['rows']:>8} {result['seconds']:>8.2f} "
+                  f"{result['rows'] / result['seconds']:>9.0f} {result['rss_mb']:>8.1f}MB")
+
+
+if __name__ == "__main__":
+    main()
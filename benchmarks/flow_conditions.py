@@ -0,0 +1,77 @@
+"""
+Cost of evaluating the next_step conditions of conv-flows/leave_request.json.
+
+Compares the original evaluator (parse + AST walk + compile + eval on every call,
+embedded below) with the predicates built once by flow_builder.compile_condition.
+
+    python -m benchmarks.flow_conditions --rounds 20000
+"""
+import argparse
+import ast
+import json
+import time
+
+from modules import flow_builder
+
+FLOW_PATH = "conv-flows/leave_request.json"
+
+
+# --- Evaluador anterior, copiado para comparar ---
+def _legacy_evaluate_condition(condition, response):
+    if not condition:
+        return False
+    try:
+        tree = ast.parse(condition, mode="eval")
+        for node in ast.walk(tree):
+            if not isinstance(node, flow_builder.ALLOWED_AST_NODES):
+                raise ValueError(f"Unsupported expression: {condition}")
+        compiled = compile(tree, "<condition>", "eval")
+        return bool(eval(compiled, {"__builtins__": {}}, {"response": response}))
+    except Exception:
+        return False
+
+
+def _conditions(path):
+    with open(path, "r", encoding="utf-8") as f:
+        flow = json.load(f)
+    cases = []
+    for step in flow["steps"]:
+        if isinstance(step.get("next_step"), list):
+            answers = list(step.get("options", [])) + ["otra respuesta"]
+            for option in step["next_step"]:
+                if option.get("condition"):
+                    cases.extend((option["condition"], answer) for answer in answers)
+    return cases
+
+
+def _time(fn, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        fn()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rounds", type=int, default=20000)
+    parser.add_argument("--flow", default=FLOW_PATH)
+    args = parser.parse_args()
+
+    cases = _conditions(args.flow)
+    predicates = [(flow_builder.compile_condition(condition), answer) for condition, answer in cases]
+
+    for (condition, answer), (predicate, _) in zip(cases, predicates):
+        assert predicate(answer) == _legacy_evaluate_condition(condition, answer), (condition, answer)
+
+    legacy = _time(lambda: [_legacy_evaluate_condition(c, a) for c, a in cases], args.rounds)
+    compiled = _time(lambda: [p(a) for p, a in predicates], args.rounds)
+    evaluations = args.rounds * len(cases)
+
+    print(f"{args.flow}: {len({c for c, _ in cases})} conditions, {len(cases)} (condition, answer) pairs")
+    print(f"legacy:   {legacy / evaluations * 1e9:.0f}ns per evaluation")
+    print(f"compiled: {compiled / evaluations * 1e9:.0f}ns per evaluation")
+    print(f"speedup:  {legacy / compiled:.0f}x")
+
+
+if __name__ == "__main__":
+    main()
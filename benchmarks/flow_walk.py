@@ -0,0 +1,150 @@
+"""
+Per-message cost of the conversation engine walking conv-flows/onboarding.json.
+
+Compares the original handler logic (linear scan of flow["steps"] and a fresh
+ReplyKeyboardMarkup per question, embedded below) with the CompiledFlow used by
+modules.flow_builder. Replies go to a no-op fake, so only the engine is measured.
+
+    python -m benchmarks.flow_walk --walks 2000
+"""
+import argparse
+import asyncio
+import copy
+import json
+import time
+
+from telegram import ReplyKeyboardRemove
+
+from modules import flow_builder
+
+FLOW_PATH = "conv-flows/onboarding.json"
+
+
+class _FakeMessage:
+    text = None
+
+    async def reply_text(self, text, reply_markup=None):
+        return None
+
+
+class _FakeUpdate:
+    def __init__(self):
+        self.message = _FakeMessage()
+
+
+class _FakeContext:
+    def __init__(self):
+        self.user_data = {}
+
+
+async def _no_finalize(update, context, flow=None):
+    return None
+
+
+# --- Implementación anterior (búsqueda lineal), copiada para comparar ---
+def _legacy_find_step(flow, state_key):
+    return next((step for step in flow["steps"] if step["state"] == state_key), None)
+
+
+async def _legacy_go_to_state(update, context, flow, state_key):
+    safety_counter = 0
+    while True:
+        safety_counter += 1
+        if safety_counter > len(flow["steps"]) + 2:
+            return None
+        if state_key is flow_builder.END_OF_FLOW or state_key == -1 and _legacy_find_step(flow, -1) is None:
+            return None
+        next_step = _legacy_find_step(flow, state_key)
+        if not next_step:
+            return None
+        reply_markup = ReplyKeyboardRemove()
+        if next_step.get("type") == "keyboard" and "options" in next_step:
+            reply_markup = flow_builder._build_keyboard(next_step["options"])
+        await update.message.reply_text(next_step["question"], reply_markup=reply_markup)
+        context.user_data["current_state"] = state_key
+        if next_step.get("type") == "info":
+            state_key = flow_builder._determine_next_state(next_step, None)
+            if state_key is None:
+                return None
+            continue
+        return state_key
+
+
+async def _legacy_callback(update, context, flow):
+    step = _legacy_find_step(flow, context.user_data.get("current_state", 0))
+    if not step:
+        return None
+    answer = update.message.text
+    if step.get("variable"):
+        context.user_data[step["variable"]] = answer
+    next_state = flow_builder._determine_next_state(step, answer)
+    if next_state is None:
+        return None
+    return await _legacy_go_to_state(update, context, flow, next_state)
+
+
+def _answer_for(step):
+    options = step.get("options")
+    return options[0] if options else "respuesta"
+
+
+async def _walk_legacy(flow):
+    update, context = _FakeUpdate(), _FakeContext()
+    messages = 0
+    state = await _legacy_go_to_state(update, context, flow, flow["steps"][0]["state"])
+    while state is not None:
+        update.message.text = _answer_for(_legacy_find_step(flow, state))
+        state = await _legacy_callback(update, context, flow)
+        messages += 1
+    return messages
+
+
+async def _walk_compiled(flow):
+    update, context = _FakeUpdate(), _FakeContext()
+    messages = 0
+    result = await flow_builder.start_flow(update, context, flow_name=flow.name)
+    while result == flow_builder.FLOW_ACTIVE:
+        step = flow.steps[context.user_data["current_state"]]
+        options = step.reply_markup.keyboard if hasattr(step.reply_markup, "keyboard") else None
+        update.message.text = options[0][0].text if options else "respuesta"
+        result = await flow_builder.generic_callback(update, context, flow_name=flow.name)
+        messages += 1
+    return messages
+
+
+async def _bench(walk, flow, walks):
+    messages = await walk(flow)
+    start = time.perf_counter()
+    for _ in range(walks):
+        await walk(flow)
+    elapsed = time.perf_counter() - start
+    return messages, elapsed / (walks * messages)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--walks", type=int, default=2000)
+    parser.add_argument("--flow", default=FLOW_PATH)
+    args = parser.parse_args()
+
+    with open(args.flow, "r", encoding="utf-8") as f:
+        definition = json.load(f)
+    legacy = copy.deepcopy(definition)
+    flow_builder._preprocess_flow(legacy)
+    start = time.perf_counter()
+    compiled = flow_builder.compile_flow(copy.deepcopy(definition))
+    flow_builder.register_flow(compiled)
+    compile_ms = (time.perf_counter() - start) * 1000
+
+    flow_builder.finalize_flow = _no_finalize
+    legacy_msgs, legacy_cost = asyncio.run(_bench(_walk_legacy, legacy, args.walks))
+    compiled_msgs, compiled_cost = asyncio.run(_bench(_walk_compiled, compiled, args.walks))
+
+    print(f"{args.flow}: {len(definition['steps'])} steps, compiled once in {compile_ms:.2f}ms")
+    print(f"legacy:   {legacy_msgs} messages/walk, {legacy_cost * 1e6:.2f}us per message")
+    print(f"compiled: {compiled_msgs} messages/walk, {compiled_cost * 1e6:.2f}us per message")
+    print(f"speedup:  {legacy_cost / compiled_cost:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
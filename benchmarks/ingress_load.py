@@ -0,0 +1,144 @@
+"""
+Local load generator for the webhook ingress (no Telegram, no network).
+
+Starts a stub Bot API (getMe only) on localhost, an Application pointed at it, and
+the aiohttp ingress from modules.ingress. Then POSTs --updates synthetic message
+updates with --concurrency clients and reports accepted requests/s, processed
+updates/s and enqueue->handler latency.
+
+    python -m benchmarks.ingress_load --updates 5000 --concurrency 50 --work-ms 0
+"""
+import argparse
+import asyncio
+import socket
+import time
+
+import aiohttp
+from aiohttp import web
+from telegram import Update
+from telegram.ext import Application, TypeHandler
+
+from modules import ingress
+
+SECRET = "bench-secret"
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def _start_stub_bot_api(port: int) -> web.AppRunner:
+    async def any_method(request):
+        if request.match_info["method"] == "getMe":
+            result = {"id": 1, "is_bot": True, "first_name": "Vanessa", "username": "vanessa_bench_bot"}
+        else:
+            result = True
+        return web.json_response({"ok": True, "result": result})
+
+    app = web.Application()
+    app.router.add_route("*", "/bot{token}/{method}", any_method)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", port).start()
+    return runner
+
+
+def _synthetic_update(update_id: int, chats: int) -> dict:
+    chat_id = 1000 + update_id % chats
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private"},
+            "from": {"id": chat_id, "is_bot": False, "first_name": "Socia"},
+            "text": f"mensaje {update_id}",
+        },
+    }
+
+
+async def _load(url: str, updates: int, concurrency: int, chats: int) -> dict:
+    statuses = {}
+    sent_at = {}
+    next_id = iter(range(updates))
+    headers = {ingress.SECRET_HEADER: SECRET}
+
+    async def client(session):
+        for update_id in next_id:
+            sent_at[update_id] = time.perf_counter()
+            async with session.post(url, json=_synthetic_update(update_id, chats), headers=headers) as res:
+                statuses[res.status] = statuses.get(res.status, 0) + 1
+
+    async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=concurrency)) as session:
+        await asyncio.gather(*(client(session) for _ in range(concurrency)))
+    return {"statuses": statuses, "sent_at": sent_at}
+
+
+async def main_async(args):
+    api_port, ingress_port = _free_port(), _free_port()
+    stub = await _start_stub_bot_api(api_port)
+
+    processed_at = {}
+    done = asyncio.Event()
+
+    async def handle(update: Update, context):
+        if args.work_ms:
+            await asyncio.sleep(args.work_ms / 1000)
+        processed_at[update.update_id] = time.perf_counter()
+        if len(processed_at) >= args.updates:
+            done.set()
+
+    application = (
+        Application.builder()
+        .token("1:bench")
+        .base_url(f"http://127.0.0.1:{api_port}/bot")
+        .update_queue(ingress.build_update_queue())
+        .concurrent_updates(args.processing_concurrency)
+        .build()
+    )
+    application.add_handler(TypeHandler(Update, handle))
+    await application.initialize()
+    await application.start()
+    runner = await ingress.start_ingress(application, host="127.0.0.1", port=ingress_port, secret=SECRET)
+
+    url = f"http://127.0.0.1:{ingress_port}{ingress.INGRESS_PATH}"
+    start = time.perf_counter()
+    result = await _load(url, args.updates, args.concurrency, args.chats)
+    accepted_elapsed = time.perf_counter() - start
+    accepted = result["statuses"].get(200, 0)
+    if accepted:
+        try:
+            await asyncio.wait_for(done.wait(), timeout=60)
+        except asyncio.TimeoutError:
+            pass
+    processed_elapsed = time.perf_counter() - start
+
+    latencies = sorted(processed_at[i] - result["sent_at"][i] for i in processed_at)
+    print(f"HTTP statuses: {result['statuses']}")
+    print(f"accepted:  {accepted / accepted_elapsed:,.0f} req/s")
+    print(f"processed: {len(processed_at) / processed_elapsed:,.0f} updates/s ({len(processed_at)}/{args.updates})")
+    if latencies:
+        print(f"send->handler latency: p50={latencies[len(latencies) // 2] * 1000:.1f}ms "
+              f"p99={latencies[int(len(latencies) * 0.99) - 1] * 1000:.1f}ms")
+    print("ingress:", ingress.ingress_stats())
+
+    await runner.cleanup()
+    await application.stop()
+    await application.shutdown()
+    await stub.cleanup()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--updates", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=50, help="concurrent HTTP clients")
+    parser.add_argument("--chats", type=int, default=200)
+    parser.add_argument("--work-ms", type=float, default=0.0, help="simulated handler time")
+    parser.add_argument("--processing-concurrency", type=int, default=1, help="Application.concurrent_updates")
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""
+request_logs reporting at multi-million-row sizes: raw table vs. request_log_daily.
+
+Seeds --rows request_logs over 2025 (--users socias, eight commands) in a SQLite file
+with the db/migrations indexes, times the report queries on the raw table, then runs
+modules.log_retention.run_retention as of 2026-01-15 (rollup of every day, archive and
+removal of Jan-Jun 2025) in a fresh process so its peak RSS is its own, and times the
+same reports on request_log_daily.
+
+    python -m benchmarks.log_retention --rows 3000000
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import resource
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+COMMANDS = ("start", "horario", "vacaciones", "permiso", "links", "entrada", "salida", "registro")
+TODAY = date(2026, 1, 15)
+
+
+def _seed(rows: int, users: int):
+    from sqlalchemy import insert
+
+    from modules import database
+    from modules.log_retention import LOGS
+
+    rng = random.Random(5)
+    origin, span = datetime(2025, 1, 1), 365 * 86400
+    session = database.SessionUsersAlma()
+    for offset in range(0, rows, 50_000):
+        session.execute(insert(LOGS), [
+            {"telegram_id": str(1000 + int(rng.paretovariate(1.2)) % users), "username": None,
+             "command": rng.choice(COMMANDS), "message": "/x",
+             "created_at": origin + timedelta(seconds=(offset + n) * span // rows)}
+            for n in range(min(50_000, rows - offset))
+        ])
+        session.commit()
+    session.close()
+
+
+def _reports():
+    """name -> (raw query, rollup query) for the same report."""
+    from sqlalchemy import func, select
+
+    from modules.log_retention import LOGS, summary_query
+
+    def raw_by_day(start, end):
+        day = func.date(LOGS.c.created_at)
+        return select(day, LOGS.c.command, func.count()).where(
+            LOGS.c.created_at >= datetime.combine(start, datetime.min.time()),
+            LOGS.c.created_at < datetime.combine(end + timedelta(days=1), datetime.min.time()),
+        ).group_by(day, LOGS.c.command)
+
+    def raw_top_users(start, end):
+        total = func.count().label("total")
+        return select(LOGS.c.telegram_id, total).where(
+            LOGS.c.created_at >= datetime.combine(start, datetime.min.time()),
+            LOGS.c.created_at < datetime.combine(end + timedelta(days=1), datetime.min.time()),
+        ).group_by(LOGS.c.telegram_id).order_by(total.desc()).limit(10)
+
+    march, q2, year = (date(2025, 3, 1), date(2025, 3, 31)), (date(2025, 4, 1), date(2025, 6, 30)), \
+        (date(2025, 1, 1), date(2025, 12, 31))
+    return {
+        "commands per day, 1 month": (raw_by_day(*march), summary_query(*march)),
+        "top 10 users, 1 quarter": (raw_top_users(*q2), summary_query(*q2, by="user").limit(10)),
+        "commands per day, 1 year": (raw_by_day(*year), summary_query(*year)),
+    }
+
+
+def _time(session, statement, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        session.execute(statement).all()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples)
+
+
+def _retention_worker(db_path: str, archive_dir: str, results):
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+    from modules.log_retention import run_retention
+
+    started = time.perf_counter()
+    stats = run_retention(TODAY, keep_months=6, directory=archive_dir)
+    # ru_maxrss está en KiB en Linux y en bytes en macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    results.put({**stats, "seconds": time.perf_counter() - started,
+                 "rss_mb": peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=3_000_000)
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "logs.sqlite3")
+        archive_dir = os.path.join(tmp, "archive")
+        os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+        from sqlalchemy import func, select
+
+        from modules import database
+        from modules.log_retention import DAILY, LOGS
+
+        database.create_all_tables()
+        started = time.perf_counter()
+        _seed(args.rows, args.users)
+        print(f"seeded {args.rows} request_logs in {time.perf_counter() - started:.1f}s")
+
+        reports = _reports()
+        session = database.SessionUsersAlma()
+        raw = {name: _time(session, queries[0], args.repeat) for name, queries in reports.items()}
+        session.close()
+        database.dispose_engines()
+
+        ctx = multiprocessing.get_context("spawn")
+        results = ctx.Queue()
+        worker = ctx.Process(target=_retention_worker, args=(db_path, archive_dir, results))
+        worker.start()
+        stats = results.get()
+        worker.join()
+        archived = sum(month["rows"] for month in stats["archived"])
+        size = sum(os.path.getsize(os.path.join(archive_dir, name)) for name in os.listdir(archive_dir))
+        print(f"retention: rollup {stats['rollup']['days']} days in {stats['rollup_seconds']:.1f}s; "
+              f"archived + deleted {archived} rows ({len(stats['archived'])} months, "
+              f"{size / 1e6:.1f} MB gzip JSONL) in {stats['archive_seconds']:.1f}s; peak RSS {stats['rss_mb']:.0f} MB")
+
+        session = database.SessionUsersAlma()
+        print(f"request_logs rows left {session.scalar(select(func.count()).select_from(LOGS))}, "
+              f"request_log_daily rows {session.scalar(select(func.count()).select_from(DAILY))}")
+        print(f"{'report':<28} {'raw table':>10} {'rollup':>10}")
+        for name, queries in reports.items():
+            rolled = _time(session, queries[1], args.repeat)
+            print(f"{name:<28} {raw[name] * 1000:8.1f}ms {rolled * 1000:8.1f}ms  ({raw[name] / rolled:.0f}x)")
+        session.close()
+        database.dispose_engines()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Outbox delivery throughput against a local HTTP sink (no network).
+
+Enqueues N payloads into a temporary outbox, lets OutboxWorker drain it against a
+threaded local server where a fraction of requests fail, and reports deliveries/sec,
+retries and the remaining queue depth.
+
+    python -m benchmarks.outbox_throughput --entries 2000 --fail-rate 0.1
+"""
+import argparse
+import asyncio
+import logging
+import os
+import random
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from modules import outbox
+from modules.webhooks import close_webhook_client
+
+
+def _start_sink(fail_rate: float):
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            self.send_response(503 if random.random() < fail_rate else 200)
+            self.end_headers()
+
+        def log_message(self, *_args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+async def _run(entries: int, fail_rate: float, concurrency: int):
+    server = _start_sink(fail_rate)
+    url = f"http://127.0.0.1:{server.server_port}/n8n"
+    with tempfile.TemporaryDirectory() as tmp:
+        store = outbox.OutboxStore(os.path.join(tmp, "outbox.sqlite3"))
+        start = time.perf_counter()
+        for i in range(entries):
+            store.enqueue([url], {"record_id": i, "motivo": "bench"})
+        enqueue_s = time.perf_counter() - start
+
+        # Backoff corto para que los reintentos entren en la medición
+        worker = outbox.OutboxWorker(store, batch_size=200, concurrency=concurrency, poll_interval=0.05, base_backoff=0.01)
+        start = time.perf_counter()
+        worker.start()
+        while store.counts()[outbox.PENDING] and time.perf_counter() - start < 120:
+            await asyncio.sleep(0.05)
+        elapsed = time.perf_counter() - start
+        await worker.stop()
+        counts = store.counts()
+        store.close()
+    await close_webhook_client()
+    server.shutdown()
+    print(f"enqueue: {entries / enqueue_s:,.0f} rows/s")
+    print(f"delivery: {counts[outbox.DELIVERED] / elapsed:,.0f} deliveries/s over {elapsed:.2f}s")
+    print(f"worker: {worker.stats}  depth: {counts}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--entries", type=int, default=2000)
+    parser.add_argument("--fail-rate", type=float, default=0.1)
+    parser.add_argument("--concurrency", type=int, default=20)
+    args = parser.parse_args()
+    logging.disable(logging.ERROR)
+    asyncio.run(_run(args.entries, args.fail_rate, args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Flush latency and bytes written per update: SQLitePersistence vs. PTB's PicklePersistence.
+
+Simulates --users employees answering the 35-question onboarding at the same time.
+Each tick, --per-tick random users answer one question; then the persistence is
+updated the way Application.update_persistence does it (one update_user_data and
+one update_conversation per touched user). Ticks also re-send some untouched
+users, as PTB does for any user whose update was processed.
+
+    python -m benchmarks.persistence_flush --users 200 --ticks 300
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+
+from telegram.ext import PicklePersistence
+
+from modules.persistence import SQLitePersistence
+
+QUESTIONS = 35
+
+
+def _answer(user_id, question):
+    return f"respuesta {question} de la usuaria {user_id} " + "x" * random.randint(5, 40)
+
+
+async def _run(persistence, users, ticks, per_tick, flush_each_tick):
+    random.seed(7)
+    data = {user_id: {"respuestas": {}, "meta": {"telegram_id": user_id}} for user_id in range(users)}
+    progress = {user_id: 0 for user_id in range(users)}
+    latencies = []
+    updates = 0
+    for _ in range(ticks):
+        touched = random.sample(range(users), per_tick)
+        for user_id in touched:
+            q = progress[user_id] % QUESTIONS
+            data[user_id]["respuestas"][f"p{q}"] = _answer(user_id, q)
+            progress[user_id] += 1
+        # PTB también reenvía usuarias cuyo update se procesó sin cambiar user_data
+        idle = random.sample(range(users), per_tick // 2)
+        start = time.perf_counter()
+        for user_id in set(touched) | set(idle):
+            await persistence.update_user_data(user_id, data[user_id])
+            await persistence.update_conversation("onboarding", (user_id, user_id), progress[user_id] % QUESTIONS)
+            updates += 1
+        if flush_each_tick:
+            await persistence.flush()
+        latencies.append(time.perf_counter() - start)
+    await persistence.flush()
+    return updates, latencies
+
+
+class _CountingPickle(PicklePersistence):
+    bytes_written = 0
+
+    def _dump_singlefile(self):
+        super()._dump_singlefile()
+        self.bytes_written += os.path.getsize(self.filepath)
+
+
+def _summary(label, updates, latencies, bytes_written):
+    latencies = sorted(latencies)
+    p50 = latencies[len(latencies) // 2] * 1000
+    p99 = latencies[int(len(latencies) * 0.99) - 1] * 1000
+    print(f"{label:>18}: flush p50={p50:.2f}ms p99={p99:.2f}ms, {bytes_written / updates:,.0f} bytes/update ({bytes_written / 1e6:.1f} MB total)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--ticks", type=int, default=300)
+    parser.add_argument("--per-tick", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        sqlite_path = os.path.join(tmp, "conversations.sqlite3")
+        sqlite = SQLitePersistence(sqlite_path)
+        updates, latencies = asyncio.run(_run(sqlite, args.users, args.ticks, args.per_tick, True))
+        _summary("SQLitePersistence", updates, latencies, sqlite.stats["bytes_written"])
+        print(f"{'':>18}  {sqlite.stats['unchanged_skipped']} unchanged writes skipped, {sqlite.stats['flushes']} transactions")
+
+        # PicklePersistence reescribe el archivo completo en cada update_* (on_flush=False)
+        pickle_path = os.path.join(tmp, "conversations.pickle")
+        pickled = _CountingPickle(pickle_path, single_file=True, on_flush=False)
+        updates, latencies = asyncio.run(_run(pickled, args.users, args.ticks, args.per_tick, False))
+        _summary("PicklePersistence", updates, latencies, pickled.bytes_written)
+
+
+if __name__ == "__main__":
+    main()
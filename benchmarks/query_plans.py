@@ -0,0 +1,204 @@
+"""
+Query plans and latency of the bot's lookups before and after db/migrations.
+
+Seeds a SQLite file with --socias socias (data_empleadas, a horario per day, a year of
+asistencia_registros) and --logs request_logs rows, then for each hot query records the
+EXPLAIN QUERY PLAN and the p50 latency over --repeat random lookups, first on the
+init.sql schema and again after modules.migrations.apply_migrations.
+
+    python -m benchmarks.query_plans --socias 3000 --logs 1000000
+    python -m benchmarks.query_plans --save benchmarks/query_plans.json   # guarda los planes como referencia
+    python -m benchmarks.query_plans --check benchmarks/query_plans.json  # exit 1 si un plan volvió a escanear
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, datetime, time as time_cls, timedelta
+
+COMMANDS = ("start", "horario", "vacaciones", "permiso", "links", "entrada", "salida", "registro")
+
+
+def _seed(socias: int, logs: int):
+    from sqlalchemy import insert
+
+    from models.users_alma_models import RequestLog
+    from models.vanity_attendance_models import AsistenciaRegistros
+    from models.vanity_hr_models import DataEmpleadas, HorarioEmpleadas
+    from modules import database
+    from modules.attendance_analytics import WEEKDAYS
+
+    rng = random.Random(11)
+    hr = database.SessionVanityHr()
+    hr.execute(insert(DataEmpleadas.__table__), [
+        {"numero_empleado": f"E{i:05d}", "sucursal": f"sucursal_{i % 12}", "estatus": "activo",
+         "telegram_chat_id": 1000 + i}
+        for i in range(socias)
+    ])
+    hr.execute(insert(HorarioEmpleadas.__table__), [
+        {"numero_empleado": f"E{i:05d}", "telegram_id": 1000 + i, "dia_semana": dia,
+         "hora_entrada_teorica": time_cls(10), "hora_salida_teorica": time_cls(19)}
+        for i in range(socias) for dia in WEEKDAYS[:6]
+    ])
+    hr.commit()
+    hr.close()
+
+    start = date(2025, 1, 1)
+    days = [start + timedelta(days=d) for d in range(365) if (start + timedelta(days=d)).weekday() < 6]
+    session = database.SessionVanityAttendance()
+    batch = []
+    for day in days:
+        for i in range(socias):
+            batch.append({"numero_empleado": f"E{i:05d}", "fecha": day, "hora_entrada_real": time_cls(10, i % 20),
+                          "hora_salida_real": time_cls(19, i % 30), "sucursal_registro": f"sucursal_{i % 12}"})
+            if len(batch) == 50_000:
+                session.execute(insert(AsistenciaRegistros.__table__), batch)
+                batch.clear()
+    if batch:
+        session.execute(insert(AsistenciaRegistros.__table__), batch)
+    session.commit()
+    session.close()
+
+    session = database.SessionUsersAlma()
+    origin = datetime(2025, 1, 1)
+    span = 365 * 86400
+    for offset in range(0, logs, 50_000):
+        session.execute(insert(RequestLog.__table__), [
+            {"telegram_id": str(1000 + rng.randrange(socias)), "username": None,
+             "command": rng.choice(COMMANDS), "message": "/x",
+             "created_at": origin + timedelta(seconds=(offset + n) * span // logs)}
+            for n in range(min(50_000, logs - offset))
+        ])
+    session.commit()
+    session.close()
+    return days
+
+
+def _queries(socias: int, days: list):
+    """name -> callable(rng) returning a statement with random parameters."""
+    from sqlalchemy import func, select
+
+    from models.users_alma_models import RequestLog
+    from models.vanity_attendance_models import AsistenciaRegistros as A
+    from models.vanity_hr_models import DataEmpleadas, HorarioEmpleadas
+
+    def chat(rng):
+        return 1000 + rng.randrange(socias)
+
+    def numero(rng):
+        return f"E{rng.randrange(socias):05d}"
+
+    def day(rng):
+        return rng.choice(days)
+
+    def moment(rng):
+        return datetime.combine(day(rng), time_cls(0))
+
+    return {
+        "empleada por telegram_chat_id": lambda rng: select(DataEmpleadas.numero_empleado).where(
+            DataEmpleadas.telegram_chat_id == chat(rng)),
+        "horario por telegram_id": lambda rng: select(HorarioEmpleadas).where(
+            HorarioEmpleadas.telegram_id == chat(rng)),
+        "logs recientes de una usuaria": lambda rng: select(RequestLog).where(
+            RequestLog.telegram_id == str(chat(rng)), RequestLog.created_at >= moment(rng),
+        ).order_by(RequestLog.created_at.desc()).limit(50),
+        "logs por comando de un día": lambda rng: (lambda m: select(RequestLog.command, func.count()).where(
+            RequestLog.created_at >= m, RequestLog.created_at < m + timedelta(days=1),
+        ).group_by(RequestLog.command))(moment(rng)),
+        "checadas del día": lambda rng: select(A.numero_empleado, A.hora_entrada_real, A.hora_salida_real).where(
+            A.fecha == day(rng)),
+        "checada abierta (/salida)": lambda rng: select(A.id_asistencia).where(
+            A.numero_empleado == numero(rng), A.fecha == day(rng), A.hora_salida_real.is_(None)),
+        "rango pendiente de una socia": lambda rng: select(A.id_asistencia, A.fecha).where(
+            A.numero_empleado == numero(rng), A.fecha >= day(rng)),
+    }
+
+
+def _plan(conn, statement) -> list:
+    compiled = statement.compile(conn, compile_kwargs={"literal_binds": True})
+    return [row[-1] for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}")]
+
+
+def _full_scan(plan: list) -> bool:
+    # "SCAN tabla" sin "USING ... INDEX" recorre la tabla completa
+    return any(step.startswith("SCAN ") and "INDEX" not in step for step in plan)
+
+
+def _measure(engine, queries: dict, repeat: int) -> dict:
+    results = {}
+    with engine.connect() as conn:
+        for name, build in queries.items():
+            rng = random.Random(name)
+            plan = _plan(conn, build(rng))
+            samples = []
+            for _ in range(repeat):
+                statement = build(rng)
+                started = time.perf_counter()
+                conn.execute(statement).all()
+                samples.append(time.perf_counter() - started)
+            results[name] = {"plan": plan, "full_scan": _full_scan(plan), "p50_ms": statistics.median(samples) * 1000}
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--socias", type=int, default=3000)
+    parser.add_argument("--logs", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--save", help="write the post-migration plans to this JSON file")
+    parser.add_argument("--check", help="compare the post-migration plans with this JSON file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'plans.sqlite3')}"
+        from modules import database
+        from modules.migrations import apply_migrations
+
+        database.create_all_tables(migrate=False)
+        started = time.perf_counter()
+        days = _seed(args.socias, args.logs)
+        print(f"seeded {args.socias} socias, {args.socias * len(days)} checadas, {args.logs} request_logs "
+              f"in {time.perf_counter() - started:.1f}s")
+
+        engine = database.engine_users_alma.get()
+        queries = _queries(args.socias, days)
+        before = _measure(engine, queries, args.repeat)
+        started = time.perf_counter()
+        applied = apply_migrations(engine)
+        print(f"applied {', '.join(applied)} in {time.perf_counter() - started:.1f}s")
+        after = _measure(engine, queries, args.repeat)
+        database.dispose_engines()
+
+    print(f"{'query':<32} {'before':>10} {'after':>10}  plan after")
+    for name in queries:
+        print(f"{name:<32} {before[name]['p50_ms']:8.2f}ms {after[name]['p50_ms']:8.2f}ms  "
+              f"{' / '.join(after[name]['plan'])}")
+        if before[name]["full_scan"]:
+            print(f"{'':<32} (before: {' / '.join(before[name]['plan'])})")
+
+    plans = {name: {"plan": result["plan"], "full_scan": result["full_scan"]} for name, result in after.items()}
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as fh:
+            json.dump(plans, fh, indent=2, ensure_ascii=False)
+            fh.write("\n")
+    if args.check:
+        with open(args.check, encoding="utf-8") as fh:
+            expected = json.load(fh)
+        regressions = [name for name, plan in plans.items()
+                       if plan["full_scan"] and not expected.get(name, {}).get("full_scan", False)]
+        changed = [name for name, plan in plans.items() if name in expected and plan["plan"] != expected[name]["plan"]]
+        for name in changed:
+            print(f"plan changed: {name}: {expected[name]['plan']} -> {plans[name]['plan']}")
+        if regressions:
+            print(f"REGRESSION (full scan): {', '.join(regressions)}")
+            return 1
+        print("plans OK")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,56 @@
+"""
+Accuracy and per-call latency of the offline permiso-reason classifier.
+
+Runs k-fold cross-validation over the bundled labeled corpus (data/motivos_permiso.jsonl)
+and reports accuracy, how many reasons clear the confidence threshold (i.e. never reach
+the LLM), accuracy on that subset, and per-call latency. No network required.
+
+    python -m benchmarks.reason_classifier --folds 5 --threshold 0.8
+"""
+import argparse
+import json
+import random
+import statistics
+import time
+
+from modules.reason_classifier import LOCAL_CLASSIFIER_DATA, ReasonClassifier
+
+
+def _load(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return [(row["texto"], row["categoria"]) for row in map(json.loads, filter(None, map(str.strip, f)))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--data", default=LOCAL_CLASSIFIER_DATA)
+    parser.add_argument("--folds", type=int, default=5)
+    parser.add_argument("--threshold", type=float, default=0.8)
+    args = parser.parse_args()
+
+    examples = _load(args.data)
+    random.Random(7).shuffle(examples)
+    correct = confident = confident_correct = 0
+    latencies = []
+    for fold in range(args.folds):
+        test = examples[fold::args.folds]
+        train = [ex for i, ex in enumerate(examples) if i % args.folds != fold]
+        model = ReasonClassifier(train)
+        for text, label in test:
+            start = time.perf_counter()
+            predicted, confidence = model.predict(text)
+            latencies.append(time.perf_counter() - start)
+            correct += predicted == label
+            if confidence >= args.threshold:
+                confident += 1
+                confident_correct += predicted == label
+
+    total = len(examples)
+    print(f"examples={total} folds={args.folds}")
+    print(f"accuracy (all): {correct / total:.1%}")
+    print(f"answered locally (conf >= {args.threshold}): {confident / total:.1%}, accuracy there: {confident_correct / max(confident, 1):.1%}")
+    print(f"latency: mean={statistics.mean(latencies) * 1e6:.0f}us p99={sorted(latencies)[int(len(latencies) * 0.99)] * 1e6:.0f}us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+register_user latency: ORM SELECT + INSERT/UPDATE (the previous code, embedded below)
+vs. the Core upserts, in two transactions and in one shared transaction.
+
+Every statement and COMMIT pays a simulated --rtt-ms round-trip on an in-memory
+SQLite with the three schemas. Each mode registers --users new socias and then
+registers them again (the update path).
+
+    python -m benchmarks.register_upsert --users 300 --rtt-ms 2
+"""
+import argparse
+import statistics
+import time
+from unittest import mock
+
+from sqlalchemy import event
+from sqlalchemy.orm import sessionmaker
+
+from benchmarks._sqlite import sqlite_engine
+from models.users_alma_models import User
+from models.vanity_hr_models import DataEmpleadas
+from modules import database
+
+
+def _legacy_upsert_user(session, row):
+    record = session.query(User).filter(User.telegram_id == row["telegram_id"]).first()
+    if record:
+        record.username = row["username"]
+        record.first_name = row["first_name"]
+        record.last_name = row["last_name"] or record.last_name
+        record.email = row["email"] or record.email
+        record.cell_phone = row["cell_phone"] or record.cell_phone
+    else:
+        session.add(User(**row))
+
+
+def _legacy_upsert_empleada(session, payload):
+    existing = session.get(DataEmpleadas, payload["numero_empleado"])
+    if existing:
+        for field, value in payload.items():
+            setattr(existing, field, value)
+    else:
+        session.add(DataEmpleadas(**payload))
+
+
+class _Factory:
+    """Session factory exposing `.engine` like database.LazySessionFactory."""
+
+    def __init__(self, engine, shared_marker):
+        self.engine = shared_marker
+        self._maker = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    def __call__(self):
+        return self._maker()
+
+
+def _user_data(i: int, version: int) -> dict:
+    return {
+        "metadata": {"chat_id": 900000 + i, "telegram_user": f"socia{i}", "duracion_segundos": 300},
+        "candidato": {
+            "nombre_oficial": f"Nombre {i} v{version}", "nombre_preferido": "Socia",
+            "apellido_paterno": "Pérez", "apellido_materno": "López",
+            "rfc": f"RFC{i:010d}", "curp": f"CURP{i:014d}", "fecha_nacimiento": "1995-12-13",
+        },
+        "contacto": {"email": f"socia{i}@example.com", "celular": "8441234567"},
+        "domicilio": {"calle": "Victoria", "num_ext": "12", "colonia": "Centro", "cp": "25000",
+                      "ciudad": "Saltillo", "estado": "Coahuila"},
+        "laboral": {"rol_id": "belleza", "sucursal_id": "plaza_cima", "fecha_inicio": "2026-01-13"},
+        "referencias": [{"nombre": "Ref", "telefono": "8440000000", "relacion": "Familiar"}],
+        "emergencia": {"nombre": "Mamá", "telefono": "8441111111", "relacion": "Padre/Madre"},
+    }
+
+
+def _run(mode: str, users: int, rtt: float) -> dict:
+    engine = sqlite_engine(latency=rtt)
+    round_trips = {"count": 0}
+
+    # sqlite_engine ya cobra el RTT por sentencia; COMMIT también es un round-trip
+    @event.listens_for(engine, "before_cursor_execute")
+    def _statement(*_args):
+        round_trips["count"] += 1
+
+    @event.listens_for(engine, "commit")
+    def _commit(_conn):
+        round_trips["count"] += 1
+        time.sleep(rtt)
+
+    shared = object() if mode == "upsert, 1 transaction" else None
+    users_factory = _Factory(engine, shared)
+    hr_factory = _Factory(engine, shared)
+    patches = [
+        mock.patch.object(database, "SessionUsersAlma", users_factory),
+        mock.patch.object(database, "SessionVanityHr", hr_factory),
+    ]
+    if mode == "ORM (previous)":
+        patches += [
+            mock.patch.object(database, "_upsert_user", _legacy_upsert_user),
+            mock.patch.object(database, "_upsert_empleada", _legacy_upsert_empleada),
+        ]
+    for patch in patches:
+        patch.start()
+    try:
+        results = {}
+        for phase, version in (("insert", 1), ("update", 2)):
+            round_trips["count"] = 0
+            samples = []
+            for i in range(users):
+                start = time.perf_counter()
+                ok = database.register_user(_user_data(i, version))
+                samples.append(time.perf_counter() - start)
+                assert ok, f"register_user failed in {mode}"
+            results[phase] = (statistics.mean(samples), round_trips["count"] / users)
+        return results
+    finally:
+        for patch in patches:
+            patch.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=300)
+    parser.add_argument("--rtt-ms", type=float, default=2.0)
+    args = parser.parse_args()
+
+    for mode in ("ORM (previous)", "upsert, 2 transactions", "upsert, 1 transaction"):
+        results = _run(mode, args.users, args.rtt_ms / 1000)
+        line = ", ".join(f"{phase} {mean * 1000:.2f} ms ({trips:.1f} round-trips)"
+                         for phase, (mean, trips) in results.items())
+        print(f"{mode:>23}: {line}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""
+Cold vs. warm registration lookup (the DB part of /start, /help and /registro).
+
+Points modules.database at an in-memory SQLite with a simulated round-trip and
+compares chat_id_exists with an empty cache against repeated calls for the same users.
+
+    python -m benchmarks.registration_cache --users 500 --rtt-ms 2
+"""
+import argparse
+import statistics
+import time
+
+from modules import database
+from models.users_alma_models import User
+from benchmarks._sqlite import sqlite_engine, sqlite_sessionmaker
+
+
+def _timed(fn, ids):
+    samples = []
+    for chat_id in ids:
+        start = time.perf_counter()
+        fn(chat_id)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--rtt-ms", type=float, default=2.0)
+    args = parser.parse_args()
+
+    engine = sqlite_engine(latency=args.rtt_ms / 1000)
+    database.SessionUsersAlma = sqlite_sessionmaker(engine)
+    session = database.SessionUsersAlma()
+    # La mitad registradas: el caché también guarda resultados negativos
+    session.add_all(User(telegram_id=str(i), username=f"u{i}", email=f"u{i}@x") for i in range(0, args.users, 2))
+    session.commit()
+    session.close()
+
+    ids = list(range(args.users))
+    database.registration_cache.clear()
+    cold = _timed(database.chat_id_exists, ids)
+    warm = _timed(database.chat_id_exists, ids)
+
+    for label, samples in (("cold", cold), ("warm", warm)):
+        print(f"{label}: mean={statistics.mean(samples) * 1e6:.1f}us p50={statistics.median(samples) * 1e6:.1f}us")
+    print("cache:", database.registration_cache_stats())
+
+
+if __name__ == "__main__":
+    main()
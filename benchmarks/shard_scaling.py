@@ -0,0 +1,136 @@
+"""
+Multi-process throughput of sharded webhook replicas (no Telegram, no network).
+
+Starts --workers replica processes. Each runs the aiohttp ingress, a
+ChatOrderedUpdateProcessor and a stub Bot API on localhost. Updates are
+spread round-robin across replicas, as a load balancer would, and each replica
+forwards the ones it does not own (crc32(chat_id) % workers). The handler
+sleeps --io-ms (DB/webhook wait) and/or spins --cpu-ms. Run with several worker
+counts to see the scaling:
+
+    python -m benchmarks.shard_scaling --workers 1 2 4 --updates 3000 --io-ms 20
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import time
+
+import aiohttp
+
+from benchmarks.ingress_load import SECRET, _free_port, _start_stub_bot_api, _synthetic_update
+
+WORKER_CONCURRENCY = 8
+
+
+def _replica(index, urls, port, io_ms, cpu_ms, concurrency, counter, ready):
+    asyncio.run(_serve_replica(index, urls, port, io_ms, cpu_ms, concurrency, counter, ready))
+
+
+async def _serve_replica(index, urls, port, io_ms, cpu_ms, concurrency, counter, ready):
+    from telegram import Update
+    from telegram.ext import Application, TypeHandler
+
+    from modules import ingress
+    from modules.sharding import ShardRouter
+    from modules.update_processor import ChatOrderedUpdateProcessor
+
+    api_port = _free_port()
+    stub = await _start_stub_bot_api(api_port)
+
+    async def handle(update, context):
+        if io_ms:
+            await asyncio.sleep(io_ms / 1000)
+        if cpu_ms:
+            end = time.perf_counter() + cpu_ms / 1000
+            while time.perf_counter() < end:
+                pass
+        with counter.get_lock():
+            counter.value += 1
+
+    application = (
+        Application.builder()
+        .token("1:bench")
+        .base_url(f"http://127.0.0.1:{api_port}/bot")
+        .update_queue(ingress.build_update_queue())
+        .concurrent_updates(ChatOrderedUpdateProcessor(concurrency))
+        .build()
+    )
+    application.add_handler(TypeHandler(Update, handle))
+    await application.initialize()
+    await application.start()
+    router = ShardRouter(urls, index)
+    await ingress.start_ingress(application, host="127.0.0.1", port=port, secret=SECRET, router=router)
+    ready.set()
+    await asyncio.Event().wait()
+
+
+async def _load(urls, updates, concurrency, chats):
+    headers = {"X-Telegram-Bot-Api-Secret-Token": SECRET}
+    ids = iter(range(updates))
+    statuses = {}
+
+    async def client(session):
+        for update_id in ids:
+            url = urls[update_id % len(urls)]
+            async with session.post(url, json=_synthetic_update(update_id, chats), headers=headers) as res:
+                statuses[res.status] = statuses.get(res.status, 0) + 1
+
+    async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=concurrency)) as session:
+        await asyncio.gather(*(client(session) for _ in range(concurrency)))
+    return statuses
+
+
+def _run(workers, args):
+    ctx = multiprocessing.get_context("spawn")
+    ports = [_free_port() for _ in range(workers)]
+    urls = [f"http://127.0.0.1:{port}/telegram" for port in ports]
+    counter = ctx.Value("i", 0)
+    procs = []
+    for index, port in enumerate(ports):
+        ready = ctx.Event()
+        proc = ctx.Process(
+            target=_replica,
+            args=(index, urls, port, args.io_ms, args.cpu_ms, args.worker_concurrency, counter, ready),
+            daemon=True,
+        )
+        proc.start()
+        procs.append((proc, ready))
+    try:
+        for _, ready in procs:
+            ready.wait(timeout=60)
+        start = time.perf_counter()
+        statuses = asyncio.run(_load(urls, args.updates, args.concurrency, args.chats))
+        while counter.value < statuses.get(200, 0) and time.perf_counter() - start < 120:
+            time.sleep(0.01)
+        elapsed = time.perf_counter() - start
+        return counter.value / elapsed, statuses
+    finally:
+        for proc, _ in procs:
+            proc.terminate()
+            proc.join()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--updates", type=int, default=3000)
+    parser.add_argument("--concurrency", type=int, default=64, help="concurrent HTTP clients")
+    parser.add_argument("--chats", type=int, default=500)
+    parser.add_argument("--io-ms", type=float, default=20.0)
+    parser.add_argument("--cpu-ms", type=float, default=0.0)
+    parser.add_argument("--worker-concurrency", type=int, default=WORKER_CONCURRENCY,
+                        help="UPDATE_CONCURRENCY of each replica")
+    args = parser.parse_args()
+
+    print(f"{os.cpu_count()} CPUs; handler io={args.io_ms}ms cpu={args.cpu_ms}ms, "
+          f"{args.worker_concurrency} concurrent updates per replica")
+    baseline = None
+    for workers in args.workers:
+        throughput, statuses = _run(workers, args)
+        baseline = baseline or throughput
+        print(f"{workers} replica(s): {throughput:,.0f} updates/s ({throughput / baseline:.1f}x) statuses={statuses}")
+
+
+if __name__ == "__main__":
+    main()
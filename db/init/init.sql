@@ -130,3 +130,18 @@ CREATE TABLE IF NOT EXISTS asistencia_registros (
     telegram_id_usado BIGINT,
     FOREIGN KEY (numero_empleado) REFERENCES vanity_hr.data_empleadas(numero_empleado)
 );
+
+CREATE TABLE IF NOT EXISTS asistencia_procesamiento (
+    proceso VARCHAR(50) PRIMARY KEY,
+    ultimo_id_asistencia INT NOT NULL DEFAULT 0,
+    actualizado_en DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS asistencia_recalculo (
+    id_recalculo INT AUTO_INCREMENT PRIMARY KEY,
+    numero_empleado VARCHAR(15) NOT NULL,
+    fecha_desde DATE NOT NULL,
+    fecha_hasta DATE,
+    motivo VARCHAR(50),
+    creado_en DATETIME DEFAULT CURRENT_TIMESTAMP
+);
@@ -0,0 +1,17 @@
+-- Índices para las búsquedas del bot; init.sql sólo tenía llaves primarias, únicas y foráneas.
+
+-- /start, /horario y el índice de /entrada buscan a la socia por su chat de Telegram
+CREATE INDEX ix_data_empleadas_telegram_chat_id ON vanity_hr.data_empleadas (telegram_chat_id);
+
+-- _save_horario_rows y ScheduleIndex.refresh leen los días de una socia por telegram_id
+CREATE INDEX ix_horario_empleadas_telegram_dia ON vanity_hr.horario_empleadas (telegram_id, dia_semana);
+
+-- Historial de una usuaria y reportes por rango de fechas
+CREATE INDEX ix_request_logs_telegram_created ON USERS_ALMA.request_logs (telegram_id, created_at);
+CREATE INDEX ix_request_logs_created_at ON USERS_ALMA.request_logs (created_at);
+
+-- /salida (UPDATE por numero_empleado + fecha) y los rangos pendientes del recálculo incremental;
+-- reemplaza en MySQL al índice implícito de la llave foránea sobre numero_empleado
+CREATE INDEX ix_asistencia_empleado_fecha ON vanity_attendance.asistencia_registros (numero_empleado, fecha);
+-- Checadas de hoy al cargar el índice y recálculo por rango de fechas
+CREATE INDEX ix_asistencia_fecha ON vanity_attendance.asistencia_registros (fecha);
@@ -0,0 +1,9 @@
+-- Resumen diario de request_logs por comando y usuaria (lo llena modules/log_retention.py);
+-- los reportes leen de aquí y los logs crudos se archivan pasado LOG_RETENTION_MONTHS.
+CREATE TABLE IF NOT EXISTS USERS_ALMA.request_log_daily (
+    fecha DATE NOT NULL,
+    command VARCHAR(100) NOT NULL,
+    telegram_id VARCHAR(50) NOT NULL,
+    total INT NOT NULL,
+    PRIMARY KEY (fecha, command, telegram_id)
+);
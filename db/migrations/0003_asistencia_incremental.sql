@@ -0,0 +1,16 @@
+-- Estado del recálculo incremental de modules/attendance_analytics.py: marca de agua por
+-- proceso y rangos invalidados por cambios de horario (mark_attendance_dirty).
+CREATE TABLE IF NOT EXISTS vanity_attendance.asistencia_procesamiento (
+    proceso VARCHAR(50) PRIMARY KEY,
+    ultimo_id_asistencia INT NOT NULL DEFAULT 0,
+    actualizado_en DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS vanity_attendance.asistencia_recalculo (
+    id_recalculo INT AUTO_INCREMENT PRIMARY KEY,
+    numero_empleado VARCHAR(15) NOT NULL,
+    fecha_desde DATE NOT NULL,
+    fecha_hasta DATE,
+    motivo VARCHAR(50),
+    creado_en DATETIME DEFAULT CURRENT_TIMESTAMP
+);
@@ -16,12 +16,21 @@ from telegram.constants import ParseMode
 from telegram.ext import Application, Defaults, CommandHandler, ContextTypes
 
 # --- IMPORTAR HABILIDADES ---
-from modules.flow_builder import load_flows
-from modules.logger import log_request
-from modules.database import chat_id_exists # Importar chat_id_exists
+from modules.flow_builder import load_flows, start_flow_watcher, stop_flow_watcher
+from modules.logger import log_request_async, flush_request_logs
+from modules.database import chat_id_exists_async, dispose_engines, run_db, shutdown_db_executor
+from modules.webhooks import close_webhook_client
+from modules.outbox import start_outbox_worker, stop_outbox_worker
+from modules.shared_state import start_state_purger, stop_state_purger
+from modules.persistence import build_persistence
+from modules.ingress import BOT_MODE, build_update_queue, run_webhook
+from modules.update_processor import ChatOrderedUpdateProcessor
+from modules.instrumentation import instrument_application, start_metrics_server, stop_metrics_server
+from modules.ai import init_ai
 from modules.ui import main_actions_keyboard
-from modules.onboarding import onboarding_handler
+from modules.onboarding import onboarding_handler, reconcile_registrations
 from modules.rh_requests import vacaciones_handler, permiso_handler
+from modules.attendance import entrada_handler, salida_handler, load_schedule_index, flush_attendance
 # from modules.finder import finder_handler (Si lo creas después)
 
 # Cargar links desde variables de entorno
@@ -32,6 +41,8 @@ LINK_AGENDA_ANDROID = os.getenv("LINK_AGENDA_ANDROID", "https://play.google.com/
 
 
 TOKEN = os.getenv("TELEGRAM_TOKEN")
+# Servidor de la Bot API (vacío = api.telegram.org); el harness de carga apunta a uno falso
+TELEGRAM_API_BASE_URL = os.getenv("TELEGRAM_API_BASE_URL", "")
 
 logging.basicConfig(format="%(asctime)s - %(name)s - %(levelname)s - %(message)s", level=logging.INFO)
 
@@ -49,7 +60,7 @@ def _guess_platform(update: Update) -> Optional[str]:
 async def links_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Muestra accesos rápidos a cursos, sitio y descargas."""
     user = update.effective_user
-    log_request(user.id, user.username, "links", update.message.text)
+    await log_request_async(user.id, user.username, "links", update.message.text)
 
     plataforma = _guess_platform(update)
     descarga_buttons = []
@@ -78,19 +89,35 @@ async def links_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
 async def menu_principal(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Muestra el menú de opciones de Vanessa"""
     user = update.effective_user
-    log_request(user.id, user.username, "start", update.message.text)
+    await log_request_async(user.id, user.username, "start", update.message.text)
     texto = (
         "👩‍💼 **Hola, soy Vanessa. ¿En qué puedo ayudarte hoy?**\n\n"
         "Toca un botón para continuar 👇"
     )
-    is_registered = chat_id_exists(user.id)
+    is_registered = await chat_id_exists_async(user.id)
     await update.message.reply_text(texto, reply_markup=main_actions_keyboard(is_registered=is_registered))
 
 async def post_init(application: Application):
+    # Worker que entrega los webhooks pendientes del outbox
+    start_outbox_worker()
+    # Recarga en caliente de conv-flows/ (sin reiniciar el contenedor)
+    start_flow_watcher(application)
+    # Borra las claves vencidas del estado compartido
+    start_state_purger()
+    # El cliente de Gemini se construye una sola vez
+    init_ai()
+    # Histogramas de latencia por handler en http://METRICS_HOST:METRICS_PORT/metrics
+    await start_metrics_server()
+    # Socias y horarios en memoria para /entrada y /salida
+    await run_db(load_schedule_index)
+    # Registros cuyo webhook quedó en el outbox pero no llegaron a la DB (caída a la mitad)
+    await run_db(reconcile_registrations)
     # Mantén los comandos rápidos disponibles en el menú de Telegram
     await application.bot.set_my_commands([
         BotCommand("start", "Mostrar menú principal"),
         # BotCommand("welcome", "Registro de nuevas empleadas"), # Se maneja dinámicamente
+        BotCommand("entrada", "Registrar mi entrada"),
+        BotCommand("salida", "Registrar mi salida"),
         BotCommand("horario", "Definir horario de trabajo"),
         BotCommand("vacaciones", "Solicitar vacaciones"),
         BotCommand("permiso", "Solicitar permiso por horas"),
@@ -98,16 +125,43 @@ async def post_init(application: Application):
         BotCommand("cancelar", "Cancelar flujo actual"),
     ])
 
-def main():
+async def post_stop(application: Application):
+    # Vacía la cola de logs antes de cerrar; lo pendiente del outbox se reintenta al arrancar
+    flush_request_logs()
+    # Las checadas encoladas se escriben antes de cerrar los pools
+    flush_attendance()
+    await stop_outbox_worker()
+    await stop_flow_watcher()
+    await stop_state_purger()
+    await stop_metrics_server()
+
+async def post_shutdown(application: Application):
+    # Espera a que terminen las escrituras pendientes en la DB y cierra los pools de DB y HTTP
+    shutdown_db_executor()
+    dispose_engines()
+    await close_webhook_client()
+
+def build_application(token: str = TOKEN, base_url: str = TELEGRAM_API_BASE_URL) -> Application:
+    """Builds the Application with every handler registered (used by main() and benchmarks/load_harness)."""
     # Configuración Global
     defaults = Defaults(parse_mode=ParseMode.MARKDOWN)
-    app = (
+    builder = (
         Application.builder()
-        .token(TOKEN)
+        .token(token)
         .defaults(defaults)
+        # Conversaciones y user_data sobreviven a reinicios (ver modules/persistence.py)
+        .persistence(build_persistence())
+        # Cola acotada: en modo webhook el ingreso responde 503 si se llena
+        .update_queue(build_update_queue())
+        # Chats en paralelo, cada chat en orden estricto (UPDATE_CONCURRENCY)
+        .concurrent_updates(ChatOrderedUpdateProcessor())
         .post_init(post_init)
-        .build()
+        .post_stop(post_stop)
+        .post_shutdown(post_shutdown)
     )
+    if base_url:
+        builder = builder.base_url(base_url)
+    app = builder.build()
 
     # --- REGISTRO DE HABILIDADES ---
     
@@ -123,12 +177,24 @@ def main():
     app.add_handler(onboarding_handler)
     app.add_handler(vacaciones_handler)
     app.add_handler(permiso_handler)
+    app.add_handler(entrada_handler)
+    app.add_handler(salida_handler)
         
     app.add_handler(CommandHandler("links", links_menu))
     # app.add_handler(finder_handler)
 
+    # Tiempo total, DB, webhooks y classify_reason por handler y estado (modules/instrumentation.py)
+    instrument_application(app)
+    return app
+
+def main():
+    app = build_application()
+
     print("🧠 Vanessa Bot Brain iniciada y lista para trabajar en todos los módulos.")
-    app.run_polling()
+    if BOT_MODE == "webhook":
+        run_webhook(app)
+    else:
+        app.run_polling()
 
 if __name__ == "__main__":
     main()
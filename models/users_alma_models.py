@@ -1,4 +1,4 @@
-from sqlalchemy import create_engine, Column, Integer, String, Enum, TIMESTAMP
+from sqlalchemy import create_engine, Column, Integer, String, Enum, TIMESTAMP, Date
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.sql import func
 from datetime import datetime
@@ -29,3 +29,22 @@ class User(Base):
     telegram_id = Column(String(50), unique=True)
     created_at = Column(TIMESTAMP, server_default=func.now())
     updated_at = Column(TIMESTAMP, server_default=func.now(), onupdate=func.now())
+
+class SchemaMigration(Base):
+    __tablename__ = 'schema_migrations'
+    __table_args__ = {'schema': 'USERS_ALMA'}
+
+    version = Column(Integer, primary_key=True, autoincrement=False)
+    name = Column(String(255), nullable=False)
+    checksum = Column(String(64), nullable=False)
+    applied_at = Column(TIMESTAMP, server_default=func.now())
+
+class RequestLogDaily(Base):
+    __tablename__ = 'request_log_daily'
+    __table_args__ = {'schema': 'USERS_ALMA'}
+
+    # '' en command/telegram_id cuando el log original venía vacío (forman parte de la llave)
+    fecha = Column(Date, primary_key=True)
+    command = Column(String(100), primary_key=True)
+    telegram_id = Column(String(50), primary_key=True)
+    total = Column(Integer, nullable=False)
@@ -1,8 +1,9 @@
-from sqlalchemy import create_engine, Column, Integer, String, Date, Time, BigInteger, ForeignKey
-from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy import create_engine, Column, Integer, String, Date, Time, BigInteger, ForeignKey, DateTime
 from sqlalchemy.orm import relationship
+from sqlalchemy.sql import func
 
-Base = declarative_base()
+# Comparte el registry con vanity_hr: la FK y la relación apuntan a DataEmpleadas
+from models.vanity_hr_models import Base
 
 class AsistenciaRegistros(Base):
     __tablename__ = 'asistencia_registros'
@@ -18,3 +19,23 @@ class AsistenciaRegistros(Base):
     sucursal_registro = Column(String(50))
     telegram_id_usado = Column(BigInteger)
     empleada = relationship("DataEmpleadas", backref="asistencia_registros")
+
+# Estado del cálculo incremental de asistencia (modules/attendance_analytics.py)
+class AsistenciaProcesamiento(Base):
+    __tablename__ = 'asistencia_procesamiento'
+    __table_args__ = {'schema': 'vanity_attendance'}
+
+    proceso = Column(String(50), primary_key=True)
+    ultimo_id_asistencia = Column(Integer, nullable=False, default=0)
+    actualizado_en = Column(DateTime, server_default=func.now(), onupdate=func.now())
+
+class AsistenciaRecalculo(Base):
+    __tablename__ = 'asistencia_recalculo'
+    __table_args__ = {'schema': 'vanity_attendance'}
+
+    id_recalculo = Column(Integer, primary_key=True, autoincrement=True)
+    numero_empleado = Column(String(15), nullable=False)
+    fecha_desde = Column(Date, nullable=False)
+    fecha_hasta = Column(Date)
+    motivo = Column(String(50))
+    creado_en = Column(DateTime, server_default=func.now())
@@ -1,6 +1,10 @@
+import asyncio
+import logging
 import os
 import importlib
 import importlib.metadata as importlib_metadata
+import threading
+from collections import OrderedDict
 
 # Compatibilidad para entornos donde packages_distributions no existe (p.ej. Python 3.9 con importlib recortado).
 if not hasattr(importlib_metadata, "packages_distributions"):
@@ -15,41 +19,172 @@ if not hasattr(importlib_metadata, "packages_distributions"):
 
 import google.generativeai as genai
 
+from modules.instrumentation import classify_reason_seconds, instrument_call
+from modules.metrics import StatsFamily, register
+from modules.reason_classifier import classify_local, get_local_classifier, normalize_reason
+
+VALID_CATEGORIES = ("EMERGENCIA", "MÉDICO", "TRÁMITE", "PERSONAL")
+DEFAULT_CATEGORY = "PERSONAL"
+
+AI_MODEL_NAME = os.getenv("AI_MODEL_NAME", "gemini-pro")
+AI_TIMEOUT = float(os.getenv("AI_TIMEOUT", "8"))
+AI_CACHE_SIZE = int(os.getenv("AI_CACHE_SIZE", "2000"))
+# Confianza mínima del clasificador local para no consultar a Gemini
+AI_LOCAL_THRESHOLD = float(os.getenv("AI_LOCAL_THRESHOLD", "0.8"))
+
+PROMPT_TEMPLATE = """
+Clasifica el siguiente motivo de solicitud de permiso en una de estas cuatro categorías: EMERGENCIA, MÉDICO, TRÁMITE, PERSONAL.
+Responde únicamente con la palabra de la categoría en mayúsculas.
+
+Motivo: "{text}"
+Categoría:
+"""
+
+_model = None
+_model_lock = threading.Lock()
+
+# Caché de motivos normalizados -> categoría
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "local": 0, "llm": 0, "errors": 0, "timeouts": 0}
+
+
+def init_ai():
+    """Configures the Gemini client and builds the model once (called at startup)."""
+    global _model
+    get_local_classifier()
+    with _model_lock:
+        if _model is None:
+            genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
+            _model = genai.GenerativeModel(AI_MODEL_NAME)
+    return _model
+
+
+def _count(key: str, amount: int = 1):
+    with _cache_lock:
+        _stats[key] += amount
+
+
+def _cache_get(key: str):
+    with _cache_lock:
+        category = _cache.get(key)
+        if category is None:
+            _stats["misses"] += 1
+            return None
+        _cache.move_to_end(key)
+        _stats["hits"] += 1
+        return category
+
+
+def _cache_set(key: str, category: str):
+    if AI_CACHE_SIZE <= 0:
+        return
+    with _cache_lock:
+        _cache[key] = category
+        _cache.move_to_end(key)
+        while len(_cache) > AI_CACHE_SIZE:
+            _cache.popitem(last=False)
+
+
+def _parse_category(response_text: str):
+    # Limpiar la respuesta para obtener solo la categoría
+    category = (response_text or "").strip().upper()
+    return category if category in VALID_CATEGORIES else None
+
+
+def _classify_local_tier(key: str, text: str):
+    """Offline first tier; returns (category, confident) and caches confident answers."""
+    try:
+        category, confidence = classify_local(text)
+    except Exception as e:
+        logging.error(f"Error en el clasificador local: {e}")
+        return None, False
+    if category and confidence >= AI_LOCAL_THRESHOLD:
+        _count("local")
+        _cache_set(key, category)
+        return category, True
+    return category, False
+
+
+def _answer_without_llm(text: str):
+    """Cache and local tier; returns (key, category, local_category) with category None when Gemini must answer."""
+    key = normalize_reason(text)
+    cached = _cache_get(key)
+    if cached:
+        return key, cached, cached
+    local_category, confident = _classify_local_tier(key, text)
+    if confident:
+        return key, local_category, local_category
+    _count("llm")
+    return key, None, local_category
+
+
+def _llm_answer(key: str, response_text: str, local_category) -> str:
+    category = _parse_category(response_text)
+    if not category:
+        return local_category or DEFAULT_CATEGORY  # Si la IA devuelve algo inesperado, se usa la mejor opción local
+    _cache_set(key, category)
+    return category
+
+
+def _llm_failed(counter: str, local_category) -> str:
+    _count(counter)
+    return local_category or DEFAULT_CATEGORY
+
+
+@instrument_call("classify_reason", classify_reason_seconds)
 def classify_reason(text: str) -> str:
     """
-    Clasifica el motivo de un permiso utilizando la API de Gemini.
+    Clasifica el motivo de un permiso: primero con el clasificador local y, si no hay
+    confianza suficiente, con la API de Gemini (bloqueante).
 
     Args:
         text: El motivo del permiso proporcionado por el usuario.
 
     Returns:
-        La categoría clasificada (EMERGENCIA, MÉDICO, TRÁMITE, PERSONAL) o "OTRO" si no se puede clasificar.
+        La categoría clasificada (EMERGENCIA, MÉDICO, TRÁMITE, PERSONAL); si la IA falla se usa
+        la mejor opción local y, en último caso, PERSONAL.
     """
+    key, category, local_category = _answer_without_llm(text)
+    if category:
+        return category
     try:
-        genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
+        response_text = init_ai().generate_content(PROMPT_TEMPLATE.format(text=text)).text
+    except Exception as e:
+        logging.error(f"Error al clasificar con IA: {e}")
+        return _llm_failed("errors", local_category)
+    return _llm_answer(key, response_text, local_category)
 
-        model = genai.GenerativeModel('gemini-pro')
 
-        prompt = f"""
-        Clasifica el siguiente motivo de solicitud de permiso en una de estas cuatro categorías: EMERGENCIA, MÉDICO, TRÁMITE, PERSONAL.
-        Responde únicamente con la palabra de la categoría en mayúsculas.
+@instrument_call("classify_reason", classify_reason_seconds)
+async def classify_reason_async(text: str, timeout: float = AI_TIMEOUT) -> str:
+    """Versión asíncrona de classify_reason con timeout duro; en error o timeout usa la categoría local."""
+    key, category, local_category = _answer_without_llm(text)
+    if category:
+        return category
+    try:
+        model = init_ai()
+        response = await asyncio.wait_for(
+            model.generate_content_async(PROMPT_TEMPLATE.format(text=text)),
+            timeout=timeout,
+        )
+        response_text = response.text
+    except asyncio.TimeoutError:
+        logging.warning(f"Clasificación con IA excedió {timeout}s; se usa la categoría local.")
+        return _llm_failed("timeouts", local_category)
+    except Exception as e:
+        logging.error(f"Error al clasificar con IA: {e}")
+        return _llm_failed("errors", local_category)
+    return _llm_answer(key, response_text, local_category)
 
-        Motivo: "{text}"
-        Categoría:
-        """
 
-        response = model.generate_content(prompt)
-        
-        # Limpiar la respuesta para obtener solo la categoría
-        category = response.text.strip().upper()
+def classifier_stats() -> dict:
+    """Cache size and counters per tier (the latency is vanessa_classify_reason_seconds)."""
+    with _cache_lock:
+        return {**_stats, "size": len(_cache)}
 
-        # Validar que la categoría sea una de las esperadas
-        valid_categories = ["EMERGENCIA", "MÉDICO", "TRÁMITE", "PERSONAL"]
-        if category in valid_categories:
-            return category
-        else:
-            return "PERSONAL" # Si la IA devuelve algo inesperado, se asigna a PERSONAL
 
-    except Exception as e:
-        print(f"Error al clasificar con IA: {e}")
-        return "PERSONAL" # En caso de error, se asigna a PERSONAL por defecto
+register(StatsFamily(
+    "vanessa_classifier", "classify_reason: cache size; hits, misses, local, llm, errors and timeouts.",
+    classifier_stats, counters=("hits", "misses", "local", "llm", "errors", "timeouts"),
+))
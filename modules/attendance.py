@@ -0,0 +1,473 @@
+import asyncio
+import json
+import logging
+import math
+import os
+import queue
+import threading
+import time
+from datetime import date, datetime
+from typing import NamedTuple, Optional
+
+from sqlalchemy import bindparam, insert, or_, select, update
+from telegram import Update
+from telegram.ext import CommandHandler, ContextTypes
+
+from models.vanity_attendance_models import AsistenciaRegistros
+from models.vanity_hr_models import DataEmpleadas, HorarioEmpleadas
+from modules.attendance_analytics import WEEKDAYS, _minutes
+from modules.database import SessionVanityAttendance, SessionVanityHr, run_db
+from modules.logger import BatchSink, log_request_async
+from modules.metrics import StatsFamily, register
+
+# --- CHECADAS (/entrada y /salida) ---
+# El handler no toca la DB: la socia y su horario salen de un índice en memoria
+# (telegram_id -> socia, horario por día) y la fila se escribe en segundo plano por lotes.
+# Con la hora pico de una sucursal (todas checando a las 10:00) la respuesta no espera a MySQL.
+ATTENDANCE_QUEUE_MAXSIZE = int(os.getenv("ATTENDANCE_QUEUE_MAXSIZE", "5000"))
+ATTENDANCE_BATCH_SIZE = int(os.getenv("ATTENDANCE_BATCH_SIZE", "200"))
+ATTENDANCE_FLUSH_INTERVAL = float(os.getenv("ATTENDANCE_FLUSH_INTERVAL", "0.5"))
+# Segundos que el handler espera lugar en la cola llena antes de escribir la checada directo
+ATTENDANCE_SUBMIT_WAIT = float(os.getenv("ATTENDANCE_SUBMIT_WAIT", "5"))
+# Intentos por lote antes de dejar las checadas en el log de errores
+ATTENDANCE_WRITE_RETRIES = int(os.getenv("ATTENDANCE_WRITE_RETRIES", "5"))
+
+_WEEKDAY_INDEX = {name: i for i, name in enumerate(WEEKDAYS)}
+ASISTENCIA = AsistenciaRegistros.__table__
+
+_SALIDA_UPDATE = (
+    update(ASISTENCIA)
+    .where(
+        ASISTENCIA.c.numero_empleado == bindparam("b_numero"),
+        ASISTENCIA.c.fecha == bindparam("b_fecha"),
+        ASISTENCIA.c.hora_salida_real.is_(None),
+    )
+    .values(hora_salida_real=bindparam("b_salida"), minutos_extra=bindparam("b_extra"))
+)
+# La /salida de ese día ya está guardada (el UPDATE de arriba no la encuentra)
+_SALIDA_STORED = (
+    select(ASISTENCIA.c.id_asistencia)
+    .where(
+        ASISTENCIA.c.numero_empleado == bindparam("b_numero"),
+        ASISTENCIA.c.fecha == bindparam("b_fecha"),
+        ASISTENCIA.c.hora_salida_real.is_not(None),
+    )
+    .limit(1)
+)
+
+
+class Socia(NamedTuple):
+    numero_empleado: str
+    sucursal: Optional[str]
+    # date.weekday() -> (hora_entrada_teorica, hora_salida_teorica)
+    horario: dict
+
+
+def _load_socias(telegram_id: Optional[int] = None) -> dict:
+    """telegram_id -> Socia for active socias (one socia when `telegram_id` is given). Blocking."""
+    session = SessionVanityHr()
+    try:
+        empleadas = select(DataEmpleadas.telegram_chat_id, DataEmpleadas.numero_empleado, DataEmpleadas.sucursal).where(
+            DataEmpleadas.telegram_chat_id.is_not(None),
+            or_(DataEmpleadas.estatus.is_(None), DataEmpleadas.estatus == "activo"),
+        )
+        horarios = select(
+            HorarioEmpleadas.telegram_id,
+            HorarioEmpleadas.dia_semana,
+            HorarioEmpleadas.hora_entrada_teorica,
+            HorarioEmpleadas.hora_salida_teorica,
+        )
+        if telegram_id is not None:
+            empleadas = empleadas.where(DataEmpleadas.telegram_chat_id == telegram_id)
+            horarios = horarios.where(HorarioEmpleadas.telegram_id == telegram_id)
+        socias = {
+            chat_id: Socia(numero_empleado, sucursal, {})
+            for chat_id, numero_empleado, sucursal in session.execute(empleadas)
+        }
+        for chat_id, dia_semana, entrada, salida in session.execute(horarios):
+            socia = socias.get(chat_id)
+            weekday = _WEEKDAY_INDEX.get((dia_semana or "").lower())
+            if socia is not None and weekday is not None and entrada and salida:
+                socia.horario[weekday] = (entrada, salida)
+        return socias
+    finally:
+        session.close()
+
+
+def _load_checadas(dia: date, numeros: Optional[list] = None) -> dict:
+    """numero_empleado -> [entrada, salida] already stored for `dia`. Blocking."""
+    session = SessionVanityAttendance()
+    try:
+        query = select(ASISTENCIA.c.numero_empleado, ASISTENCIA.c.hora_entrada_real, ASISTENCIA.c.hora_salida_real)
+        query = query.where(ASISTENCIA.c.fecha == dia)
+        if numeros is not None:
+            query = query.where(ASISTENCIA.c.numero_empleado.in_(numeros))
+        return {numero: [entrada, salida] for numero, entrada, salida in session.execute(query)}
+    finally:
+        session.close()
+
+
+class ScheduleIndex:
+    """In-memory socias/horarios keyed by telegram_id plus today's checadas per numero_empleado.
+
+    load() runs once at startup; refresh() reloads one socia (after /horario, or on a miss
+    for a socia registered after the load). Updates of a chat always land on the same
+    replica (sharding por chat_id), so each replica only needs its own copy.
+    """
+
+    def __init__(self):
+        self._socias = {}
+        self._checadas = {}
+        self._dia = None
+        self._lock = threading.Lock()
+        self.loaded = False
+
+    def load(self):
+        socias = _load_socias()
+        today = date.today()
+        checadas = _load_checadas(today)
+        with self._lock:
+            self._socias, self._checadas, self._dia = socias, checadas, today
+            self.loaded = True
+        logging.info(f"Attendance schedule index loaded: {len(socias)} socias, {len(checadas)} checadas today.")
+
+    def refresh(self, telegram_id: int) -> Optional[Socia]:
+        socia = _load_socias(telegram_id).get(telegram_id)
+        today = date.today()
+        checadas = _load_checadas(today, [socia.numero_empleado]) if socia else {}
+        with self._lock:
+            if socia is None:
+                self._socias.pop(telegram_id, None)
+            else:
+                self._socias[telegram_id] = socia
+                if self._dia == today and socia.numero_empleado not in self._checadas:
+                    self._checadas.update(checadas)
+        return socia
+
+    def get(self, telegram_id: int) -> Optional[Socia]:
+        return self._socias.get(telegram_id)
+
+    def checadas(self) -> dict:
+        """Today's checadas; the dict starts empty again when the date changes."""
+        today = date.today()
+        if self._dia != today:
+            with self._lock:
+                if self._dia != today:
+                    self._checadas, self._dia = {}, today
+        return self._checadas
+
+    def __len__(self):
+        return len(self._socias)
+
+
+class AttendanceWriter(BatchSink):
+    """Inserts /entrada rows and applies /salida updates in batches, retrying on DB errors.
+
+    Within a batch inserts go first, so a /salida normally finds the row of its /entrada.
+    When the batched UPDATE matches fewer rows than salidas, the batch is redone applying
+    them one by one, and a /salida without row is inserted on its own (see _apply_salida).
+    A full queue is not a loss: the handler waits ATTENDANCE_SUBMIT_WAIT seconds for
+    space and then writes that checada through run_db (write_now) instead.
+    """
+
+    name = "attendance-writer"
+
+    def __init__(self, session_factory, maxsize: int, batch_size: int, flush_interval: float,
+                 retries: int = ATTENDANCE_WRITE_RETRIES):
+        super().__init__(maxsize, batch_size, flush_interval)
+        self._session_factory = session_factory
+        self._retries = max(1, retries)
+        self.stats["overflow"] = 0
+        self.stats["unmatched"] = 0
+
+    def submit(self, item: tuple) -> bool:
+        if not self._thread:
+            self.start()
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            return False
+        self._count("queued")
+        return True
+
+    def _write(self, items: list):
+        inserts = [row for op, row in items if op == "insert"]
+        salidas = [row for op, row in items if op == "salida"]
+        for attempt in range(1, self._retries + 1):
+            session = self._session_factory()
+            try:
+                if inserts:
+                    session.execute(insert(ASISTENCIA), inserts)
+                if salidas and session.execute(_SALIDA_UPDATE, salidas).rowcount != len(salidas):
+                    # Alguna /salida no encontró su fila (o el driver no reporta el total): se
+                    # deshace el lote y se repite con las salidas una por una
+                    session.rollback()
+                    if inserts:
+                        session.execute(insert(ASISTENCIA), inserts)
+                    for row in salidas:
+                        self._apply_salida(session, row)
+                session.commit()
+                self._count("flushed", len(items))
+                self._count("batches")
+                return
+            except Exception as exc:
+                session.rollback()
+                logging.warning(f"Error saving {len(items)} checadas (attempt {attempt}/{self._retries}): {exc}")
+            finally:
+                session.close()
+            if attempt < self._retries:
+                time.sleep(min(30.0, 0.5 * 2 ** (attempt - 1)))
+        self._count("dropped", len(items))
+        # Queda completo en el log para recapturarlo a mano
+        logging.error(f"Checadas not saved after {self._retries} attempts: {json.dumps(items, default=str)}")
+
+    def write_now(self, items: list):
+        """Synchronous write (blocking; used through run_db when the queue stays full).
+
+        The /entrada of a /salida written here may still be queued, so a /salida whose
+        UPDATE matches no row is inserted as a row with only the salida instead of lost.
+        """
+        self._count("overflow", len(items))
+        inserts = [row for op, row in items if op == "insert"]
+        if inserts:
+            self._write([("insert", row) for row in inserts])
+        for op, row in items:
+            if op != "salida":
+                continue
+            session = self._session_factory()
+            try:
+                self._apply_salida(session, row)
+                session.commit()
+                self._count("flushed")
+            except Exception as exc:
+                session.rollback()
+                self._count("dropped")
+                logging.error(f"Checada not saved: {json.dumps(row, default=str)}: {exc}")
+            finally:
+                session.close()
+
+
+    def _apply_salida(self, session, row: dict):
+        """UPDATE of one /salida; when no row matches it inserts a salida-only row, unless that
+        day's salida is already stored (a repeated /salida is logged and ignored)."""
+        if session.execute(_SALIDA_UPDATE, row).rowcount:
+            return
+        self._count("unmatched")
+        if session.execute(_SALIDA_STORED, row).first() is not None:
+            logging.warning(f"Salida already stored, ignored: {json.dumps(row, default=str)}")
+            return
+        logging.warning(f"Salida without its entrada row, stored on its own: {json.dumps(row, default=str)}")
+        session.execute(insert(ASISTENCIA).values(_salida_row(row)))
+
+
+def _salida_row(params: dict) -> dict:
+    """asistencia_registros row for a /salida without a stored /entrada."""
+    return {
+        "numero_empleado": params["b_numero"],
+        "fecha": params["b_fecha"],
+        "hora_entrada_real": None,
+        "hora_salida_real": params["b_salida"],
+        "minutos_retraso": None,
+        "minutos_extra": params["b_extra"],
+        "sucursal_registro": params["b_sucursal"],
+        "telegram_id_usado": params["b_telegram_id"],
+    }
+
+
+schedule_index = ScheduleIndex()
+_writer = (
+    AttendanceWriter(SessionVanityAttendance, ATTENDANCE_QUEUE_MAXSIZE, ATTENDANCE_BATCH_SIZE, ATTENDANCE_FLUSH_INTERVAL)
+    if SessionVanityAttendance else None
+)
+
+
+_index_lock = asyncio.Lock()
+
+
+def load_schedule_index():
+    """Preloads the index (blocking; called through run_db from post_init)."""
+    if not SessionVanityHr or not SessionVanityAttendance:
+        logging.warning("Attendance databases are not configured; /entrada and /salida are disabled.")
+        return
+    try:
+        schedule_index.load()
+    except Exception as exc:
+        # Sin índice las checadas se rechazan; la siguiente lo vuelve a intentar
+        logging.error(f"Could not preload the attendance schedule index: {exc}")
+
+
+def refresh_schedule_index(telegram_id: int):
+    """Reloads one socia after its horario changed (blocking; runs on the DB executor)."""
+    if not SessionVanityHr or not SessionVanityAttendance:
+        return
+    try:
+        schedule_index.refresh(telegram_id)
+    except Exception as exc:
+        logging.error(f"Could not refresh the attendance index for {telegram_id}: {exc}")
+
+
+def flush_attendance(timeout: float = 10.0):
+    """Writes every queued checada and stops the writer (called from Application post_stop)."""
+    if _writer:
+        _writer.stop(timeout)
+
+
+def attendance_stats() -> dict:
+    if not _writer:
+        return {"socias": len(schedule_index), "queued": 0, "flushed": 0, "dropped": 0, "overflow": 0,
+                "unmatched": 0, "pending": 0}
+    return {"socias": len(schedule_index), **_writer.snapshot(), "pending": _writer.pending()}
+
+
+register(StatsFamily(
+    "vanessa_attendance", "Check-in writer: socias indexed and pending rows; queued, flushed, dropped, batches, overflow, unmatched salidas.",
+    attendance_stats, counters=("queued", "flushed", "dropped", "batches", "overflow", "unmatched"),
+))
+
+
+def _minutos_despues(real, teorica) -> int:
+    """Whole minutes `real` is past `teorica` (0 if earlier); same rule as attendance_analytics."""
+    return max(0, math.floor(_minutes(real) - _minutes(teorica)))
+
+
+async def _submit(item: tuple):
+    # Se espera lugar en la cola en vez de escribir directo: una /salida escrita antes que
+    # su /entrada encolada no encontraría la fila
+    deadline = time.monotonic() + ATTENDANCE_SUBMIT_WAIT
+    while not _writer.submit(item):
+        if time.monotonic() >= deadline:
+            await run_db(_writer.write_now, [item])
+            return
+        await asyncio.sleep(0.05)
+
+
+async def _index_ready(update: Update) -> bool:
+    """Loads the index if the startup preload failed; without it a duplicate /entrada would pass."""
+    if not schedule_index.loaded:
+        async with _index_lock:
+            if not schedule_index.loaded:
+                await run_db(load_schedule_index)
+    if not schedule_index.loaded:
+        await update.message.reply_text("⚠️ El registro de asistencia no está disponible por ahora.")
+        return False
+    return True
+
+
+async def _socia_actual(update: Update) -> Optional[Socia]:
+    user = update.effective_user
+    socia = schedule_index.get(user.id)
+    if socia is None:
+        # Registrada después de cargar el índice
+        socia = await run_db(schedule_index.refresh, user.id)
+    if socia is None:
+        await update.message.reply_text(
+            "⚠️ No encontré tu registro como colaboradora. Completa tu registro con /registro y vuelve a intentarlo."
+        )
+    return socia
+
+
+def _hora(value) -> str:
+    return value.strftime("%H:%M")
+
+
+async def entrada(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """/entrada: registra la hora de llegada de hoy."""
+    user = update.effective_user
+    await log_request_async(user.id, user.username, "entrada", update.message.text)
+    if not _writer:
+        await update.message.reply_text("⚠️ El registro de asistencia no está disponible por ahora.")
+        return
+    if not await _index_ready(update):
+        return
+    socia = await _socia_actual(update)
+    if socia is None:
+        return
+
+    ahora = datetime.now().replace(microsecond=0)
+    checadas = schedule_index.checadas()
+    previa = checadas.get(socia.numero_empleado)
+    if previa is not None:
+        hora = f" a las {_hora(previa[0])}" if previa[0] else ""
+        await update.message.reply_text(f"Ya tenías tu entrada de hoy registrada{hora}. 👍")
+        return
+
+    horario = socia.horario.get(ahora.weekday())
+    retraso = _minutos_despues(ahora.time(), horario[0]) if horario else None
+    checadas[socia.numero_empleado] = [ahora.time(), None]
+    await _submit(("insert", {
+        "numero_empleado": socia.numero_empleado,
+        "fecha": ahora.date(),
+        "hora_entrada_real": ahora.time(),
+        "hora_salida_real": None,
+        "minutos_retraso": retraso,
+        "minutos_extra": None,
+        "sucursal_registro": socia.sucursal,
+        "telegram_id_usado": user.id,
+    }))
+
+    texto = f"✅ Entrada registrada a las {_hora(ahora)}."
+    if horario is None:
+        texto += "\nNo tienes horario para hoy; puedes definirlo con /horario."
+    elif retraso:
+        texto += f"\nTu horario de entrada es a las {_hora(horario[0])}: llegaste {retraso} min tarde."
+    else:
+        texto += " ¡Llegaste a tiempo! 🙌"
+    await update.message.reply_text(texto)
+
+
+async def salida(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """/salida: registra la hora de salida de hoy."""
+    user = update.effective_user
+    await log_request_async(user.id, user.username, "salida", update.message.text)
+    if not _writer:
+        await update.message.reply_text("⚠️ El registro de asistencia no está disponible por ahora.")
+        return
+    if not await _index_ready(update):
+        return
+    socia = await _socia_actual(update)
+    if socia is None:
+        return
+
+    ahora = datetime.now().replace(microsecond=0)
+    checadas = schedule_index.checadas()
+    previa = checadas.get(socia.numero_empleado)
+    if previa is not None and previa[1] is not None:
+        await update.message.reply_text(f"Ya tenías tu salida de hoy registrada a las {_hora(previa[1])}. 👍")
+        return
+
+    horario = socia.horario.get(ahora.weekday())
+    extra = _minutos_despues(ahora.time(), horario[1]) if horario else None
+    if previa is None:
+        # Sin entrada: se guarda la fila sólo con la salida
+        checadas[socia.numero_empleado] = [None, ahora.time()]
+        await _submit(("insert", {
+            "numero_empleado": socia.numero_empleado,
+            "fecha": ahora.date(),
+            "hora_entrada_real": None,
+            "hora_salida_real": ahora.time(),
+            "minutos_retraso": None,
+            "minutos_extra": extra,
+            "sucursal_registro": socia.sucursal,
+            "telegram_id_usado": user.id,
+        }))
+    else:
+        previa[1] = ahora.time()
+        await _submit(("salida", {
+            "b_numero": socia.numero_empleado,
+            "b_fecha": ahora.date(),
+            "b_salida": ahora.time(),
+            "b_extra": extra,
+            "b_sucursal": socia.sucursal,
+            "b_telegram_id": user.id,
+        }))
+
+    texto = f"👋 Salida registrada a las {_hora(ahora)}."
+    if previa is None:
+        texto += "\nNo encontré tu entrada de hoy; avísale a tu gerente si sí la hiciste."
+    if extra:
+        texto += f"\nTiempo extra: {extra} min."
+    await update.message.reply_text(texto)
+
+
+entrada_handler = CommandHandler("entrada", entrada)
+salida_handler = CommandHandler("salida", salida)
@@ -1,15 +1,149 @@
+import asyncio
+import contextvars
+import functools
 import logging
 import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, date
-from sqlalchemy import create_engine
+from typing import Optional
+from sqlalchemy import case, create_engine, event, func, insert, literal, select, update
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import DisconnectionError
+from sqlalchemy.dialects.mysql import TINYINT
+from sqlalchemy.ext.compiler import compiles
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool
 from models.users_alma_models import Base as BaseUsersAlma, User
 from models.vanity_hr_models import Base as BaseVanityHr, DataEmpleadas, Vacaciones, Permisos, HorarioEmpleadas
-from models.vanity_attendance_models import Base as BaseVanityAttendance, AsistenciaRegistros
+from models.vanity_attendance_models import Base as BaseVanityAttendance, AsistenciaRegistros, AsistenciaRecalculo
+from modules.instrumentation import instrument_engine
+from modules.metrics import GaugeFamily, HistogramFamily, StatsFamily, register
+from modules.shared_state import shared_state_backend
 
 
 # --- DATABASE (MySQL) SETUP ---
-def _build_engine(db_name_env_var):
+# DATABASE_URL (opcional) reemplaza las tres conexiones MySQL por un solo engine que sirve
+# los tres esquemas. Con sqlite:///ruta cada esquema se adjunta (ATTACH) como ruta.<esquema>:
+# lo usan el harness de carga y las pruebas locales sin contenedor de MySQL.
+DATABASE_URL = os.getenv("DATABASE_URL", "")
+SCHEMAS = ("USERS_ALMA", "vanity_hr", "vanity_attendance")
+# Los tres esquemas viven en el mismo servidor y los modelos llevan el esquema en la tabla:
+# con DB_SHARED_ENGINE=true un solo engine (un solo pool) atiende a las tres bases.
+DB_SHARED_ENGINE = os.getenv("DB_SHARED_ENGINE", "false").strip().lower() in ("1", "true", "yes")
+
+# Variable con el nombre de cada base; el pool se ajusta con DB_<CLAVE>_POOL_SIZE etc.
+# y, si no está definida, con la global DB_POOL_SIZE.
+DATABASES = {
+    "USERS_ALMA": "MYSQL_DATABASE_USERS_ALMA",
+    "VANITY_HR": "MYSQL_DATABASE_VANITY_HR",
+    "VANITY_ATTENDANCE": "MYSQL_DATABASE_VANITY_ATTENDANCE",
+}
+SHARED_KEY = "SHARED"
+PRE_PING_STRATEGIES = ("always", "idle", "never")
+
+pool_checkout_seconds = register(HistogramFamily(
+    "vanessa_db_pool_checkout_seconds",
+    "Time waiting for a pooled connection (includes connecting and pre-ping).",
+    ("database",),
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0, 5.0, 30.0),
+))
+
+
+@compiles(TINYINT, "sqlite")
+def _tinyint_sqlite(_type, _compiler, **_kw):
+    return "INTEGER"
+
+
+def _pool_setting(key: str, name: str, default: str) -> str:
+    return os.getenv(f"DB_{key}_{name}") or os.getenv(f"DB_{name}") or default
+
+
+def _pool_options(key: str) -> dict:
+    return {
+        "pool_size": int(_pool_setting(key, "POOL_SIZE", "5")),
+        "max_overflow": int(_pool_setting(key, "MAX_OVERFLOW", "10")),
+        "pool_timeout": float(_pool_setting(key, "POOL_TIMEOUT", "30")),
+        # Debe ser menor que wait_timeout de MySQL para no heredar conexiones cerradas
+        "pool_recycle": int(_pool_setting(key, "POOL_RECYCLE", "3600")),
+    }
+
+
+class _MeteredQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waited."""
+
+    database = ""
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            return super().connect()
+        finally:
+            pool_checkout_seconds.observe(time.perf_counter() - start, self.database)
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.database = self.database
+        return pool
+
+
+def _install_pre_ping(engine, strategy: str, idle_seconds: float):
+    """`always` pings on every checkout; `idle` only when the connection sat unused > idle_seconds."""
+    if strategy != "idle":
+        return
+
+    @event.listens_for(engine, "checkin")
+    def _checkin(dbapi_conn, record):
+        record.info["checked_in_at"] = time.monotonic()
+
+    @event.listens_for(engine, "checkout")
+    def _checkout(dbapi_conn, record, proxy):
+        checked_in_at = record.info.get("checked_in_at")
+        if checked_in_at is None or time.monotonic() - checked_in_at < idle_seconds:
+            return
+        try:
+            cursor = dbapi_conn.cursor()
+            cursor.execute("SELECT 1")
+            cursor.fetchall()
+            cursor.close()
+        except Exception as exc:
+            # El pool descarta la conexión y reintenta con una nueva
+            raise DisconnectionError() from exc
+
+
+def _create_sqlite_engine(url: str):
+    engine = create_engine(url, connect_args={"check_same_thread": False, "timeout": 30})
+    path = engine.url.database
+
+    @event.listens_for(engine, "connect")
+    def _attach_schemas(dbapi_conn, _record):
+        for schema in SCHEMAS:
+            target = f"{path}.{schema}" if path and path != ":memory:" else ":memory:"
+            dbapi_conn.execute(f"ATTACH DATABASE '{target}' AS {schema}")
+
+    return engine
+
+
+def _create_pooled_engine(key: str, url: str):
+    strategy = _pool_setting(key, "POOL_PRE_PING", "idle").strip().lower()
+    if strategy not in PRE_PING_STRATEGIES:
+        logging.warning(f"Unknown DB_POOL_PRE_PING '{strategy}' for {key}; using 'idle'.")
+        strategy = "idle"
+    engine = create_engine(
+        url,
+        poolclass=_MeteredQueuePool,
+        pool_pre_ping=strategy == "always",
+        **_pool_options(key),
+    )
+    engine.pool.database = key
+    _install_pre_ping(engine, strategy, float(_pool_setting(key, "POOL_PING_IDLE", "30")))
+    return engine
+
+
+def _mysql_url(db_name_env_var: str) -> Optional[str]:
     user = os.getenv("MYSQL_USER")
     password = os.getenv("MYSQL_PASSWORD")
     db_name = os.getenv(db_name_env_var)
@@ -18,23 +152,262 @@ def _build_engine(db_name_env_var):
     if not all([user, password, db_name]):
         logging.warning(f"Database connection disabled: missing environment variables for {db_name_env_var}.")
         return None
+    return f"mysql+mysqlconnector://{user}:{password}@{host}:3306/{db_name}"
+
+
+class LazyEngine:
+    """Engine built on first use: importing a module never creates pools or connections."""
+
+    def __init__(self, key: str, url: Optional[str]):
+        self.key = key
+        self.url = url
+        self._engine = None
+        self._lock = threading.Lock()
+
+    def __bool__(self) -> bool:
+        return self.url is not None
+
+    @property
+    def created(self) -> bool:
+        return self._engine is not None
+
+    def get(self):
+        if self._engine is None:
+            with self._lock:
+                if self._engine is None:
+                    if self.url is None:
+                        raise RuntimeError(f"Database {self.key} is not configured.")
+                    if self.url.startswith("sqlite"):
+                        engine = _create_sqlite_engine(self.url)
+                    else:
+                        engine = _create_pooled_engine(self.key, self.url)
+                    self._engine = instrument_engine(engine)
+                    logging.info(f"Database engine {self.key} created ({engine.pool.__class__.__name__}).")
+        return self._engine
+
+    def dispose(self):
+        with self._lock:
+            if self._engine is not None:
+                self._engine.dispose()
 
+
+class LazySessionFactory:
+    """sessionmaker stand-in: falsy when its database is not configured, binds on the first call."""
+
+    def __init__(self, engine: LazyEngine):
+        self.engine = engine
+        self._maker = None
+
+    def __bool__(self) -> bool:
+        return bool(self.engine)
+
+    def __call__(self, **kwargs):
+        if self._maker is None:
+            self._maker = sessionmaker(autocommit=False, autoflush=False, bind=self.engine.get())
+        return self._maker(**kwargs)
+
+
+# Create engines for each database (lazily)
+if DATABASE_URL:
+    engine_users_alma = engine_vanity_hr = engine_vanity_attendance = LazyEngine(SHARED_KEY, DATABASE_URL)
+elif DB_SHARED_ENGINE:
+    # La base por defecto de la conexión es USERS_ALMA; las demás se alcanzan por esquema
+    engine_users_alma = engine_vanity_hr = engine_vanity_attendance = LazyEngine(
+        SHARED_KEY, _mysql_url(DATABASES["USERS_ALMA"])
+    )
+else:
+    engine_users_alma = LazyEngine("USERS_ALMA", _mysql_url(DATABASES["USERS_ALMA"]))
+    engine_vanity_hr = LazyEngine("VANITY_HR", _mysql_url(DATABASES["VANITY_HR"]))
+    engine_vanity_attendance = LazyEngine("VANITY_ATTENDANCE", _mysql_url(DATABASES["VANITY_ATTENDANCE"]))
+
+# Create sessions for each database
+SessionUsersAlma = LazySessionFactory(engine_users_alma)
+SessionVanityHr = LazySessionFactory(engine_vanity_hr)
+SessionVanityAttendance = LazySessionFactory(engine_vanity_attendance)
+
+def _lazy_engines() -> dict:
+    """Distinct configured engines by key (the shared engine appears once)."""
+    engines = {}
+    for lazy in (engine_users_alma, engine_vanity_hr, engine_vanity_attendance):
+        if lazy:
+            engines[lazy.key] = lazy
+    return engines
+
+def get_engines() -> dict:
+    """Configured SQLAlchemy engines by key, creating them if needed."""
+    return {key: lazy.get() for key, lazy in _lazy_engines().items()}
+
+def create_all_tables(migrate: bool = True):
+    """Creates every model table on the configured engines (local SQLite / fresh databases).
+
+    The models mirror db/init/init.sql; the indexes and later changes of db/migrations
+    are applied on top unless `migrate` is False.
+    """
+    for lazy, base in (
+        (engine_users_alma, BaseUsersAlma),
+        (engine_vanity_hr, BaseVanityHr),
+        (engine_vanity_attendance, BaseVanityAttendance),
+    ):
+        if lazy:
+            base.metadata.create_all(lazy.get())
+    if migrate and engine_users_alma:
+        # Import diferido: modules.migrations importa este módulo
+        from modules.migrations import apply_migrations
+        apply_migrations(engine_users_alma.get())
+
+def pool_stats() -> dict:
+    """Pool occupancy per created engine: size, checked-out (in use), idle and overflow."""
+    stats = {}
+    for key, lazy in _lazy_engines().items():
+        if not lazy.created:
+            continue
+        pool = lazy.get().pool
+        if isinstance(pool, QueuePool):
+            stats[key] = {
+                "size": pool.size(),
+                "in_use": pool.checkedout(),
+                "idle": pool.checkedin(),
+                "overflow": max(0, pool.overflow()),
+            }
+    return stats
+
+def _pool_gauge_values() -> dict:
+    return {(key, state): value for key, values in pool_stats().items() for state, value in values.items()}
+
+register(GaugeFamily(
+    "vanessa_db_pool_connections",
+    "Pooled connections per engine by state (size, in_use, idle, overflow).",
+    ("database", "state"),
+    _pool_gauge_values,
+))
+
+def dispose_engines():
+    """Closes every pooled connection (called on application shutdown)."""
+    for lazy in _lazy_engines().values():
+        lazy.dispose()
+
+# --- ASYNC ACCESS ---
+# SQLAlchemy + mysql-connector are blocking; handlers offload every DB call to a bounded
+# thread pool so a slow query for one user does not stall the event loop for everyone else.
+# Every data-access function has an *_async twin at the end of this module. Setup and
+# teardown (create_all_tables, dispose_engines, shutdown_db_executor) and the in-memory
+# stats (pool_stats, registration_cache_stats) stay sync: they never run inside a handler.
+DB_EXECUTOR_WORKERS = int(os.getenv("DB_EXECUTOR_WORKERS", "8"))
+_db_executor = ThreadPoolExecutor(max_workers=DB_EXECUTOR_WORKERS, thread_name_prefix="db")
+
+async def run_db(func, *args, **kwargs):
+    """Runs a blocking DB callable on the DB executor and awaits its result."""
+    loop = asyncio.get_running_loop()
+    # run_in_executor no propaga contextvars: se copian para que el tiempo de DB se atribuya al handler
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(_db_executor, functools.partial(context.run, func, *args, **kwargs))
+
+def shutdown_db_executor(wait: bool = True):
+    """Waits for pending DB work and stops the executor (called on application shutdown)."""
+    _db_executor.shutdown(wait=wait)
+
+# --- REGISTRATION CACHE ---
+class RegistrationCache:
+    """Bounded LRU of telegram_id -> registered flag with TTLs for positive and negative results."""
+
+    def __init__(self, maxsize: int, ttl: float, negative_ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """Returns the cached flag or None when missing/expired."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] <= now:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key, value: bool):
+        ttl = self.ttl if value else self.negative_ttl
+        if self.maxsize <= 0 or ttl <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": (self.hits / total) if total else 0.0,
+            }
+
+registration_cache = RegistrationCache(
+    maxsize=int(os.getenv("REGISTRATION_CACHE_SIZE", "5000")),
+    ttl=float(os.getenv("REGISTRATION_CACHE_TTL", "600")),
+    negative_ttl=float(os.getenv("REGISTRATION_CACHE_NEGATIVE_TTL", "60")),
+)
+
+def registration_cache_stats() -> dict:
+    """Hit/miss counters of the chat_id_exists cache."""
+    return registration_cache.stats()
+
+register(StatsFamily(
+    "vanessa_registration_cache", "chat_id_exists cache: size and hit ratio; hits, misses and evictions.",
+    registration_cache_stats, counters=("hits", "misses", "evictions"),
+))
+
+# El LRU de arriba es por proceso; con varias réplicas cada chat cae siempre en la misma
+# (ver modules/sharding.py) y el backend compartido evita repetir la consulta entre réplicas.
+# Con STATE_BACKEND=memory no hay segundo nivel: sería una copia del LRU en el mismo proceso.
+def _shared_registration_get(key: str):
     try:
-        db_url = f"mysql+mysqlconnector://{user}:{password}@{host}:3306/{db_name}"
-        return create_engine(db_url, pool_pre_ping=True)
+        backend = shared_state_backend()
+        return backend.get(f"registered:{key}") if backend else None
     except Exception as exc:
-        logging.error(f"Could not create database engine for {db_name}: {exc}")
+        logging.error(f"Shared state read failed: {exc}")
         return None
 
-# Create engines for each database
-engine_users_alma = _build_engine("MYSQL_DATABASE_USERS_ALMA")
-engine_vanity_hr = _build_engine("MYSQL_DATABASE_VANITY_HR")
-engine_vanity_attendance = _build_engine("MYSQL_DATABASE_VANITY_ATTENDANCE")
+def _shared_registration_set(key: str, exists: bool):
+    ttl = registration_cache.ttl if exists else registration_cache.negative_ttl
+    if ttl <= 0:
+        return
+    try:
+        backend = shared_state_backend()
+        if backend:
+            backend.set(f"registered:{key}", exists, ttl=ttl)
+    except Exception as exc:
+        logging.error(f"Shared state write failed: {exc}")
 
-# Create sessions for each database
-SessionUsersAlma = sessionmaker(autocommit=False, autoflush=False, bind=engine_users_alma) if engine_users_alma else None
-SessionVanityHr = sessionmaker(autocommit=False, autoflush=False, bind=engine_vanity_hr) if engine_vanity_hr else None
-SessionVanityAttendance = sessionmaker(autocommit=False, autoflush=False, bind=engine_vanity_attendance) if engine_vanity_attendance else None
+def _shared_registration_invalidate(key: str):
+    try:
+        backend = shared_state_backend()
+        if backend:
+            backend.delete(f"registered:{key}")
+    except Exception as exc:
+        logging.error(f"Shared state delete failed: {exc}")
 
 # --- GOOGLE SHEETS SETUP (REMOVED) ---
 # Duplicate checking is now done via database.
@@ -107,14 +480,27 @@ def _references_with_padding(referencias: list) -> list:
     return refs[:3]
 
 def chat_id_exists(chat_id: int) -> bool:
-    """Checks if a Telegram chat_id already exists in the USERS_ALMA.users table."""
+    """Checks if a Telegram chat_id already exists in the USERS_ALMA.users table (cached)."""
     if not SessionUsersAlma:
         logging.warning("SessionUsersAlma not initialized. Cannot check if chat_id exists.")
         return False
-    
+
+    key = str(chat_id)
+    cached = registration_cache.get(key)
+    if cached is not None:
+        return cached
+
+    # Segundo nivel compartido entre réplicas (STATE_BACKEND)
+    shared = _shared_registration_get(key)
+    if shared is not None:
+        registration_cache.set(key, shared)
+        return shared
+
     session = SessionUsersAlma()
     try:
-        exists = session.query(User).filter(User.telegram_id == str(chat_id)).first() is not None
+        exists = session.query(User.id).filter(User.telegram_id == key).first() is not None
+        registration_cache.set(key, exists)
+        _shared_registration_set(key, exists)
         return exists
     except Exception as e:
         logging.error(f"Error checking if chat_id exists in DB: {e}")
@@ -122,6 +508,135 @@ def chat_id_exists(chat_id: int) -> bool:
     finally:
         session.close()
 
+# --- UPSERTS ---
+# Un INSERT ... ON DUPLICATE KEY UPDATE (MySQL) / ON CONFLICT DO UPDATE (SQLite) por tabla en
+# lugar de SELECT + INSERT/UPDATE con objetos ORM: un round-trip por tabla y sin identidad ORM.
+# Otros dialectos usan SELECT + INSERT/UPDATE (_generic_upsert).
+def _upsert_statement(dialect_name: str, table, row: Optional[dict], key: str, updates: dict):
+    """`updates` maps column -> fn(new) with `new[col]` the incoming value; returns the statement.
+
+    Without `row` the statement takes its values at execute time (executemany for bulk loads).
+    Returns None for dialects without a native upsert.
+    """
+    if dialect_name == "mysql":
+        stmt = mysql_insert(table)
+        stmt = stmt.values(row) if row is not None else stmt
+        # ON DUPLICATE KEY también salta por otras claves únicas (email, rfc, curp): sólo se
+        # actualiza si el conflicto es con la misma llave; la fila de otra persona queda intacta
+        # y _unwritten_rows detecta que la nuestra no se escribió.
+        same_row = table.c[key] == stmt.inserted[key]
+        return stmt.on_duplicate_key_update({
+            column: case((same_row, build(stmt.inserted)), else_=table.c[column])
+            for column, build in updates.items()
+        })
+    if dialect_name == "sqlite":
+        stmt = sqlite_insert(table)
+        stmt = stmt.values(row) if row is not None else stmt
+        return stmt.on_conflict_do_update(
+            index_elements=[table.c[key]],
+            set_={column: build(stmt.excluded) for column, build in updates.items()},
+        )
+    return None
+
+def _generic_upsert(session, table, row: dict, key: str, updates: dict):
+    """SELECT by key, then INSERT or UPDATE (dialects without a native upsert)."""
+    exists = session.execute(select(table.c[key]).where(table.c[key] == row[key])).first() is not None
+    if not exists:
+        session.execute(insert(table).values(row))
+        return
+    new = {column: literal(value, table.c[column].type) for column, value in row.items()}
+    session.execute(
+        update(table).where(table.c[key] == row[key])
+        .values({column: build(new) for column, build in updates.items()})
+    )
+
+def _same_value(stored, incoming) -> bool:
+    # Las colaciones de MySQL comparan sin mayúsculas ni espacios finales
+    return str(stored).rstrip().casefold() == str(incoming).rstrip().casefold()
+
+def _unwritten_rows(session, table, rows: list, key: str) -> list:
+    """Rows of a MySQL upsert that a unique-key clash with another row turned into a no-op.
+
+    A row was written if the row with its key exists and holds its non-empty values for
+    every unique column; otherwise another row owns one of those values.
+    """
+    if not rows or session.get_bind().dialect.name != "mysql":
+        return []
+    unique = [column.name for column in table.columns if column.unique and column.name != key]
+    stored = {
+        str(found[0]): found[1:]
+        for found in session.execute(
+            select(table.c[key], *(table.c[name] for name in unique))
+            .where(table.c[key].in_([row[key] for row in rows]))
+        )
+    }
+    unwritten = []
+    for row in rows:
+        values = stored.get(str(row[key]))
+        if values is None or any(
+            row.get(name) not in (None, "") and (value is None or not _same_value(value, row[name]))
+            for name, value in zip(unique, values)
+        ):
+            unwritten.append(row)
+    return unwritten
+
+def _upsert(session, table, row: dict, key: str, updates: dict):
+    stmt = _upsert_statement(session.get_bind().dialect.name, table, row, key, updates)
+    if stmt is None:
+        _generic_upsert(session, table, row, key, updates)
+        return
+    session.execute(stmt)
+    if _unwritten_rows(session, table, [row], key):
+        clashes = [column.name for column in table.columns if column.unique and column.name != key]
+        raise ValueError(f"{table.name}: {key}={row[key]} not written; one of {clashes} belongs to another row")
+
+def _keep_if_empty(column: str):
+    """New value unless it is NULL/empty, in which case the stored one is kept."""
+    return lambda new: func.coalesce(func.nullif(new[column], ""), User.__table__.c[column])
+
+_USER_UPDATES = {
+    "username": lambda new: new["username"],
+    "first_name": lambda new: new["first_name"],
+    "last_name": _keep_if_empty("last_name"),
+    "email": _keep_if_empty("email"),
+    "cell_phone": _keep_if_empty("cell_phone"),
+    "updated_at": lambda new: func.now(),
+}
+
+def _upsert_user(session, row: dict):
+    _upsert(session, User.__table__, row, "telegram_id", _USER_UPDATES)
+
+def _empleada_updates(columns) -> dict:
+    return {column: (lambda new, c=column: new[c]) for column in columns if column != "numero_empleado"}
+
+def _upsert_empleada(session, payload: dict):
+    _upsert(session, DataEmpleadas.__table__, payload, "numero_empleado", _empleada_updates(payload))
+
+def upsert_empleadas(session, rows: list) -> list:
+    """Bulk upsert into vanity_hr.data_empleadas with one executemany (rows share the same keys).
+
+    Returns the rows that were not written because their rfc/curp belongs to another
+    employee (MySQL; SQLite and the generic path raise IntegrityError instead).
+    """
+    if not rows:
+        return []
+    table, updates = DataEmpleadas.__table__, _empleada_updates(rows[0])
+    stmt = _upsert_statement(session.get_bind().dialect.name, table, None, "numero_empleado", updates)
+    if stmt is None:
+        for row in rows:
+            _generic_upsert(session, table, row, "numero_empleado", updates)
+        return []
+    session.execute(stmt, rows)
+    return _unwritten_rows(session, table, rows, "numero_empleado")
+
+def _shares_engine(factory_a, factory_b) -> bool:
+    engine = getattr(factory_a, "engine", None)
+    return engine is not None and engine is getattr(factory_b, "engine", None)
+
+def _invalidate_registration(telegram_id):
+    registration_cache.invalidate(str(telegram_id))
+    _shared_registration_invalidate(str(telegram_id))
+
 def register_user(user_data: dict) -> bool:
     """
     Persists a new colaboradora across the USERS_ALMA.users and vanity_hr.data_empleadas tables.
@@ -151,34 +666,16 @@ def register_user(user_data: dict) -> bool:
         return False
 
     # --- USERS_ALMA.users ---
-    session_users = SessionUsersAlma()
-    try:
-        user_record = session_users.query(User).filter(User.telegram_id == str(telegram_id)).first()
-        if user_record:
-            user_record.username = metadata.get("telegram_user") or meta.get("username")
-            user_record.first_name = candidato.get("nombre_preferido") or meta.get("first_name")
-            apellidos = f"{candidato.get('apellido_paterno', '')} {candidato.get('apellido_materno', '')}".strip()
-            user_record.last_name = apellidos or user_record.last_name
-            user_record.email = contacto.get("email") or user_record.email
-            user_record.cell_phone = contacto.get("celular") or user_record.cell_phone
-        else:
-            user_record = User(
-                telegram_id=str(telegram_id),
-                username=metadata.get("telegram_user") or meta.get("username"),
-                first_name=candidato.get("nombre_preferido") or meta.get("first_name"),
-                last_name=f"{candidato.get('apellido_paterno', '')} {candidato.get('apellido_materno', '')}".strip(),
-                email=contacto.get("email"),
-                cell_phone=contacto.get("celular"),
-                role='user'
-            )
-            session_users.add(user_record)
-        session_users.commit()
-    except Exception as exc:
-        session_users.rollback()
-        logging.error(f"Error persisting user in USERS_ALMA: {exc}")
-        return False
-    finally:
-        session_users.close()
+    apellidos = f"{candidato.get('apellido_paterno', '')} {candidato.get('apellido_materno', '')}".strip()
+    user_row = {
+        "telegram_id": str(telegram_id),
+        "username": metadata.get("telegram_user") or meta.get("username"),
+        "first_name": candidato.get("nombre_preferido") or meta.get("first_name"),
+        "last_name": apellidos,
+        "email": contacto.get("email"),
+        "cell_phone": contacto.get("celular"),
+        "role": "user",
+    }
 
     # --- vanity_hr.data_empleadas ---
     numero_empleado = laboral.get("numero_empleado") or f"T{telegram_id}"
@@ -252,14 +749,38 @@ def register_user(user_data: dict) -> bool:
         "fecha_procesamiento": fecha_procesamiento
     }
 
+    # Mismo servidor y mismo engine (DATABASE_URL / DB_SHARED_ENGINE): una sola transacción
+    if _shares_engine(SessionUsersAlma, SessionVanityHr):
+        session = SessionUsersAlma()
+        try:
+            _upsert_user(session, user_row)
+            _upsert_empleada(session, empleada_payload)
+            session.commit()
+        except Exception as exc:
+            session.rollback()
+            logging.error(f"Error persisting colaboradora {telegram_id}: {exc}")
+            return False
+        finally:
+            session.close()
+        _invalidate_registration(telegram_id)
+        logging.info(f"User {telegram_id} registered in vanity_hr.data_empleadas as {numero_empleado}.")
+        return True
+
+    session_users = SessionUsersAlma()
+    try:
+        _upsert_user(session_users, user_row)
+        session_users.commit()
+    except Exception as exc:
+        session_users.rollback()
+        logging.error(f"Error persisting user in USERS_ALMA: {exc}")
+        return False
+    finally:
+        session_users.close()
+    _invalidate_registration(telegram_id)
+
     session_hr = SessionVanityHr()
     try:
-        existing = session_hr.get(DataEmpleadas, numero_empleado)
-        if existing:
-            for field, value in empleada_payload.items():
-                setattr(existing, field, value)
-        else:
-            session_hr.add(DataEmpleadas(**empleada_payload))
+        _upsert_empleada(session_hr, empleada_payload)
         session_hr.commit()
         logging.info(f"User {telegram_id} registered in vanity_hr.data_empleadas as {numero_empleado}.")
         return True
@@ -269,3 +790,47 @@ def register_user(user_data: dict) -> bool:
         return False
     finally:
         session_hr.close()
+
+def mark_attendance_dirty(numeros_empleado, fecha_desde: date, fecha_hasta: Optional[date] = None,
+                          motivo: str = "horario") -> bool:
+    """Queues (socia, date range) pairs for the incremental attendance recompute.
+
+    fecha_hasta None leaves the range open; attendance_analytics consumes the rows.
+    """
+    numeros = [n for n in dict.fromkeys(numeros_empleado) if n]
+    if not numeros:
+        return True
+    if not SessionVanityAttendance:
+        logging.warning("SessionVanityAttendance is not initialized. Attendance will not be recomputed.")
+        return False
+    session = SessionVanityAttendance()
+    try:
+        session.execute(AsistenciaRecalculo.__table__.insert(), [
+            {"numero_empleado": numero, "fecha_desde": fecha_desde, "fecha_hasta": fecha_hasta, "motivo": motivo}
+            for numero in numeros
+        ])
+        session.commit()
+        return True
+    except Exception as exc:
+        session.rollback()
+        logging.error(f"Error queuing attendance recompute for {numeros}: {exc}")
+        return False
+    finally:
+        session.close()
+
+async def chat_id_exists_async(chat_id: int) -> bool:
+    """Awaitable version of chat_id_exists."""
+    return await run_db(chat_id_exists, chat_id)
+
+async def register_user_async(user_data: dict) -> bool:
+    """Awaitable version of register_user."""
+    return await run_db(register_user, user_data)
+
+async def upsert_empleadas_async(session, rows: list) -> list:
+    """Awaitable version of upsert_empleadas; do not touch `session` until it returns."""
+    return await run_db(upsert_empleadas, session, rows)
+
+async def mark_attendance_dirty_async(numeros_empleado, fecha_desde: date, fecha_hasta: Optional[date] = None,
+                                      motivo: str = "horario") -> bool:
+    """Awaitable version of mark_attendance_dirty."""
+    return await run_db(mark_attendance_dirty, numeros_empleado, fecha_desde, fecha_hasta, motivo)
@@ -0,0 +1,321 @@
+"""
+Bulk import/export of vanity_hr.data_empleadas (CSV or JSONL, streamed).
+
+    python -m modules.employee_io import empleadas.csv --errors rechazadas.jsonl
+    python -m modules.employee_io export empleadas.jsonl
+
+Columns are the data_empleadas column names. Import normalizes like the onboarding
+(RFC/CURP, text, dates, full address), validates each chunk and upserts it with one
+executemany per chunk; export pages through the table by numero_empleado so memory stays flat.
+"""
+import argparse
+import csv
+import json
+import logging
+import os
+import sys
+import time
+from datetime import date, datetime
+from typing import Iterable, Iterator, Optional
+
+from sqlalchemy import Date, DateTime, Integer, String, select
+
+from models.vanity_hr_models import DataEmpleadas
+from modules.database import (
+    SessionVanityHr,
+    _build_full_address,
+    _parse_date,
+    _parse_datetime,
+    upsert_empleadas,
+)
+from modules.normalization import limpiar_texto_general, normalizar_id
+
+# Filas por transacción / executemany al importar y por lote del cursor al exportar
+EMPLOYEE_IO_CHUNK_SIZE = int(os.getenv("EMPLOYEE_IO_CHUNK_SIZE", "1000"))
+
+TABLE = DataEmpleadas.__table__
+COLUMNS = [column.name for column in TABLE.columns]
+_COLUMN_SET = frozenset(COLUMNS)
+_NUMERO_EMPLEADO_LENGTH = TABLE.c.numero_empleado.type.length
+_ID_COLUMNS = ("rfc", "curp")
+_DOMICILIO_KEYS = {
+    "calle": "domicilio_calle",
+    "num_ext": "domicilio_numero_exterior",
+    "num_int": "domicilio_numero_interior",
+    "colonia": "domicilio_colonia",
+    "cp": "domicilio_codigo_postal",
+    "ciudad": "domicilio_ciudad",
+    "estado": "domicilio_estado",
+}
+
+
+class RowError(ValueError):
+    pass
+
+
+def _detect_format(path: str, fmt: Optional[str]) -> str:
+    if fmt:
+        return fmt
+    return "jsonl" if path.lower().endswith((".jsonl", ".ndjson")) else "csv"
+
+
+def read_rows(path: str, fmt: Optional[str] = None) -> Iterator[dict]:
+    """Streams raw rows from a CSV (header = column names) or JSONL file."""
+    if _detect_format(path, fmt) == "jsonl":
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+    else:
+        # utf-8-sig: los CSV exportados desde Excel traen BOM
+        with open(path, encoding="utf-8-sig", newline="") as f:
+            yield from csv.DictReader(f)
+
+
+def _text(value) -> Optional[str]:
+    if value is None:
+        return None
+    text = str(value).strip()
+    return limpiar_texto_general(text) if text else None
+
+
+def _identifier(value) -> Optional[str]:
+    # Vacío se guarda como NULL: "N/A" repetido chocaría con el índice único
+    normalized = normalizar_id(str(value)) if value not in (None, "") else "N/A"
+    return None if normalized == "N/A" else normalized
+
+
+def _checked(parse, kind: str):
+    def convert(value):
+        if value in (None, ""):
+            return None
+        parsed = parse(value)
+        if parsed is None:
+            raise ValueError(f"invalid {kind} {value!r}")
+        return parsed
+    return convert
+
+
+def _integer(value) -> Optional[int]:
+    if value in (None, ""):
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"not an integer {value!r}")
+
+
+def _converter(column):
+    if isinstance(column.type, DateTime):
+        return _checked(_parse_datetime, "datetime")
+    if isinstance(column.type, Date):
+        return _checked(_parse_date, "date")
+    if isinstance(column.type, Integer):
+        return _integer
+    if column.name in _ID_COLUMNS:
+        return _identifier
+    return _text
+
+
+# (columna, conversión, longitud máxima) resueltos una vez y no por fila
+_FIELDS = [
+    (column.name, _converter(column), column.type.length if isinstance(column.type, String) else None)
+    for column in TABLE.columns
+    if column.name != "numero_empleado"
+]
+
+
+def normalize_row(raw: dict) -> dict:
+    """One data_empleadas row from a raw record; raises RowError when it cannot be stored."""
+    if not raw.keys() <= _COLUMN_SET:
+        unknown = sorted(set(raw) - _COLUMN_SET)
+        raise RowError(f"unknown columns: {', '.join(unknown)}")
+
+    numero_empleado = str(raw.get("numero_empleado") or "").strip()
+    if not numero_empleado:
+        raise RowError("numero_empleado is required")
+    if len(numero_empleado) > _NUMERO_EMPLEADO_LENGTH:
+        raise RowError(f"numero_empleado: longer than {_NUMERO_EMPLEADO_LENGTH} characters")
+
+    row = {"numero_empleado": numero_empleado}
+    for name, convert, _length in _FIELDS:
+        try:
+            row[name] = convert(raw.get(name))
+        except ValueError as exc:
+            raise RowError(f"{name}: {exc}")
+
+    if not row["domicilio_completo"]:
+        domicilio = {key: row[column] for key, column in _DOMICILIO_KEYS.items()}
+        row["domicilio_completo"] = _build_full_address(domicilio) or None
+    if not row["nombre_completo"]:
+        partes = [row["nombre"], row["apellido_paterno"], row["apellido_materno"]]
+        row["nombre_completo"] = " ".join(filter(None, partes)) or None
+    row["estatus"] = row["estatus"] or "activo"
+    row["origen_registro"] = row["origen_registro"] or "importacion"
+    row["fecha_procesamiento"] = row["fecha_procesamiento"] or datetime.utcnow()
+
+    for name, _convert, length in _FIELDS:
+        value = row[name]
+        if length and value is not None and len(value) > length:
+            raise RowError(f"{name}: longer than {length} characters")
+    return row
+
+
+_CLASH_ERROR = "rfc/curp already belongs to another employee; row not written"
+
+
+def _write_chunk(rows: list, errors: list) -> int:
+    """Upserts a chunk in one transaction; if it fails, retries row by row to isolate the bad ones.
+
+    On MySQL a rfc/curp clash does not raise: upsert_empleadas returns those rows and
+    they are reported as rejected.
+    """
+    session = SessionVanityHr()
+    try:
+        unwritten = upsert_empleadas(session, rows)
+        session.commit()
+        for row in unwritten:
+            errors.append({"numero_empleado": row["numero_empleado"], "error": _CLASH_ERROR})
+        return len(rows) - len(unwritten)
+    except Exception as exc:
+        session.rollback()
+        logging.warning(f"Chunk of {len(rows)} rows failed ({exc.__class__.__name__}); retrying row by row.")
+    finally:
+        session.close()
+
+    written = 0
+    for row in rows:
+        session = SessionVanityHr()
+        try:
+            unwritten = upsert_empleadas(session, [row])
+            session.commit()
+            if unwritten:
+                errors.append({"numero_empleado": row["numero_empleado"], "error": _CLASH_ERROR})
+            else:
+                written += 1
+        except Exception as exc:
+            session.rollback()
+            errors.append({"numero_empleado": row["numero_empleado"], "error": str(exc.orig if hasattr(exc, "orig") else exc)})
+        finally:
+            session.close()
+    return written
+
+
+def import_empleadas(rows: Iterable[dict], chunk_size: int = EMPLOYEE_IO_CHUNK_SIZE, errors_out=None) -> dict:
+    """Validates and upserts `rows` in chunks; rejected rows go to `errors_out` (one JSON per line)."""
+    if not SessionVanityHr:
+        raise RuntimeError("vanity_hr database is not configured.")
+    stats = {"read": 0, "imported": 0, "rejected": 0, "chunks": 0}
+    chunk, errors = [], []
+    start = time.perf_counter()
+
+    def drain_errors():
+        stats["rejected"] += len(errors)
+        if errors_out is not None:
+            for error in errors:
+                errors_out.write(json.dumps(error, ensure_ascii=False) + "\n")
+        errors.clear()
+
+    def flush():
+        stats["imported"] += _write_chunk(chunk, errors)
+        stats["chunks"] += 1
+        chunk.clear()
+        drain_errors()
+
+    for line_no, raw in enumerate(rows, start=1):
+        stats["read"] += 1
+        try:
+            chunk.append(normalize_row(raw))
+        except RowError as exc:
+            errors.append({"line": line_no, "numero_empleado": raw.get("numero_empleado"), "error": str(exc)})
+        if len(chunk) >= chunk_size:
+            flush()
+        elif len(errors) >= chunk_size:
+            drain_errors()
+    if chunk:
+        flush()
+    drain_errors()
+    stats["seconds"] = time.perf_counter() - start
+    return stats
+
+
+def _serialize(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+
+def export_empleadas(path: str, fmt: Optional[str] = None, chunk_size: int = EMPLOYEE_IO_CHUNK_SIZE) -> dict:
+    """Streams data_empleadas to CSV/JSONL one page of `chunk_size` rows at a time.
+
+    Pages use keyset pagination on numero_empleado (WHERE numero_empleado > :last LIMIT n):
+    mysql-connector buffers a whole result set client-side, so yield_per would not bound
+    memory there.
+    """
+    if not SessionVanityHr:
+        raise RuntimeError("vanity_hr database is not configured.")
+    fmt = _detect_format(path, fmt)
+    stats = {"exported": 0}
+    start = time.perf_counter()
+    key = TABLE.c.numero_empleado
+    session = SessionVanityHr()
+    try:
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            writer = csv.writer(f) if fmt == "csv" else None
+            if writer is not None:
+                writer.writerow(COLUMNS)
+            last = None
+            while True:
+                query = select(TABLE).order_by(key).limit(chunk_size)
+                if last is not None:
+                    query = query.where(key > last)
+                page = session.execute(query).all()
+                if not page:
+                    break
+                for row in page:
+                    values = [_serialize(v) for v in row]
+                    if writer is not None:
+                        writer.writerow(["" if v is None else v for v in values])
+                    else:
+                        f.write(json.dumps(dict(zip(COLUMNS, values)), ensure_ascii=False) + "\n")
+                stats["exported"] += len(page)
+                last = page[-1].numero_empleado
+                # Cada página en su propia transacción corta
+                session.commit()
+    finally:
+        session.close()
+    stats["seconds"] = time.perf_counter() - start
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+    importer = sub.add_parser("import", help="load a CSV/JSONL file into data_empleadas")
+    importer.add_argument("path")
+    importer.add_argument("--errors", help="write rejected rows here (JSONL)")
+    exporter = sub.add_parser("export", help="dump data_empleadas to a CSV/JSONL file")
+    exporter.add_argument("path")
+    for p in (importer, exporter):
+        p.add_argument("--format", choices=("csv", "jsonl"))
+        p.add_argument("--chunk-size", type=int, default=EMPLOYEE_IO_CHUNK_SIZE)
+    args = parser.parse_args(argv)
+
+    if args.command == "import":
+        errors_out = open(args.errors, "w", encoding="utf-8") if args.errors else None
+        try:
+            stats = import_empleadas(read_rows(args.path, args.format), args.chunk_size, errors_out)
+        finally:
+            if errors_out is not None:
+                errors_out.close()
+        print(f"Imported {stats['imported']}/{stats['read']} rows ({stats['rejected']} rejected) "
+              f"in {stats['seconds']:.1f}s, {stats['chunks']} chunks.")
+        return 1 if stats["rejected"] else 0
+
+    stats = export_empleadas(args.path, args.format, args.chunk_size)
+    print(f"Exported {stats['exported']} rows in {stats['seconds']:.1f}s.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,26 +1,18 @@
 import os
-import json
 import logging
-import requests
-from datetime import datetime, time as time_cls
+from datetime import date, datetime, time as time_cls
 
-from modules.database import SessionVanityHr
+from modules.attendance import refresh_schedule_index
+from modules.database import SessionVanityHr, mark_attendance_dirty, run_db
+from modules.outbox import enqueue_webhooks_async
 from models.vanity_hr_models import HorarioEmpleadas, DataEmpleadas
 
-def _send_webhook(url: str, payload: dict):
-    """Sends a POST request to a webhook."""
+async def _send_webhook(url: str, payload: dict):
+    """Queues a POST to a webhook in the outbox (delivered in the background)."""
     if not url:
         logging.warning("No webhook URL provided.")
         return False
-    try:
-        headers = {"Content-Type": "application/json"}
-        res = requests.post(url, json=payload, headers=headers, timeout=20)
-        res.raise_for_status()
-        logging.info(f"Webhook sent successfully to: {url}")
-        return True
-    except Exception as e:
-        logging.error(f"Error sending webhook to {url}: {e}")
-        return False
+    return await enqueue_webhooks_async([url], payload, timeout=20) > 0
 
 def _convert_to_time(time_str: str):
     """Converts a string like '10:00 AM' to a datetime.time object."""
@@ -35,7 +27,7 @@ def _convert_to_time(time_str: str):
         logging.warning(f"Could not parse time string: {time_str}")
         return None
 
-def _finalize_horario(telegram_id: int, data: dict):
+async def _finalize_horario(telegram_id: int, data: dict):
     """Finalizes the 'horario' flow."""
     logging.info(f"Finalizing 'horario' flow for telegram_id: {telegram_id}")
 
@@ -82,9 +74,14 @@ def _finalize_horario(telegram_id: int, data: dict):
             k: (v.isoformat() if isinstance(v, time_cls) else v) for k, v in schedule_data.items()
         }
         json_payload["timestamp"] = datetime.now().isoformat()
-        _send_webhook(webhook_url, json_payload)
+        await _send_webhook(webhook_url, json_payload)
 
     # 3. Save to database (vanity_hr.horario_empleadas)
+    return await run_db(_save_horario_rows, telegram_id, rows_for_db)
+
+
+def _save_horario_rows(telegram_id: int, rows_for_db: list):
+    """Upserts one horario_empleadas row per day (blocking; runs on the DB executor)."""
     if not SessionVanityHr:
         logging.error("SessionVanityHr is not initialized. Cannot persist horarios.")
         return False
@@ -101,16 +98,20 @@ def _finalize_horario(telegram_id: int, data: dict):
             for row in session.query(HorarioEmpleadas).filter_by(telegram_id=telegram_id).all()
         }
 
+        changed = False
         for row in rows_for_db:
             dia = row["dia_semana"]
             entrada = row["hora_entrada"]
             salida = row["hora_salida"]
             existing = existing_rows.get(dia)
             if existing:
+                if (existing.hora_entrada_teorica, existing.hora_salida_teorica) != (entrada, salida):
+                    changed = True
                 existing.numero_empleado = numero_empleado or existing.numero_empleado
                 existing.hora_entrada_teorica = entrada
                 existing.hora_salida_teorica = salida
             else:
+                changed = True
                 session.add(
                     HorarioEmpleadas(
                         numero_empleado=numero_empleado,
@@ -122,7 +123,6 @@ def _finalize_horario(telegram_id: int, data: dict):
                 )
 
         session.commit()
-        return True
     except Exception as e:
         logging.error(f"Database error in _finalize_horario: {e}")
         session.rollback()
@@ -130,6 +130,15 @@ def _finalize_horario(telegram_id: int, data: dict):
     finally:
         session.close()
 
+    # El horario nuevo rige desde hoy: las checadas de hoy en adelante se recalculan en la
+    # siguiente corrida incremental; los días anteriores conservan su cálculo
+    if changed and numero_empleado:
+        mark_attendance_dirty([numero_empleado], date.today())
+    # /entrada y /salida usan el horario nuevo sin esperar a un reinicio
+    if changed:
+        refresh_schedule_index(telegram_id)
+    return True
+
 
 # Mapping of flow names to finalization functions
 FINALIZATION_MAP = {
@@ -138,8 +147,13 @@ FINALIZATION_MAP = {
 }
 
 
-async def finalize_flow(update, context):
-    """Generic function to finalize a conversation flow."""
+async def finalize_flow(update, context, flow):
+    """Generic function to finalize a conversation flow.
+
+    `flow` is the CompiledFlow the conversation is running (required: its last step tells
+    which variable the final answer goes into). The caller passes it to avoid a circular
+    import with flow_builder; no flow file is read at completion time.
+    """
     flow_name = context.user_data.get("flow_name")
     telegram_id = update.effective_user.id
 
@@ -155,18 +169,13 @@ async def finalize_flow(update, context):
 
     # The final answer needs to be saved first
     current_state_key = context.user_data.get("current_state")
-    if current_state_key:
-        flow_definition_path = os.path.join("conv-flows", f"{flow_name}.json")
-        with open(flow_definition_path, 'r') as f:
-            flow = json.load(f)
-        current_step = next((step for step in flow["steps"] if step["state"] == current_state_key), None)
-        if current_step:
-            variable_name = current_step.get("variable")
-            if variable_name:
-                context.user_data[variable_name] = update.message.text
-
-
-    success = finalizer_func(telegram_id, context.user_data)
+    if current_state_key is not None:
+        current_step = flow.steps.get(current_state_key)
+        if current_step and current_step.variable:
+            context.user_data[current_step.variable] = update.message.text
+
+
+    success = await finalizer_func(telegram_id, context.user_data)
 
     if success:
         await update.message.reply_text("¡Horario guardado con éxito! 👍")
@@ -1,8 +1,13 @@
 import ast
+import asyncio
 import json
 import logging
 import os
+import threading
+import time
 from functools import partial
+from types import MappingProxyType
+from typing import Hashable, Mapping, NamedTuple, Optional
 
 from telegram import ReplyKeyboardMarkup, ReplyKeyboardRemove, Update
 from telegram.ext import (
@@ -14,6 +19,64 @@ from telegram.ext import (
 )
 
 from .finalizer import finalize_flow
+from .instrumentation import STATE_RESOLVERS, instrument_handler
+from .metrics import Histogram, StatsFamily, register
+from .persistence import PERSISTENCE_ENABLED
+
+
+# Sentinel for "past the last step" (distinct from any state a JSON file may declare)
+END_OF_FLOW = object()
+# Legacy terminal target; only ends the flow when no step declares this state
+LEGACY_END_STATE = -1
+# Single ConversationHandler state: the actual step lives in user_data["current_state"]
+FLOW_ACTIVE = "FLOW_ACTIVE"
+# En las métricas por handler se reporta el paso real, no FLOW_ACTIVE
+STATE_RESOLVERS[FLOW_ACTIVE] = lambda context: context.user_data.get("current_state", FLOW_ACTIVE)
+
+# Compiled flows by flow_name, filled by load_flows()
+FLOW_REGISTRY = {}
+
+_REMOVE_KEYBOARD = ReplyKeyboardRemove()
+
+
+class CompiledStep(NamedTuple):
+    state: object
+    variable: Optional[str]
+    question: str
+    is_info: bool
+    reply_markup: object
+    transitions: object
+
+
+class Chain(NamedTuple):
+    """What happens when the flow moves to a state: messages to send, then a terminal."""
+
+    steps: tuple
+    terminal: str
+    wait_state: object = None
+
+
+# Chain terminals
+WAIT, FINALIZE, MISSING, STUCK, LOOP = "wait", "finalize", "missing", "stuck", "loop"
+
+
+class CompiledFlow(NamedTuple):
+    """Immutable, indexed form of a conv-flows JSON definition."""
+
+    name: str
+    first_state: object
+    steps: Mapping
+    chains: Mapping
+    definition: Mapping
+    version: int = 0
+
+    def chain_for(self, state_key) -> Chain:
+        chain = self.chains.get(state_key)
+        if chain is not None:
+            return chain
+        if state_key is END_OF_FLOW or state_key == LEGACY_END_STATE:
+            return Chain((), FINALIZE)
+        return Chain((), MISSING)
 
 
 def _build_keyboard(options):
@@ -34,11 +97,7 @@ def _preprocess_flow(flow: dict):
         if idx + 1 < len(steps):
             step["next_step"] = steps[idx + 1]["state"]
         else:
-            step["next_step"] = -1
-
-
-def _find_step(flow: dict, state_key):
-    return next((step for step in flow["steps"] if step["state"] == state_key), None)
+            step["next_step"] = END_OF_FLOW
 
 
 ALLOWED_AST_NODES = (
@@ -59,105 +118,227 @@ ALLOWED_AST_NODES = (
 )
 
 
-def _evaluate_condition(condition: str, response: str) -> bool:
-    """Safely evaluate expressions like `response in ['Hoy', 'Mañana']`."""
-    if not condition:
-        return False
+def _literal(node):
+    """Value of a constant or a list/tuple of constants, else raises ValueError."""
+    if isinstance(node, ast.Constant):
+        return node.value
+    if isinstance(node, (ast.List, ast.Tuple)):
+        return tuple(_literal(elt) for elt in node.elts)
+    raise ValueError("not a literal")
+
+
+def _lower_simple_condition(body):
+    """Turns `response == x`, `response != x`, `response in [...]`, `response not in [...]` into plain callables."""
+    if not isinstance(body, ast.Compare) or len(body.ops) != 1:
+        return None
+    left, op, right = body.left, body.ops[0], body.comparators[0]
+    if isinstance(op, (ast.Eq, ast.NotEq)) and isinstance(right, ast.Name) and not isinstance(left, ast.Name):
+        left, right = right, left
+    if not (isinstance(left, ast.Name) and left.id == "response"):
+        return None
+    try:
+        operand = _literal(right)
+    except ValueError:
+        return None
+
+    if isinstance(op, (ast.In, ast.NotIn)):
+        if not isinstance(operand, tuple):
+            return None
+        try:
+            members = frozenset(operand)
+        except TypeError:
+            return None
+        if isinstance(op, ast.In):
+            return lambda response: response in members
+        return lambda response: response not in members
+    if isinstance(op, ast.Eq):
+        return lambda response: response == operand
+    return lambda response: response != operand
+
+
+def compile_condition(condition: str):
+    """Validates and compiles a `next_step` condition once; returns a predicate `f(response) -> bool`.
+
+    Raises ValueError for syntax errors, unsupported nodes or names other than `response`.
+    """
     try:
         tree = ast.parse(condition, mode="eval")
-        for node in ast.walk(tree):
-            if not isinstance(node, ALLOWED_AST_NODES):
-                raise ValueError(f"Unsupported expression: {condition}")
-        compiled = compile(tree, "<condition>", "eval")
-        return bool(eval(compiled, {"__builtins__": {}}, {"response": response}))
-    except Exception as exc:
-        logging.warning("Failed to evaluate condition '%s': %s", condition, exc)
-        return False
-
-
-def _determine_next_state(step: dict, user_answer: str):
-    """Resolve the next state declared in the JSON step."""
-    if "next_steps" in step:
-        default_target = None
-        for option in step["next_steps"]:
-            value = option.get("value")
-            if value == "default":
-                default_target = option.get("go_to")
-            elif user_answer == value:
-                return option.get("go_to")
+    except SyntaxError as exc:
+        raise ValueError(f"Invalid condition '{condition}': {exc.msg}") from None
+    for node in ast.walk(tree):
+        if not isinstance(node, ALLOWED_AST_NODES):
+            raise ValueError(f"Unsupported expression: {condition}")
+        if isinstance(node, ast.Name) and node.id != "response":
+            raise ValueError(f"Unknown name '{node.id}' in condition: {condition}")
+
+    lowered = _lower_simple_condition(tree.body)
+    if lowered is not None:
+        return lowered
+
+    code = compile(tree, "<condition>", "eval")
+
+    def predicate(response):
+        try:
+            return bool(eval(code, {"__builtins__": {}}, {"response": response}))
+        except Exception as exc:
+            logging.warning("Failed to evaluate condition '%s': %s", condition, exc)
+            return False
+
+    return predicate
+
+
+def _determine_next_state(step, user_answer: str):
+    """Resolve the next state declared in the JSON step (dict or CompiledStep)."""
+    transitions = step.transitions if isinstance(step, CompiledStep) else _compile_transitions(step)
+    kind, spec = transitions
+    if kind == "values":
+        by_value, default_target = spec
+        if user_answer in by_value:
+            return by_value[user_answer]
         return default_target
-
-    next_step = step.get("next_step")
-
-    if isinstance(next_step, list):
+    if kind == "options":
         default_target = None
-        for option in next_step:
-            condition = option.get("condition")
-            target = option.get("state")
-            if condition:
-                if _evaluate_condition(condition, user_answer):
+        for predicate, value, is_default, target in spec:
+            if predicate:
+                if predicate(user_answer):
                     return target
-            elif option.get("value") and user_answer == option["value"]:
+            elif value and user_answer == value:
                 return target
-            elif option.get("default"):
+            elif is_default:
                 default_target = target
         return default_target
+    return spec
 
-    return next_step
 
+def _compile_transitions(step: dict):
+    """Pre-resolves next_step/next_steps into ("values" | "options" | "static", spec).
 
-async def _go_to_state(update: Update, context: ContextTypes.DEFAULT_TYPE, flow: dict, state_key):
-    """Send the question for the requested state, skipping info-only steps."""
-    safety_counter = 0
+    Conditions are compiled here, so an invalid expression fails when the flow loads.
+    """
+    if "next_steps" in step:
+        by_value = {}
+        default_target = None
+        for option in step["next_steps"]:
+            value = option.get("value")
+            if value == "default":
+                default_target = option.get("go_to")
+            elif isinstance(value, Hashable):
+                by_value.setdefault(value, option.get("go_to"))
+            else:
+                # Las respuestas son texto: una lista u objeto en "value" nunca podría coincidir
+                raise ValueError(f"next_steps value {value!r} must be a string or number, not {type(value).__name__}")
+        return ("values", (by_value, default_target))
+
+    next_step = step.get("next_step")
+    if isinstance(next_step, list):
+        return (
+            "options",
+            tuple(
+                (
+                    compile_condition(option["condition"]) if option.get("condition") else None,
+                    option.get("value"),
+                    bool(option.get("default")),
+                    option.get("state"),
+                )
+                for option in next_step
+            ),
+        )
+    return ("static", next_step)
+
+
+def _compile_chain(steps: Mapping, state_key) -> Chain:
+    """Follows info steps from `state_key` until a step that waits for input (or the end)."""
+    sent = []
+    seen = set()
     while True:
-        safety_counter += 1
-        if safety_counter > len(flow["steps"]) + 2:
-            logging.error("Detected potential loop while traversing flow '%s'", flow.get("flow_name"))
-            await update.message.reply_text("Ocurrió un error al continuar con el flujo. Intenta iniciar de nuevo.")
-            return ConversationHandler.END
-
-        if state_key == -1:
-            await finalize_flow(update, context)
-            return ConversationHandler.END
-
-        next_step = _find_step(flow, state_key)
-        if not next_step:
-            await update.message.reply_text("Error: No se encontró el siguiente paso del flujo.")
-            return ConversationHandler.END
-
-        reply_markup = ReplyKeyboardRemove()
-        if next_step.get("type") == "keyboard" and "options" in next_step:
-            reply_markup = _build_keyboard(next_step["options"])
-
-        await update.message.reply_text(next_step["question"], reply_markup=reply_markup)
-        context.user_data["current_state"] = state_key
-
-        if next_step.get("type") == "info":
-            state_key = _determine_next_state(next_step, None)
-            if state_key is None:
-                await update.message.reply_text("No se pudo continuar con el flujo actual. Intenta iniciar de nuevo.")
-                return ConversationHandler.END
-            continue
+        if state_key in seen:
+            return Chain(tuple(sent), LOOP)
+        step = steps.get(state_key)
+        if step is None:
+            if state_key is END_OF_FLOW or state_key == LEGACY_END_STATE:
+                return Chain(tuple(sent), FINALIZE)
+            return Chain(tuple(sent), MISSING)
+        seen.add(state_key)
+        sent.append(step)
+        if not step.is_info:
+            return Chain(tuple(sent), WAIT, state_key)
+        state_key = _determine_next_state(step, None)
+        if state_key is None:
+            return Chain(tuple(sent), STUCK)
+
+
+def compile_flow(flow: dict, version: int = 0) -> CompiledFlow:
+    """Builds the immutable CompiledFlow used by the handlers (raises on malformed flows)."""
+    _preprocess_flow(flow)
+    steps = {}
+    for step in flow["steps"]:
+        state_key = step["state"]
+        if state_key in steps:
+            raise ValueError(f"Duplicate state {state_key!r} in flow '{flow.get('flow_name')}'")
+        reply_markup = _REMOVE_KEYBOARD
+        if step.get("type") == "keyboard" and "options" in step:
+            reply_markup = _build_keyboard(step["options"])
+        try:
+            transitions = _compile_transitions(step)
+        except ValueError as exc:
+            raise ValueError(f"State {state_key!r} of flow '{flow.get('flow_name')}': {exc}") from None
+        steps[state_key] = CompiledStep(
+            state=state_key,
+            variable=step.get("variable"),
+            question=step["question"],
+            is_info=step.get("type") == "info",
+            reply_markup=reply_markup,
+            transitions=transitions,
+        )
+
+    chains = {state_key: _compile_chain(steps, state_key) for state_key in steps}
+    for state_key, chain in chains.items():
+        if chain.terminal == MISSING:
+            logging.warning("Flow '%s': state %r leads to an undefined step.", flow.get("flow_name"), state_key)
+
+    return CompiledFlow(
+        name=flow["flow_name"],
+        first_state=flow["steps"][0]["state"],
+        steps=MappingProxyType(steps),
+        chains=MappingProxyType(chains),
+        definition=MappingProxyType(flow),
+        version=version,
+    )
 
-        return state_key
 
+async def _go_to_state(update: Update, context: ContextTypes.DEFAULT_TYPE, flow: CompiledFlow, state_key):
+    """Send the question for the requested state, skipping info-only steps."""
+    chain = flow.chain_for(state_key)
+    for step in chain.steps:
+        await update.message.reply_text(step.question, reply_markup=step.reply_markup)
+        context.user_data["current_state"] = step.state
+
+    if chain.terminal == WAIT:
+        return FLOW_ACTIVE
+    if chain.terminal == FINALIZE:
+        await finalize_flow(update, context, flow=flow)
+    elif chain.terminal == MISSING:
+        await update.message.reply_text("Error: No se encontró el siguiente paso del flujo.")
+    elif chain.terminal == STUCK:
+        await update.message.reply_text("No se pudo continuar con el flujo actual. Intenta iniciar de nuevo.")
+    else:
+        logging.error("Detected potential loop while traversing flow '%s'", flow.name)
+        await update.message.reply_text("Ocurrió un error al continuar con el flujo. Intenta iniciar de nuevo.")
+    return ConversationHandler.END
 
-def create_handler(flow: dict):
-    states = {}
-    all_states = sorted(list(set([step["state"] for step in flow["steps"]])))
-    for state_key in all_states:
-        if state_key == -1:
-            continue
-        callback = partial(generic_callback, flow=flow)
-        states[state_key] = [MessageHandler(filters.TEXT & ~filters.COMMAND, callback)]
 
-    entry_point = CommandHandler(flow["flow_name"], partial(start_flow, flow=flow))
+def create_handler(flow_name: str):
+    """ConversationHandler for a flow; callbacks resolve the CompiledFlow through the registry."""
+    callback = partial(generic_callback, flow_name=flow_name)
+    entry_point = CommandHandler(flow_name, partial(start_flow, flow_name=flow_name))
 
     return ConversationHandler(
         entry_points=[entry_point],
-        states=states,
+        states={FLOW_ACTIVE: [MessageHandler(filters.TEXT & ~filters.COMMAND, callback)]},
         fallbacks=[CommandHandler("cancelar", end_cancel)],
         allow_reentry=True,
+        name=f"flow:{flow_name}",
+        persistent=PERSISTENCE_ENABLED,
     )
 
 
@@ -166,18 +347,27 @@ async def end_cancel(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     return ConversationHandler.END
 
 
-async def generic_callback(update: Update, context: ContextTypes.DEFAULT_TYPE, flow: dict):
+def _pinned_flow(context: ContextTypes.DEFAULT_TYPE, flow_name: str):
+    """The flow version this conversation started with (even if the file changed since)."""
+    if context.user_data.get("flow_name") == flow_name:
+        flow = _FLOW_VERSIONS.get((flow_name, context.user_data.get("flow_version")))
+        if flow is not None:
+            return flow
+    return FLOW_REGISTRY.get(flow_name)
+
+
+async def generic_callback(update: Update, context: ContextTypes.DEFAULT_TYPE, flow_name: str):
+    flow = _pinned_flow(context, flow_name)
     current_state_key = context.user_data.get("current_state", 0)
-    current_step = _find_step(flow, current_state_key)
+    current_step = flow.steps.get(current_state_key) if flow else None
 
     if not current_step:
         await update.message.reply_text("Hubo un error en el flujo. Por favor, inicia de nuevo.")
         return ConversationHandler.END
 
     user_answer = update.message.text
-    variable_name = current_step.get("variable")
-    if variable_name:
-        context.user_data[variable_name] = user_answer
+    if current_step.variable:
+        context.user_data[current_step.variable] = user_answer
 
     next_state_key = _determine_next_state(current_step, user_answer)
     if next_state_key is None:
@@ -186,33 +376,175 @@ async def generic_callback(update: Update, context: ContextTypes.DEFAULT_TYPE, f
     return await _go_to_state(update, context, flow, next_state_key)
 
 
-async def start_flow(update: Update, context: ContextTypes.DEFAULT_TYPE, flow: dict):
+async def start_flow(update: Update, context: ContextTypes.DEFAULT_TYPE, flow_name: str):
+    flow = FLOW_REGISTRY.get(flow_name)
+    if flow is None:
+        await update.message.reply_text("Este flujo ya no está disponible.")
+        return ConversationHandler.END
+
     context.user_data.clear()
-    context.user_data["flow_name"] = flow["flow_name"]
+    context.user_data["flow_name"] = flow.name
+    context.user_data["flow_version"] = flow.version
+
+    return await _go_to_state(update, context, flow, flow.first_state)
+
+
+# --- REGISTRO Y RECARGA EN CALIENTE ---
+# Cada archivo de FLOW_DIR se vigila por mtime; sólo se recompila lo que cambió. El cambio
+# de versión es una sola asignación en FLOW_REGISTRY y las conversaciones en curso siguen
+# con la versión con la que empezaron (se guardan en _FLOW_VERSIONS).
+FLOW_DIR = os.getenv("FLOW_DIR", "conv-flows")
+FLOW_RELOAD_INTERVAL = float(os.getenv("FLOW_RELOAD_INTERVAL", "5"))
+# Versiones anteriores que se conservan por flujo para conversaciones en curso
+FLOW_VERSIONS_KEPT = int(os.getenv("FLOW_VERSIONS_KEPT", "10"))
+
+_FLOW_VERSIONS = {}
+_FLOW_HANDLERS = {}
+_reload_lock = threading.Lock()
+# path -> (mtime_ns, size, flow_name | None)
+_file_state = {}
+reload_histogram = Histogram()
+_reload_stats = {"reloads": 0, "compiled": 0, "removed": 0, "errors": 0, "last_error": None}
+
+
+def register_flow(flow: CompiledFlow):
+    """Makes `flow` the current version for new conversations; older versions stay resolvable."""
+    _FLOW_VERSIONS[(flow.name, flow.version)] = flow
+    FLOW_REGISTRY[flow.name] = flow
+    versions = sorted(v for name, v in _FLOW_VERSIONS if name == flow.name)
+    for old_version in versions[:-FLOW_VERSIONS_KEPT] if FLOW_VERSIONS_KEPT > 0 else ():
+        del _FLOW_VERSIONS[(flow.name, old_version)]
+
+
+def _compile_file(filepath: str, stat) -> CompiledFlow:
+    with open(filepath, "r", encoding="utf-8") as f:
+        flow_definition = json.load(f)
+    # La versión es el mtime: se mantiene igual entre reinicios (user_data persistido la conserva)
+    return compile_flow(flow_definition, version=stat.st_mtime_ns)
 
-    first_state = flow["steps"][0]["state"]
-    return await _go_to_state(update, context, flow, first_state)
+
+def _scan_flow_dir(flow_dir: str):
+    """Compiles new or modified files; returns (compiled, removed_paths, errors)."""
+    try:
+        filenames = sorted(name for name in os.listdir(flow_dir) if name.endswith(".json"))
+    except FileNotFoundError:
+        filenames = []
+    compiled, errors, seen = [], [], set()
+    for filename in filenames:
+        filepath = os.path.join(flow_dir, filename)
+        seen.add(filepath)
+        try:
+            stat = os.stat(filepath)
+        except OSError:
+            continue
+        previous = _file_state.get(filepath)
+        if previous and previous[:2] == (stat.st_mtime_ns, stat.st_size):
+            continue
+        try:
+            compiled.append((filepath, stat, _compile_file(filepath, stat)))
+        except json.JSONDecodeError as e:
+            errors.append((filepath, stat, f"Error decoding JSON from {filename}: {e}"))
+        except Exception as e:
+            errors.append((filepath, stat, f"Error creating handler for {filename}: {e}"))
+    removed = [path for path in _file_state if path not in seen]
+    return compiled, removed, errors
+
+
+def reload_flows(flow_dir: str = None) -> list:
+    """Rescans the flow directory; returns the names of flows that got a handler for the first time."""
+    flow_dir = flow_dir or FLOW_DIR
+    start = time.perf_counter()
+    with _reload_lock:
+        compiled, removed, errors = _scan_flow_dir(flow_dir)
+        new_names = []
+        for filepath, stat, flow in compiled:
+            register_flow(flow)
+            _file_state[filepath] = (stat.st_mtime_ns, stat.st_size, flow.name)
+            if flow.name not in _FLOW_HANDLERS:
+                _FLOW_HANDLERS[flow.name] = create_handler(flow.name)
+                new_names.append(flow.name)
+            logging.info(f"Flow '{flow.name}' loaded successfully (version {flow.version}).")
+        for filepath, stat, message in errors:
+            # Se conserva la versión anterior (si existe); no se reintenta hasta que el archivo cambie
+            previous = _file_state.get(filepath)
+            _file_state[filepath] = (stat.st_mtime_ns, stat.st_size, previous[2] if previous else None)
+            _reload_stats["errors"] += 1
+            _reload_stats["last_error"] = message
+            logging.error(message)
+        for filepath in removed:
+            _, _, flow_name = _file_state.pop(filepath)
+            if flow_name and not any(state[2] == flow_name for state in _file_state.values()):
+                FLOW_REGISTRY.pop(flow_name, None)
+                _reload_stats["removed"] += 1
+                logging.info(f"Flow '{flow_name}' removed; conversations in progress keep their version.")
+        _reload_stats["reloads"] += 1
+        _reload_stats["compiled"] += len(compiled)
+    elapsed = time.perf_counter() - start
+    reload_histogram.observe(elapsed)
+    if compiled or removed or errors:
+        logging.info(
+            f"Flow reload: {len(compiled)} compiled, {len(removed)} removed, {len(errors)} errors in {elapsed * 1000:.1f}ms"
+        )
+    return new_names
 
 
 def load_flows():
-    flow_handlers = []
-    flow_dir = "conv-flows"
-    if not os.path.isdir(flow_dir):
-        logging.warning(f"Directory not found: {flow_dir}")
-        return flow_handlers
-
-    for filename in os.listdir(flow_dir):
-        if filename.endswith(".json"):
-            filepath = os.path.join(flow_dir, filename)
-            with open(filepath, "r", encoding="utf-8") as f:
-                try:
-                    flow_definition = json.load(f)
-                    _preprocess_flow(flow_definition)
-                    handler = create_handler(flow_definition)
-                    flow_handlers.append(handler)
-                    logging.info(f"Flow '{flow_definition['flow_name']}' loaded successfully.")
-                except json.JSONDecodeError as e:
-                    logging.error(f"Error decoding JSON from {filename}: {e}")
-                except Exception as e:
-                    logging.error(f"Error creating handler for {filename}: {e}")
-    return flow_handlers
+    """Initial load; returns one ConversationHandler per flow for main() to register."""
+    if not os.path.isdir(FLOW_DIR):
+        logging.warning(f"Directory not found: {FLOW_DIR}")
+        return []
+    reload_flows(FLOW_DIR)
+    return list(_FLOW_HANDLERS.values())
+
+
+async def _watch_flows(application, interval: float):
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            # Hilo propio: una recarga lenta no ocupa un worker del executor de DB
+            new_names = await asyncio.to_thread(reload_flows, FLOW_DIR)
+        except Exception as exc:
+            logging.error(f"Flow watcher error: {exc}")
+            continue
+        for flow_name in new_names:
+            application.add_handler(instrument_handler(_FLOW_HANDLERS[flow_name]))
+
+
+_watcher_task = None
+
+
+def start_flow_watcher(application, interval: float = None):
+    """Polls FLOW_DIR for changes (called from Application post_init; interval <= 0 disables it)."""
+    global _watcher_task
+    interval = FLOW_RELOAD_INTERVAL if interval is None else interval
+    if interval > 0 and _watcher_task is None:
+        _watcher_task = asyncio.create_task(_watch_flows(application, interval), name="flow-watcher")
+
+
+async def stop_flow_watcher():
+    global _watcher_task
+    if _watcher_task is not None:
+        _watcher_task.cancel()
+        try:
+            await _watcher_task
+        except asyncio.CancelledError:
+            pass
+        _watcher_task = None
+
+
+def flow_registry_stats() -> dict:
+    """Loaded versions, reload counters and the reload duration histogram."""
+    with _reload_lock:
+        stats = {
+            **_reload_stats,
+            "flows": {name: flow.version for name, flow in FLOW_REGISTRY.items()},
+            "versions_kept": len(_FLOW_VERSIONS),
+        }
+    stats["reload_latency"] = reload_histogram.snapshot()
+    return stats
+
+
+register(StatsFamily(
+    "vanessa_flow_registry", "conv-flows: version per flow and versions kept; reloads, compiled, removed, errors.",
+    flow_registry_stats, counters=("reloads", "compiled", "removed", "errors"),
+))
@@ -0,0 +1,148 @@
+import asyncio
+import hmac
+import json
+import logging
+import os
+import signal
+
+from aiohttp import web
+from telegram import Update
+
+from modules.sharding import FORWARDED_HEADER, build_shard_router
+
+# --- INGRESO POR WEBHOOK ---
+# Alternativa a run_polling: Telegram hace POST de cada update a INGRESS_PATH y el
+# handler lo deja en la update_queue de la Application. Se elige con BOT_MODE=webhook.
+BOT_MODE = os.getenv("BOT_MODE", "polling").strip().lower()
+INGRESS_HOST = os.getenv("INGRESS_HOST", "0.0.0.0")
+INGRESS_PORT = int(os.getenv("INGRESS_PORT", "8080"))
+INGRESS_PATH = os.getenv("INGRESS_PATH", "/telegram")
+# URL pública registrada con setWebhook (vacía = se registra aparte, p. ej. detrás de un proxy)
+TELEGRAM_WEBHOOK_URL = os.getenv("TELEGRAM_WEBHOOK_URL", "")
+TELEGRAM_WEBHOOK_SECRET = os.getenv("TELEGRAM_WEBHOOK_SECRET", "")
+# Requests HTTP procesándose a la vez y tamaño máximo de la cola de updates
+INGRESS_MAX_CONCURRENCY = int(os.getenv("INGRESS_MAX_CONCURRENCY", "100"))
+INGRESS_MAX_QUEUE = int(os.getenv("INGRESS_MAX_QUEUE", "1000"))
+# Si la cola sigue llena tras este tiempo se responde 503 y Telegram reintenta
+INGRESS_ENQUEUE_TIMEOUT = float(os.getenv("INGRESS_ENQUEUE_TIMEOUT", "2"))
+
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+_stats = {"received": 0, "enqueued": 0, "forwarded": 0, "rejected_secret": 0, "rejected_busy": 0, "invalid": 0}
+
+
+def build_update_queue() -> asyncio.Queue:
+    """Bounded update queue for ApplicationBuilder.update_queue (back-pressure for the ingress)."""
+    return asyncio.Queue(maxsize=INGRESS_MAX_QUEUE)
+
+
+def build_ingress_app(application, path: str = INGRESS_PATH, secret: str = TELEGRAM_WEBHOOK_SECRET,
+                      max_concurrency: int = INGRESS_MAX_CONCURRENCY,
+                      enqueue_timeout: float = INGRESS_ENQUEUE_TIMEOUT, router=None) -> web.Application:
+    """aiohttp app with the Telegram webhook endpoint and GET /healthz.
+
+    With a ShardRouter, updates owned by another replica are forwarded to it with the
+    original body (once: forwarded requests are always processed locally).
+    """
+    semaphore = asyncio.Semaphore(max_concurrency)
+    expected_secret = secret.encode() if secret else None
+
+    async def receive_update(request: web.Request) -> web.Response:
+        _stats["received"] += 1
+        if expected_secret is not None:
+            provided = request.headers.get(SECRET_HEADER, "").encode()
+            if not hmac.compare_digest(provided, expected_secret):
+                _stats["rejected_secret"] += 1
+                return web.Response(status=403)
+
+        async with semaphore:
+            body = await request.read()
+            try:
+                update = Update.de_json(json.loads(body), application.bot)
+            except (json.JSONDecodeError, KeyError, TypeError, ValueError) as exc:
+                _stats["invalid"] += 1
+                logging.warning(f"Invalid update received on the webhook ingress: {exc}")
+                return web.Response(status=400)
+
+            if router is not None and router.enabled and FORWARDED_HEADER not in request.headers:
+                owner = router.owner(update)
+                if owner != router.index:
+                    _stats["forwarded"] += 1
+                    status = await router.forward(owner, body, {SECRET_HEADER: request.headers.get(SECRET_HEADER, "")})
+                    return web.Response(status=status)
+
+            try:
+                await asyncio.wait_for(application.update_queue.put(update), timeout=enqueue_timeout)
+            except asyncio.TimeoutError:
+                _stats["rejected_busy"] += 1
+                return web.Response(status=503)
+
+        _stats["enqueued"] += 1
+        return web.Response(status=200)
+
+    async def healthz(request: web.Request) -> web.Response:
+        body = {
+            "status": "ok" if application.running else "starting",
+            "update_queue": application.update_queue.qsize(),
+            **_stats,
+        }
+        if router is not None:
+            body["shard"] = {"index": router.index, "shards": len(router.urls) or 1, **router.stats}
+        return web.json_response(body, status=200 if application.running else 503)
+
+    app = web.Application()
+    app.router.add_post(path, receive_update)
+    app.router.add_get("/healthz", healthz)
+    return app
+
+
+async def start_ingress(application, host: str = INGRESS_HOST, port: int = INGRESS_PORT, **kwargs) -> web.AppRunner:
+    """Starts the HTTP server on the running loop; returns the runner (call .cleanup() to stop)."""
+    runner = web.AppRunner(build_ingress_app(application, **kwargs), access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    logging.info(f"Webhook ingress listening on {host}:{port}{kwargs.get('path', INGRESS_PATH)}")
+    return runner
+
+
+async def _run_webhook(application):
+    await application.initialize()
+    if application.post_init:
+        await application.post_init(application)
+    if TELEGRAM_WEBHOOK_URL:
+        await application.bot.set_webhook(
+            url=TELEGRAM_WEBHOOK_URL,
+            secret_token=TELEGRAM_WEBHOOK_SECRET,
+            allowed_updates=Update.ALL_TYPES,
+            max_connections=min(100, INGRESS_MAX_CONCURRENCY),
+        )
+    await application.start()
+    router = build_shard_router()
+    runner = await start_ingress(application, router=router)
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+    try:
+        await stop.wait()
+    finally:
+        await runner.cleanup()
+        await router.close()
+        await application.stop()
+        if application.post_stop:
+            await application.post_stop(application)
+        await application.shutdown()
+        if application.post_shutdown:
+            await application.post_shutdown(application)
+
+
+def run_webhook(application):
+    """Blocking counterpart of Application.run_polling for BOT_MODE=webhook."""
+    if not TELEGRAM_WEBHOOK_SECRET:
+        raise RuntimeError("TELEGRAM_WEBHOOK_SECRET is required when BOT_MODE=webhook.")
+    asyncio.run(_run_webhook(application))
+
+
+def ingress_stats() -> dict:
+    return dict(_stats)
@@ -0,0 +1,215 @@
+import asyncio
+import contextvars
+import functools
+import inspect
+import logging
+import os
+import time
+from typing import Optional
+
+from aiohttp import web
+from sqlalchemy import event
+from telegram.ext import BaseHandler, ConversationHandler
+
+from modules.metrics import HistogramFamily, StatsFamily, register, render_prometheus
+
+# --- INSTRUMENTACIÓN DEL CAMINO CALIENTE ---
+# Cada callback registrado (menu_principal, manejar_flujo, recibir_*, generic_callback...)
+# mide su tiempo total y cuánto de ese tiempo se fue en la DB y en classify_reason. Los
+# webhooks los entrega el worker del outbox fuera del handler (vanessa_outbox_delivery_seconds).
+# Todo se publica en formato Prometheus en un /metrics local.
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+# 0 desactiva el endpoint (las métricas se siguen acumulando en memoria)
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9464"))
+
+HANDLER_LABELS = ("handler", "flow", "state")
+
+handler_seconds = register(HistogramFamily(
+    "vanessa_handler_seconds", "Wall time of one handler callback.", HANDLER_LABELS))
+handler_dependency_seconds = register(HistogramFamily(
+    "vanessa_handler_dependency_seconds",
+    "Time one handler callback spent in a dependency (db, classify_reason).",
+    HANDLER_LABELS + ("dependency",)))
+db_query_seconds = register(HistogramFamily(
+    "vanessa_db_query_seconds", "Duration of every SQL statement (handlers and background workers)."))
+webhook_post_seconds = register(HistogramFamily(
+    "vanessa_webhook_post_seconds", "Duration of webhook POSTs to n8n (outbox worker).", ("outcome",)))
+classify_reason_seconds = register(HistogramFamily(
+    "vanessa_classify_reason_seconds", "Duration of classify_reason calls (cache, local tier or LLM)."))
+
+# Tiempos por dependencia del handler en curso; run_db copia el contexto al hilo de DB
+_handler_timings: contextvars.ContextVar[Optional[dict]] = contextvars.ContextVar("handler_timings", default=None)
+
+# Estados cuyo valor real vive en user_data (p. ej. FLOW_ACTIVE de flow_builder)
+STATE_RESOLVERS = {}
+
+
+def record_dependency(dependency: str, elapsed: float):
+    """Adds `elapsed` to the running handler's bucket for `dependency` (no-op outside handlers)."""
+    timings = _handler_timings.get()
+    if timings is not None:
+        timings[dependency] = timings.get(dependency, 0.0) + elapsed
+
+
+def instrument_call(dependency: str, histogram: HistogramFamily):
+    """Decorator timing a sync or async function as a handler dependency."""
+
+    def decorator(func):
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    elapsed = time.perf_counter() - start
+                    histogram.observe(elapsed)
+                    record_dependency(dependency, elapsed)
+
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                histogram.observe(elapsed)
+                record_dependency(dependency, elapsed)
+
+        return wrapper
+
+    return decorator
+
+
+def record_webhook_post(elapsed: float, ok: bool):
+    webhook_post_seconds.observe(elapsed, "ok" if ok else "error")
+
+
+def instrument_engine(engine):
+    """Times every statement on `engine` via SQLAlchemy cursor events."""
+    if engine is None:
+        return engine
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_started"].pop()
+        db_query_seconds.observe(elapsed)
+        record_dependency("db", elapsed)
+
+    @event.listens_for(engine, "handle_error")
+    def _error(exception_context):
+        conn = exception_context.connection
+        if conn is not None and conn.info.get("query_started"):
+            conn.info["query_started"].pop()
+
+    return engine
+
+
+def _callback_name(callback) -> str:
+    while isinstance(callback, functools.partial):
+        callback = callback.func
+    return getattr(callback, "__name__", type(callback).__name__)
+
+
+def _wrap_callback(callback, flow: str, state):
+    if getattr(callback, "__instrumented__", False):
+        return callback
+    name = _callback_name(callback)
+    resolver = STATE_RESOLVERS.get(state)
+
+    @functools.wraps(callback)
+    async def wrapper(update, context):
+        state_label = resolver(context) if resolver is not None and context.user_data is not None else state
+        labels = (name, flow, state_label)
+        token = _handler_timings.set({})
+        start = time.perf_counter()
+        try:
+            return await callback(update, context)
+        finally:
+            handler_seconds.observe(time.perf_counter() - start, *labels)
+            for dependency, elapsed in _handler_timings.get().items():
+                handler_dependency_seconds.observe(elapsed, *labels, dependency)
+            _handler_timings.reset(token)
+
+    wrapper.__instrumented__ = True
+    return wrapper
+
+
+def instrument_handler(handler: BaseHandler, flow: str = "", state="") -> BaseHandler:
+    """Wraps the callback of `handler` (recursively for ConversationHandlers), in place."""
+    if isinstance(handler, ConversationHandler):
+        flow = handler.name or flow
+        for child in handler.entry_points:
+            instrument_handler(child, flow, "entry")
+        for state_key, children in handler.states.items():
+            for child in children:
+                instrument_handler(child, flow, state_key)
+        for child in handler.fallbacks:
+            instrument_handler(child, flow, "fallback")
+    elif getattr(handler, "callback", None) is not None:
+        handler.callback = _wrap_callback(handler.callback, flow, state)
+    return handler
+
+
+def instrument_application(application):
+    """Instruments every registered handler and exports the update processor and persistence stats."""
+    count = 0
+    for handlers in application.handlers.values():
+        for handler in handlers:
+            instrument_handler(handler)
+            count += 1
+    logging.info(f"Instrumented {count} top-level handlers.")
+
+    processor = application.update_processor
+    if hasattr(processor, "processor_stats"):
+        register(StatsFamily(
+            "vanessa_update_processor", "Per-chat update processor: in flight, queued, active chats; processed.",
+            processor.processor_stats, counters=("processed",),
+        ))
+    persistence = application.persistence
+    if hasattr(persistence, "persistence_stats"):
+        register(StatsFamily(
+            "vanessa_persistence", "SQLite persistence: flushes, rows and bytes written, unchanged skipped, users loaded.",
+            persistence.persistence_stats,
+            counters=("flushes", "rows_written", "bytes_written", "unchanged_skipped", "users_loaded"),
+        ))
+
+
+# --- ENDPOINT /metrics ---
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+_metrics_runner: Optional[web.AppRunner] = None
+
+
+async def _metrics(request: web.Request) -> web.Response:
+    # Algunos *_stats() consultan SQLite (outbox): se arma fuera del event loop
+    body = await asyncio.to_thread(render_prometheus)
+    return web.Response(body=body.encode(), headers={"Content-Type": PROMETHEUS_CONTENT_TYPE})
+
+
+async def start_metrics_server(host: str = METRICS_HOST, port: int = METRICS_PORT):
+    """Serves GET /metrics on host:port (call from post_init; port 0 disables it)."""
+    global _metrics_runner
+    if not port or _metrics_runner is not None:
+        return None
+    app = web.Application()
+    app.router.add_get("/metrics", _metrics)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    _metrics_runner = runner
+    logging.info(f"Metrics endpoint listening on http://{host}:{port}/metrics")
+    return runner
+
+
+async def stop_metrics_server():
+    global _metrics_runner
+    if _metrics_runner is not None:
+        await _metrics_runner.cleanup()
+        _metrics_runner = None
@@ -0,0 +1,308 @@
+"""
+Retention for USERS_ALMA.request_logs: daily rollup, compressed archive, then removal.
+
+    python -m modules.log_retention run [--keep-months 6] [--dry-run]
+    python -m modules.log_retention partition              # MySQL, una sola vez
+    python -m modules.log_retention summary 2026-01-01 2026-01-31 [--by command|user]
+
+`run` (pensado para la corrida nocturna) rolls every complete day into request_log_daily
+(one INSERT .. SELECT per day, computed by the database), streams each month older than
+--keep-months to a gzip JSONL file in LOG_ARCHIVE_DIR and only then removes it: DROP
+PARTITION when the table is partitioned by month, chunked DELETEs otherwise. Reports read
+request_log_daily, whose size depends on days x commands x users, not on traffic.
+"""
+import argparse
+import gzip
+import json
+import logging
+import os
+import sys
+import time
+from datetime import date, datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import delete, func, insert, literal, select, text
+
+from models.users_alma_models import RequestLog, RequestLogDaily
+from modules.database import SessionUsersAlma, _parse_date
+
+# Meses completos de logs crudos que se conservan además del mes en curso
+LOG_RETENTION_MONTHS = int(os.getenv("LOG_RETENTION_MONTHS", "6"))
+LOG_ARCHIVE_DIR = os.getenv("LOG_ARCHIVE_DIR", "storage/request_logs_archive")
+# Filas por lote al archivar y al borrar
+LOG_RETENTION_CHUNK_SIZE = int(os.getenv("LOG_RETENTION_CHUNK_SIZE", "10000"))
+# Particiones mensuales creadas por adelantado (MySQL)
+LOG_PARTITION_MONTHS_AHEAD = int(os.getenv("LOG_PARTITION_MONTHS_AHEAD", "3"))
+
+LOGS = RequestLog.__table__
+DAILY = RequestLogDaily.__table__
+_QUALIFIED = "USERS_ALMA.request_logs"
+_FUTURE = "p_future"
+
+
+def _month_start(day: date) -> date:
+    return day.replace(day=1)
+
+
+def _add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _as_datetime(day: date) -> datetime:
+    return datetime.combine(day, datetime.min.time())
+
+
+def _as_date(value) -> Optional[date]:
+    return value.date() if isinstance(value, datetime) else value
+
+
+# --- ROLLUP ---
+def rollup(session, until: date, dry_run: bool = False) -> dict:
+    """Rolls up every day after the last one in request_log_daily and before `until`."""
+    last = session.scalar(select(func.max(DAILY.c.fecha)))
+    first = last + timedelta(days=1) if last else _as_date(session.scalar(select(func.min(LOGS.c.created_at))))
+    stats = {"days": 0, "rows": 0}
+    if first is None:
+        return stats
+    day = first
+    while day < until:
+        if not dry_run:
+            start = _as_datetime(day)
+            command, telegram_id = func.coalesce(LOGS.c.command, ""), func.coalesce(LOGS.c.telegram_id, "")
+            grouped = (
+                select(literal(day, DAILY.c.fecha.type), command, telegram_id, func.count())
+                .where(LOGS.c.created_at >= start, LOGS.c.created_at < start + timedelta(days=1))
+                .group_by(command, telegram_id)
+            )
+            # Borrar antes de insertar hace el día idempotente si una corrida se repite
+            session.execute(delete(DAILY).where(DAILY.c.fecha == day))
+            result = session.execute(insert(DAILY).from_select(["fecha", "command", "telegram_id", "total"], grouped))
+            session.commit()
+            stats["rows"] += max(result.rowcount, 0)
+        stats["days"] += 1
+        day += timedelta(days=1)
+    return stats
+
+
+# --- PARTICIONES (MySQL) ---
+def _partitions(session) -> list:
+    """Names of the request_logs partitions (empty when the table is not partitioned or not MySQL)."""
+    if session.get_bind().dialect.name != "mysql":
+        return []
+    rows = session.execute(text(
+        "SELECT PARTITION_NAME FROM information_schema.PARTITIONS "
+        "WHERE TABLE_SCHEMA = 'USERS_ALMA' AND TABLE_NAME = 'request_logs' AND PARTITION_NAME IS NOT NULL "
+        "ORDER BY PARTITION_ORDINAL_POSITION"
+    ))
+    return [name for (name,) in rows]
+
+
+def _partition_name(month: date) -> str:
+    return f"p{month:%Y%m}"
+
+
+def _partition_clause(month: date) -> str:
+    return f"PARTITION {_partition_name(month)} VALUES LESS THAN (TO_DAYS('{_add_months(month, 1):%Y-%m-%d}'))"
+
+
+def partition_request_logs(session, today: date, months_ahead: int = LOG_PARTITION_MONTHS_AHEAD):
+    """One-time conversion of request_logs to monthly RANGE partitions (MySQL; rebuilds the table)."""
+    if session.get_bind().dialect.name != "mysql":
+        raise RuntimeError("Partitioning is only available on MySQL.")
+    if _partitions(session):
+        logging.info("request_logs is already partitioned.")
+        return
+    oldest = _as_date(session.scalar(select(func.min(LOGS.c.created_at)))) or today
+    month, last = _month_start(oldest), _add_months(_month_start(today), months_ahead)
+    clauses = []
+    while month <= last:
+        clauses.append(_partition_clause(month))
+        month = _add_months(month, 1)
+    clauses.append(f"PARTITION {_FUTURE} VALUES LESS THAN MAXVALUE")
+    # La llave de partición debe formar parte de la llave primaria
+    session.execute(text(
+        f"ALTER TABLE {_QUALIFIED} MODIFY created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP, "
+        f"DROP PRIMARY KEY, ADD PRIMARY KEY (id, created_at)"
+    ))
+    session.execute(text(f"ALTER TABLE {_QUALIFIED} PARTITION BY RANGE (TO_DAYS(created_at)) ({', '.join(clauses)})"))
+    logging.info(f"request_logs partitioned into {len(clauses)} partitions.")
+
+
+def ensure_future_partitions(session, today: date, months_ahead: int = LOG_PARTITION_MONTHS_AHEAD) -> list:
+    """Splits p_future so the next `months_ahead` months have their own partition; returns the new names."""
+    existing = set(_partitions(session))
+    if _FUTURE not in existing:
+        return []
+    month, last = _month_start(today), _add_months(_month_start(today), months_ahead)
+    missing = []
+    while month <= last:
+        if _partition_name(month) not in existing:
+            missing.append(month)
+        month = _add_months(month, 1)
+    if missing:
+        clauses = [_partition_clause(month) for month in missing]
+        clauses.append(f"PARTITION {_FUTURE} VALUES LESS THAN MAXVALUE")
+        session.execute(text(f"ALTER TABLE {_QUALIFIED} REORGANIZE PARTITION {_FUTURE} INTO ({', '.join(clauses)})"))
+    return [_partition_name(month) for month in missing]
+
+
+# --- ARCHIVO ---
+def _serialize(value):
+    return value.isoformat() if isinstance(value, (date, datetime)) else value
+
+
+def archive_month(session, month: date, directory: str = LOG_ARCHIVE_DIR,
+                  chunk_size: int = LOG_RETENTION_CHUNK_SIZE, dry_run: bool = False) -> dict:
+    """Streams one month of request_logs to gzip JSONL, checks the count and removes the rows."""
+    start, end = _as_datetime(month), _as_datetime(_add_months(month, 1))
+    criteria = (LOGS.c.created_at >= start, LOGS.c.created_at < end)
+    total, first_id = session.execute(select(func.count(), func.min(LOGS.c.id)).where(*criteria)).one()
+    stats = {"month": f"{month:%Y-%m}", "rows": total, "path": None, "removed": 0, "method": None}
+    if not total or dry_run:
+        return stats
+
+    # El primer id va en el nombre: si una corrida anterior borró parte del mes, el resto
+    # queda en otro archivo en lugar de sobrescribir el que ya tenía esas filas
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"request_logs-{month:%Y-%m}-{first_id}.jsonl.gz")
+    columns = [column.name for column in LOGS.columns]
+    written, last_id = 0, first_id - 1
+    # Páginas por llave (id > :ultimo LIMIT n): mysql-connector no tiene cursores del lado
+    # del servidor y con yield_per cargaría el mes completo en memoria
+    with gzip.open(f"{path}.tmp", "wt", encoding="utf-8") as fh:
+        while True:
+            page = session.execute(
+                select(LOGS).where(*criteria, LOGS.c.id > last_id).order_by(LOGS.c.id).limit(chunk_size)
+            ).all()
+            if not page:
+                break
+            for row in page:
+                fh.write(json.dumps(dict(zip(columns, map(_serialize, row))), ensure_ascii=False) + "\n")
+            written += len(page)
+            last_id = page[-1].id
+            session.commit()
+    if written != total:
+        os.remove(f"{path}.tmp")
+        raise RuntimeError(f"Archive of {month:%Y-%m} wrote {written} of {total} rows; nothing was removed.")
+    os.replace(f"{path}.tmp", path)
+    stats["path"] = path
+
+    # Sólo se borra lo que ya quedó en el archivo
+    if _partition_name(month) in _partitions(session):
+        session.execute(text(f"ALTER TABLE {_QUALIFIED} DROP PARTITION {_partition_name(month)}"))
+        stats["removed"], stats["method"] = total, "drop partition"
+        return stats
+    stats["method"] = "delete"
+    while True:
+        ids = session.scalars(
+            select(LOGS.c.id)
+            .where(*criteria, LOGS.c.id.between(first_id, last_id))
+            .order_by(LOGS.c.id)
+            .limit(chunk_size)
+        ).all()
+        if not ids:
+            break
+        session.execute(delete(LOGS).where(LOGS.c.id.in_(ids)))
+        session.commit()
+        stats["removed"] += len(ids)
+        first_id = ids[-1] + 1
+    return stats
+
+
+def run_retention(today: Optional[date] = None, keep_months: int = LOG_RETENTION_MONTHS,
+                  directory: str = LOG_ARCHIVE_DIR, chunk_size: int = LOG_RETENTION_CHUNK_SIZE,
+                  dry_run: bool = False) -> dict:
+    """Rollup, then archive + removal of the months before the retention window, then partitions ahead."""
+    if not SessionUsersAlma:
+        raise RuntimeError("USERS_ALMA database is not configured.")
+    today = today or date.today()
+    cutoff = _add_months(_month_start(today), -keep_months)
+    stats = {"cutoff": cutoff.isoformat(), "archived": [], "new_partitions": []}
+    session = SessionUsersAlma()
+    try:
+        started = time.perf_counter()
+        stats["rollup"] = rollup(session, today, dry_run)
+        stats["rollup_seconds"] = time.perf_counter() - started
+
+        started = time.perf_counter()
+        oldest = _as_date(session.scalar(select(func.min(LOGS.c.created_at)).where(
+            LOGS.c.created_at < _as_datetime(cutoff))))
+        month = _month_start(oldest) if oldest else cutoff
+        while month < cutoff:
+            archived = archive_month(session, month, directory, chunk_size, dry_run)
+            if archived["rows"]:
+                stats["archived"].append(archived)
+                logging.info(f"request_logs {archived['month']}: {archived['rows']} rows archived to "
+                             f"{archived['path']} ({archived['method']}).")
+            month = _add_months(month, 1)
+        stats["archive_seconds"] = time.perf_counter() - started
+
+        if not dry_run:
+            stats["new_partitions"] = ensure_future_partitions(session, today)
+            session.commit()
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        session.close()
+    return stats
+
+
+# --- REPORTES ---
+def summary_query(start: date, end: date, by: str = "command"):
+    """Totals per day and command (by='command') or per user (by='user') from request_log_daily."""
+    total = func.sum(DAILY.c.total).label("total")
+    window = DAILY.c.fecha.between(start, end)
+    if by == "user":
+        return select(DAILY.c.telegram_id, total).where(window).group_by(DAILY.c.telegram_id).order_by(total.desc())
+    return select(DAILY.c.fecha, DAILY.c.command, total).where(window).group_by(
+        DAILY.c.fecha, DAILY.c.command).order_by(DAILY.c.fecha, DAILY.c.command)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+    runner = sub.add_parser("run", help="rollup, archive and remove old request_logs")
+    runner.add_argument("--keep-months", type=int, default=LOG_RETENTION_MONTHS)
+    runner.add_argument("--archive-dir", default=LOG_ARCHIVE_DIR)
+    runner.add_argument("--chunk-size", type=int, default=LOG_RETENTION_CHUNK_SIZE)
+    runner.add_argument("--dry-run", action="store_true", help="report what would be rolled up and archived")
+    sub.add_parser("partition", help="convert request_logs to monthly partitions (MySQL, one time)")
+    summary = sub.add_parser("summary", help="print totals from request_log_daily")
+    summary.add_argument("start")
+    summary.add_argument("end")
+    summary.add_argument("--by", choices=("command", "user"), default="command")
+    args = parser.parse_args(argv)
+
+    if not SessionUsersAlma:
+        print("USERS_ALMA database is not configured (MYSQL_* or DATABASE_URL).", file=sys.stderr)
+        return 1
+
+    if args.command == "run":
+        stats = run_retention(keep_months=args.keep_months, directory=args.archive_dir,
+                              chunk_size=args.chunk_size, dry_run=args.dry_run)
+        archived = sum(month["rows"] for month in stats["archived"])
+        print(f"rollup: {stats['rollup']['days']} days ({stats['rollup_seconds']:.1f}s); "
+              f"archived {archived} rows from {len(stats['archived'])} months before {stats['cutoff']} "
+              f"({stats['archive_seconds']:.1f}s); new partitions: {', '.join(stats['new_partitions']) or '-'}"
+              f"{' [dry run]' if args.dry_run else ''}")
+        return 0
+
+    session = SessionUsersAlma()
+    try:
+        if args.command == "partition":
+            partition_request_logs(session, date.today())
+            return 0
+        start, end = _parse_date(args.start), _parse_date(args.end)
+        if start is None or end is None or start > end:
+            parser.error("start/end must be dates with start <= end")
+        for row in session.execute(summary_query(start, end, args.by)):
+            print("\t".join(str(value) for value in row))
+    finally:
+        session.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,29 +1,207 @@
+import abc
 import logging
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy import insert
+
 from modules.database import SessionUsersAlma
+from modules.metrics import StatsFamily, register
 from models.users_alma_models import RequestLog
 
+# --- BUFFERED LOG SINK ---
+# Los logs se encolan en memoria y un hilo los inserta por lotes (executemany),
+# en lugar de abrir una transacción por cada mensaje.
+LOG_QUEUE_MAXSIZE = int(os.getenv("LOG_QUEUE_MAXSIZE", "10000"))
+LOG_BATCH_SIZE = int(os.getenv("LOG_BATCH_SIZE", "200"))
+LOG_FLUSH_INTERVAL = float(os.getenv("LOG_FLUSH_INTERVAL", "2.0"))
+
+_STOP = object()
+
+
+class BatchSink(abc.ABC):
+    """Queue of pending rows drained by a background writer thread; subclasses implement _write.
+
+    Rows are flushed when `batch_size` rows are pending or `flush_interval` seconds
+    have passed since the first pending row. When the queue is full new rows are
+    dropped (and counted) so a slow database never backs up the handlers.
+    """
+
+    name = "batch-sink"
+
+    def __init__(self, maxsize: int, batch_size: int, flush_interval: float):
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._batch_size = max(1, batch_size)
+        self._flush_interval = flush_interval
+        self._thread = None
+        self._lock = threading.Lock()
+        # El hilo writer y el event loop (o el executor de DB) actualizan los contadores a la vez
+        self._stats_lock = threading.Lock()
+        self.stats = {"queued": 0, "flushed": 0, "dropped": 0, "batches": 0}
+
+    def start(self):
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._thread.start()
+
+    def submit(self, row: dict) -> bool:
+        """Enqueues a row without blocking; returns False if it was dropped."""
+        if not self._thread:
+            self.start()
+        try:
+            self._queue.put_nowait(row)
+        except queue.Full:
+            dropped = self._count("dropped")
+            if dropped % 100 == 1:
+                logging.warning(f"{self.name} queue full; dropped {dropped} entries so far.")
+            return False
+        self._count("queued")
+        return True
+
+    def stop(self, timeout: float = 10.0):
+        """Flushes everything still queued and stops the writer thread, waiting at most `timeout` seconds."""
+        with self._lock:
+            thread = self._thread
+            self._thread = None
+        if not thread:
+            return
+        deadline = time.monotonic() + timeout
+        # Con la cola llena el centinela espera lugar mientras el writer drena, pero no sin límite
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            logging.warning(f"{self.name} did not stop within {timeout}s; {self.pending()} entries still queued.")
+            return
+        thread.join(max(0.0, deadline - time.monotonic()))
+        if thread.is_alive():
+            logging.warning(f"{self.name} still writing after {timeout}s; {self.pending()} entries still queued.")
+
+    def _count(self, key: str, amount: int = 1) -> int:
+        with self._stats_lock:
+            self.stats[key] += amount
+            return self.stats[key]
+
+    def snapshot(self) -> dict:
+        """Consistent copy of the counters."""
+        with self._stats_lock:
+            return dict(self.stats)
+
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    def _run(self):
+        while True:
+            batch = []
+            item = self._queue.get()
+            if item is _STOP:
+                return
+            batch.append(item)
+            deadline = time.monotonic() + self._flush_interval
+            stop = False
+            while len(batch) < self._batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stop = True
+                    break
+                batch.append(item)
+            self._write(batch)
+            if stop:
+                self._drain()
+                return
+
+    def _drain(self):
+        batch = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _STOP:
+                batch.append(item)
+            if len(batch) >= self._batch_size:
+                self._write(batch)
+                batch = []
+        if batch:
+            self._write(batch)
+
+    @abc.abstractmethod
+    def _write(self, rows: list):
+        """Writes one batch of rows; runs on the writer thread."""
+
+
+class RequestLogSink(BatchSink):
+    """request_logs rows inserted with one executemany per batch."""
+
+    name = "request-log-sink"
+
+    def __init__(self, session_factory, maxsize: int, batch_size: int, flush_interval: float):
+        super().__init__(maxsize, batch_size, flush_interval)
+        self._session_factory = session_factory
+
+    def _write(self, rows: list):
+        try:
+            db_session = self._session_factory()
+        except Exception as exc:
+            self._count("dropped", len(rows))
+            logging.error(f"Could not create DB session, {len(rows)} logs lost: {exc}")
+            return
+        try:
+            db_session.execute(insert(RequestLog), rows)
+            db_session.commit()
+            self._count("flushed", len(rows))
+            self._count("batches")
+            logging.debug(f"Flushed {len(rows)} request logs.")
+        except Exception as e:
+            db_session.rollback()
+            self._count("dropped", len(rows))
+            logging.error(f"Error saving {len(rows)} logs: {e}")
+        finally:
+            db_session.close()
+
+
+_sink = RequestLogSink(SessionUsersAlma, LOG_QUEUE_MAXSIZE, LOG_BATCH_SIZE, LOG_FLUSH_INTERVAL) if SessionUsersAlma else None
+
+
 def log_request(telegram_id, username, command, message):
-    if not SessionUsersAlma:
+    if not _sink:
         logging.debug("DB log omitted (DB not configured).")
         return
 
-    try:
-        db_session = SessionUsersAlma()
-    except Exception as exc:
-        logging.error(f"Could not create DB session, logging is disabled: {exc}")
-        return
-    try:
-        log_entry = RequestLog(
-            telegram_id=str(telegram_id),
-            username=username,
-            command=command,
-            message=message
-        )
-        db_session.add(log_entry)
-        db_session.commit()
-        logging.info(f"Log saved: {command} from {username}")
-    except Exception as e:
-        logging.error(f"Error saving log: {e}")
-        db_session.rollback()
-    finally:
-        db_session.close()
+    _sink.submit({
+        "telegram_id": str(telegram_id),
+        "username": username,
+        "command": command,
+        "message": (message or "")[:500],
+        "created_at": datetime.now(),
+    })
+
+async def log_request_async(telegram_id, username, command, message):
+    """Awaitable version of log_request; enqueueing never blocks the event loop."""
+    log_request(telegram_id, username, command, message)
+
+def flush_request_logs(timeout: float = 10.0):
+    """Writes out every queued log and stops the sink (called from Application post_stop)."""
+    if _sink:
+        _sink.stop(timeout)
+
+def request_log_stats() -> dict:
+    """Counters for queued, flushed and dropped log entries plus the current queue depth."""
+    if not _sink:
+        return {"queued": 0, "flushed": 0, "dropped": 0, "batches": 0, "pending": 0}
+    return {**_sink.snapshot(), "pending": _sink.pending()}
+
+register(StatsFamily(
+    "vanessa_request_log", "request_logs batch sink: pending entries; queued, flushed, dropped and batches.",
+    request_log_stats, counters=("queued", "flushed", "dropped", "batches"),
+))
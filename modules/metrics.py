@@ -0,0 +1,175 @@
+import bisect
+import logging
+import threading
+
+# Buckets (segundos) pensados para llamadas de red: DB, webhooks, LLM
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram (Prometheus-style), safe to observe from any thread."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        idx = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[idx] += 1
+            self._sum += value
+
+    def snapshot(self) -> dict:
+        """Returns {"buckets": {le: cumulative_count}, "count": n, "sum": total}."""
+        with self._lock:
+            counts = list(self._counts)
+            total = self._sum
+        cumulative = {}
+        running = 0
+        for le, count in zip(self.buckets + (float("inf"),), counts):
+            running += count
+            cumulative[le] = running
+        return {"buckets": cumulative, "count": running, "sum": total}
+
+
+def _format_le(le: float) -> str:
+    return "+Inf" if le == float("inf") else repr(float(le))
+
+
+def _escape_label(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _histogram_lines(name: str, labels: list, snap: dict) -> list:
+    """_bucket/_sum/_count lines of one Histogram.snapshot() with `labels` (['k="v"', ...])."""
+    lines = []
+    for le, count in snap["buckets"].items():
+        bucket_labels = ",".join(labels + [f'le="{_format_le(le)}"'])
+        lines.append(f"{name}_bucket{{{bucket_labels}}} {count}")
+    suffix = f"{{{','.join(labels)}}}" if labels else ""
+    lines.append(f"{name}_sum{suffix} {snap['sum']}")
+    lines.append(f"{name}_count{suffix} {snap['count']}")
+    return lines
+
+
+class HistogramFamily:
+    """Histograms sharing one metric name, one child per combination of label values."""
+
+    def __init__(self, name: str, documentation: str, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = buckets
+        self._children = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values) -> Histogram:
+        key = tuple(str(v) for v in values)
+        if len(key) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {values}")
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, Histogram(self.buckets))
+        return child
+
+    def observe(self, value: float, *labelvalues):
+        self.labels(*labelvalues).observe(value)
+
+    def render(self) -> list:
+        """Lines in the Prometheus text exposition format."""
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            children = sorted(self._children.items())
+        for values, child in children:
+            labels = [f'{name}="{_escape_label(value)}"' for name, value in zip(self.labelnames, values)]
+            lines.extend(_histogram_lines(self.name, labels, child.snapshot()))
+        return lines
+
+
+class GaugeFamily:
+    """Gauge whose values are read at scrape time from `collect()` -> {label values tuple: value}."""
+
+    def __init__(self, name: str, documentation: str, labelnames=(), collect=None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.collect = collect or dict
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} gauge"]
+        for values, value in sorted(self.collect().items()):
+            labels = ",".join(f'{name}="{_escape_label(v)}"' for name, v in zip(self.labelnames, values))
+            lines.append(f"{self.name}{{{labels}}} {value}" if labels else f"{self.name} {value}")
+        return lines
+
+
+def _flatten(stats: dict, prefix: str = ""):
+    """(key, value) pairs of a stats dict; nested dicts become parent_child, non-numbers are skipped."""
+    for key, value in stats.items():
+        key = f"{prefix}{key}"
+        if isinstance(value, dict):
+            if {"buckets", "count", "sum"} <= value.keys():
+                yield key, value
+            else:
+                yield from _flatten(value, f"{key}_")
+        elif isinstance(value, (int, float)):
+            yield key, float(value)
+
+
+class StatsFamily:
+    """Exports the dict returned by one of the *_stats() functions, read at scrape time.
+
+    Keys in `counters` render as `<name>_total{stat=...}`, histogram snapshots as
+    `<name>_<key>_seconds` and every other number as the `<name>{stat=...}` gauge.
+    """
+
+    def __init__(self, name: str, documentation: str, collect, counters=()):
+        self.name = name
+        self.documentation = documentation
+        self.collect = collect
+        self.counters = frozenset(counters)
+
+    def render(self) -> list:
+        try:
+            stats = self.collect()
+        except Exception as exc:
+            logging.error(f"Could not collect {self.name}: {exc}")
+            return []
+        gauges, counters, histograms = [], [], []
+        for key, value in _flatten(stats):
+            if isinstance(value, dict):
+                histograms.append((key, value))
+            elif key in self.counters:
+                counters.append(f'{self.name}_total{{stat="{_escape_label(key)}"}} {value}')
+            else:
+                gauges.append(f'{self.name}{{stat="{_escape_label(key)}"}} {value}')
+        lines = []
+        if gauges:
+            lines += [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} gauge", *gauges]
+        if counters:
+            lines += [f"# HELP {self.name}_total {self.documentation}", f"# TYPE {self.name}_total counter", *counters]
+        for key, snap in histograms:
+            name = f"{self.name}_{key.removesuffix('_latency')}_seconds"
+            lines += [f"# HELP {name} {self.documentation}", f"# TYPE {name} histogram"]
+            lines += _histogram_lines(name, [], snap)
+        return lines
+
+
+# Nombre -> familia: registrar otra vez el mismo nombre (p. ej. build_application en el
+# harness de carga) reemplaza la anterior en vez de duplicar sus líneas
+REGISTRY = {}
+
+
+def register(family):
+    REGISTRY[family.name] = family
+    return family
+
+
+def render_prometheus(families=None) -> str:
+    lines = []
+    for family in REGISTRY.values() if families is None else families:
+        lines.extend(family.render())
+    return "\n".join(lines) + "\n"
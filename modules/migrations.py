@@ -0,0 +1,162 @@
+"""
+Versioned SQL migrations: db/migrations/NNNN_nombre.sql applied in version order and
+recorded in USERS_ALMA.schema_migrations.
+
+    python -m modules.migrations              # aplica las pendientes
+    python -m modules.migrations --status
+    python -m modules.migrations --dry-run
+
+Files are written for MySQL with schema-qualified table names (the three schemas share a
+server, so one connection applies them all). db/init/init.sql is the baseline; every later
+schema change is a new file, never an edit of an applied one (the checksum is compared).
+"""
+import argparse
+import hashlib
+import logging
+import os
+import re
+import sys
+from typing import NamedTuple, Optional
+
+from sqlalchemy import insert, select
+from sqlalchemy.exc import DBAPIError
+
+from models.users_alma_models import SchemaMigration
+from modules.database import engine_users_alma
+
+MIGRATIONS_DIR = os.getenv(
+    "MIGRATIONS_DIR", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "db", "migrations")
+)
+
+_FILENAME = re.compile(r"^(\d+)_(\w+)\.sql$")
+# SQLite lleva el esquema en el nombre del índice, no en la tabla
+_SQLITE_INDEX = re.compile(r"^(CREATE\s+(?:UNIQUE\s+)?INDEX\s+)(\w+)\s+ON\s+(\w+)\.(\w+)", re.IGNORECASE)
+# Cláusulas de columna que sólo entiende MySQL
+_SQLITE_AUTO_INCREMENT = re.compile(r"\bINT\s+AUTO_INCREMENT\s+PRIMARY\s+KEY\b", re.IGNORECASE)
+_SQLITE_ON_UPDATE = re.compile(r"\s+ON\s+UPDATE\s+CURRENT_TIMESTAMP\b", re.IGNORECASE)
+TABLE = SchemaMigration.__table__
+
+
+class Migration(NamedTuple):
+    version: int
+    name: str
+    statements: list
+    checksum: str
+
+
+def _statements(sql: str) -> list:
+    lines = [line for line in sql.splitlines() if not line.strip().startswith("--")]
+    return [statement.strip() for statement in "\n".join(lines).split(";") if statement.strip()]
+
+
+def load_migrations(directory: str = MIGRATIONS_DIR) -> list:
+    """Migration files of `directory` sorted by version."""
+    migrations = {}
+    for filename in sorted(os.listdir(directory)):
+        match = _FILENAME.match(filename)
+        if not match:
+            continue
+        version = int(match.group(1))
+        if version in migrations:
+            raise ValueError(f"Duplicate migration version {version}: {migrations[version].name} and {filename}")
+        with open(os.path.join(directory, filename), "rb") as fh:
+            raw = fh.read()
+        migrations[version] = Migration(
+            version, filename, _statements(raw.decode("utf-8")), hashlib.sha256(raw).hexdigest()
+        )
+    return [migrations[version] for version in sorted(migrations)]
+
+
+def _for_dialect(statement: str, dialect: str) -> str:
+    if dialect == "sqlite":
+        statement = _SQLITE_AUTO_INCREMENT.sub("INTEGER PRIMARY KEY AUTOINCREMENT", statement)
+        statement = _SQLITE_ON_UPDATE.sub("", statement)
+        return _SQLITE_INDEX.sub(r"\1\3.\2 ON \4", statement)
+    return statement
+
+
+def _already_exists(exc: DBAPIError) -> bool:
+    # MySQL no tiene CREATE INDEX IF NOT EXISTS y el DDL no es transaccional: si una corrida
+    # falló a la mitad, lo que ya se creó se salta al reintentar
+    message = str(exc.orig)
+    return "Duplicate key name" in message or "Duplicate column name" in message or "already exists" in message
+
+
+def applied_versions(engine) -> dict:
+    """version -> checksum of the migrations already recorded."""
+    TABLE.create(engine, checkfirst=True)
+    with engine.connect() as conn:
+        return dict(conn.execute(select(TABLE.c.version, TABLE.c.checksum)).all())
+
+
+def apply_migrations(engine=None, directory: str = MIGRATIONS_DIR, dry_run: bool = False) -> list:
+    """Applies the pending migrations in order; returns the names applied (or pending, with dry_run)."""
+    engine = engine or engine_users_alma.get()
+    applied = applied_versions(engine)
+    done = []
+    for migration in load_migrations(directory):
+        if migration.version in applied:
+            if applied[migration.version] != migration.checksum:
+                logging.warning(f"Migration {migration.name} changed after it was applied; add a new file instead.")
+            continue
+        if dry_run:
+            done.append(migration.name)
+            continue
+        with engine.begin() as conn:
+            for statement in migration.statements:
+                try:
+                    conn.exec_driver_sql(_for_dialect(statement, engine.dialect.name))
+                except DBAPIError as exc:
+                    if not _already_exists(exc):
+                        raise
+                    logging.warning(f"{migration.name}: already present, skipped: {statement.splitlines()[0]}")
+            conn.execute(insert(TABLE).values(
+                version=migration.version, name=migration.name, checksum=migration.checksum
+            ))
+        logging.info(f"Migration {migration.name} applied ({len(migration.statements)} statements).")
+        done.append(migration.name)
+    return done
+
+
+def main(argv: Optional[list] = None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--status", action="store_true", help="list applied and pending migrations")
+    parser.add_argument("--dry-run", action="store_true", help="print the pending statements without running them")
+    parser.add_argument("--dir", default=MIGRATIONS_DIR)
+    args = parser.parse_args(argv)
+
+    if not engine_users_alma:
+        print("USERS_ALMA database is not configured (MYSQL_* or DATABASE_URL).", file=sys.stderr)
+        return 1
+    engine = engine_users_alma.get()
+
+    if args.status:
+        applied = applied_versions(engine)
+        for migration in load_migrations(args.dir):
+            state = "applied" if migration.version in applied else "pending"
+            if migration.version in applied and applied[migration.version] != migration.checksum:
+                state = "applied (file changed since)"
+            print(f"{migration.name:<40} {state}")
+        return 0
+
+    if args.dry_run:
+        pending = set(apply_migrations(engine, args.dir, dry_run=True))
+        for migration in load_migrations(args.dir):
+            if migration.name in pending:
+                print(f"-- {migration.name}")
+                for statement in migration.statements:
+                    print(f"{_for_dialect(statement, engine.dialect.name)};")
+        return 0
+
+    try:
+        applied = apply_migrations(engine, args.dir)
+    except DBAPIError as exc:
+        logging.error(f"Migration failed: {exc}")
+        return 1
+    print(f"{len(applied)} migrations applied." if applied else "Schema is up to date.")
+    return 0
+
+
+if __name__ == "__main__":
+    logging.basicConfig(format="%(asctime)s - %(levelname)s - %(message)s", level=logging.INFO)
+    sys.exit(main())
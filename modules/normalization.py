@@ -0,0 +1,16 @@
+# --- NORMALIZACIÓN DE TEXTO ---
+# Compartida por el onboarding (respuestas en Telegram) y la importación masiva de
+# empleadas (modules/employee_io.py); no depende de telegram ni de la DB.
+
+
+def normalizar_id(texto: str) -> str:
+    """Elimina espacios y convierte a mayúsculas (para RFC y CURP)."""
+    if not texto: return "N/A"
+    # Elimina todos los espacios en blanco y pone mayúsculas
+    limpio = "".join(texto.split()).upper()
+    return "N/A" if limpio == "0" else limpio
+
+def limpiar_texto_general(texto: str) -> str:
+    # Colapsa espacios múltiples que deja el autocorrector y recorta extremos
+    t = " ".join(texto.split())
+    return "N/A" if t == "0" else t
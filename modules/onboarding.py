@@ -1,6 +1,6 @@
 import logging
 import os
-import requests
+import time
 from datetime import datetime
 from functools import partial
 from dotenv import load_dotenv  # pip install python-dotenv
@@ -17,9 +17,13 @@ from telegram.ext import (
     Defaults,
 )
 
-from modules.logger import log_request
-from modules.database import chat_id_exists, register_user
+from modules.logger import log_request_async
+from modules.database import chat_id_exists, chat_id_exists_async, register_user, run_db
 from modules.ui import main_actions_keyboard
+from modules.outbox import FAILED, REGISTERED, enqueue_webhooks, outbox_store, wake_outbox
+from modules.persistence import PERSISTENCE_ENABLED
+# normalizar_id / limpiar_texto_general también los usa la importación masiva (employee_io)
+from modules.normalization import limpiar_texto_general, normalizar_id
 
 # --- 1. CARGA DE ENTORNO ---
 load_dotenv()  # Carga las variables del archivo .env
@@ -41,6 +45,9 @@ WEBHOOK_URLS = [w.strip() for w in _webhook_raw.split(",") if w.strip()]
 if not WEBHOOK_URLS:
     logging.warning("No se configuró WEBHOOK_ONBOARDING (o alias WEBHOOK_CONTRATO); el onboarding no enviará datos.")
 
+# Horas de payloads del outbox que se revisan al arrancar contra USERS_ALMA.users
+REGISTRATION_RECONCILE_HOURS = float(os.getenv("REGISTRATION_RECONCILE_HOURS", "48"))
+
 # --- 2. ESTADOS DEL FLUJO ---
 (
     NOMBRE_SALUDO, NOMBRE_COMPLETO, APELLIDO_PATERNO, APELLIDO_MATERNO,
@@ -57,18 +64,6 @@ if not WEBHOOK_URLS:
 
 # --- 3. HELPER: NORMALIZACIÓN Y MAPEOS ---
 
-def normalizar_id(texto: str) -> str:
-    """Elimina espacios y convierte a mayúsculas (para RFC y CURP)."""
-    if not texto: return "N/A"
-    # Elimina todos los espacios en blanco y pone mayúsculas
-    limpio = "".join(texto.split()).upper()
-    return "N/A" if limpio == "0" else limpio
-
-def limpiar_texto_general(texto: str) -> str:
-    # Colapsa espacios múltiples que deja el autocorrector y recorta extremos
-    t = " ".join(texto.split())
-    return "N/A" if t == "0" else t
-
 def _num_to_words_es_hasta_999(n: int) -> str:
     """Convierte un número (0-999) a texto en español sin acentos."""
     if n < 0 or n > 999:
@@ -174,10 +169,10 @@ TECLADO_RELACION_EMERGENCIA = ReplyKeyboardMarkup(
 
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     user = update.effective_user
-    log_request(user.id, user.username, "welcome", update.message.text)
+    await log_request_async(user.id, user.username, "welcome", update.message.text)
 
     # --- VERIFICACIÓN DE DUPLICADOS ---
-    if chat_id_exists(user.id):
+    if await chat_id_exists_async(user.id):
         await update.message.reply_text(
             "👩‍💼 Hola de nuevo. Ya tienes un registro activo en nuestro sistema.\n\n"
             "Si crees que es un error o necesitas hacer cambios, por favor contacta a tu manager o a RH directamente. "
@@ -304,6 +299,51 @@ async def manejar_flujo(update: Update, context: ContextTypes.DEFAULT_TYPE, esta
 
     return siguiente_estado
 
+def _persistir_registro(user_data: dict, payload: dict, headers: dict):
+    """Deja el webhook en el outbox y registra en la DB (bloqueante; corre en el executor de DB).
+
+    El outbox (SQLite local) y MySQL no comparten transacción. El webhook y los datos del
+    registro (con `meta`) se escriben primero, en una transacción del outbox; el resultado de
+    register_user queda marcado en outbox_registrations. Si el proceso cae entre los dos pasos
+    la fila sigue sin marca y reconcile_registrations completa el registro al arrancar.
+    """
+    encolados = enqueue_webhooks(WEBHOOK_URLS, payload, headers=headers, timeout=20, registration=user_data)
+    db_ok = register_user(user_data)
+    _marcar_registro(user_data["metadata"]["chat_id"], db_ok)
+    return db_ok, encolados
+
+def _marcar_registro(chat_id, db_ok: bool):
+    try:
+        outbox_store.mark_registration(chat_id, REGISTERED if db_ok else FAILED)
+    except Exception as exc:
+        logging.error(f"No se pudo marcar el registro de {chat_id} en el outbox: {exc}")
+
+def reconcile_registrations(hours: float = REGISTRATION_RECONCILE_HOURS) -> int:
+    """Completa los registros de las últimas `hours` horas que quedaron sin intentar (bloqueante; post_init).
+
+    Sólo toma filas de outbox_registrations sin marca: un registro que falló (rfc/curp
+    duplicado) o que RH borró después ya quedó marcado y no se repite.
+    """
+    try:
+        pendientes = outbox_store.unattempted_registrations(time.time() - hours * 3600)
+    except Exception as exc:
+        logging.error(f"No se pudo leer el outbox para conciliar registros: {exc}")
+        return 0
+    recuperados = 0
+    for chat_id, user_data in pendientes:
+        # El proceso pudo caer después de register_user y antes de la marca
+        if chat_id_exists(chat_id):
+            _marcar_registro(chat_id, True)
+            continue
+        db_ok = register_user(user_data)
+        _marcar_registro(chat_id, db_ok)
+        if db_ok:
+            recuperados += 1
+            logging.warning(f"Registro de {chat_id} recuperado desde el outbox.")
+        else:
+            logging.error(f"No se pudo recuperar el registro de {chat_id} desde el outbox.")
+    return recuperados
+
 async def finalizar(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     # Guardar última respuesta (Relación Emergencia)
     context.user_data["respuestas"][EMERGENCIA_RELACION] = limpiar_texto_general(update.message.text)
@@ -391,25 +431,13 @@ async def finalizar(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
 
     headers = {"Content-Type": "application/json", "User-Agent": "Welcome2Soul-Bot"}
     
-    urls_a_enviar = WEBHOOK_URLS
-    enviado = False
-    for url in urls_a_enviar:
-        if not url:
-            continue
-        try:
-            res = requests.post(url.strip(), json=payload, headers=headers, timeout=20)
-            res.raise_for_status()
-            enviado = True
-            logging.info(f"Webhook enviado exitosamente a: {url}")
-        except Exception as e:
-            logging.error(f"Error enviando webhook a {url}: {e}")
-
-    # --- REGISTRO EN BASE DE DATOS ---
-    db_ok = register_user({
-        "meta": meta,
-        **payload
-    })
-    
+    # --- OUTBOX + REGISTRO EN BASE DE DATOS ---
+    # El payload queda guardado en el outbox en el mismo paso que el registro;
+    # el worker lo entrega a n8n en segundo plano (con reintentos).
+    db_ok, encolados = await run_db(_persistir_registro, {"meta": meta, **payload}, payload, headers)
+    wake_outbox()
+    enviado = encolados > 0
+
     chat_id_log = payload.get("metadata", {}).get("chat_id", meta.get("telegram_id"))
     if db_ok:
         logging.info(f"Usuario {chat_id_log} registrado en la base de datos.")
@@ -456,7 +484,9 @@ onboarding_handler = ConversationHandler(
     ],
     states=states,
     fallbacks=[CommandHandler("cancelar", cancelar)],
-    allow_reentry=True
+    allow_reentry=True,
+    name="onboarding",
+    persistent=PERSISTENCE_ENABLED,
 )
 
 def main():
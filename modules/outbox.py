@@ -0,0 +1,397 @@
+import asyncio
+import json
+import logging
+import os
+import random
+import sqlite3
+import threading
+import time
+
+from modules.database import run_db
+from modules.metrics import HistogramFamily, StatsFamily, register
+from modules.webhooks import post_webhook
+
+# --- WEBHOOK OUTBOX ---
+# Cada webhook se guarda primero en un SQLite local (una fila por URL) y un worker
+# lo entrega en segundo plano con reintentos. La usuaria recibe su respuesta de inmediato
+# y un n8n caído ya no significa datos perdidos.
+OUTBOX_PATH = os.getenv("OUTBOX_PATH", "storage/outbox.sqlite3")
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "8"))
+OUTBOX_BASE_BACKOFF = float(os.getenv("OUTBOX_BASE_BACKOFF", "5"))
+OUTBOX_MAX_BACKOFF = float(os.getenv("OUTBOX_MAX_BACKOFF", "1800"))
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "50"))
+OUTBOX_CONCURRENCY = int(os.getenv("OUTBOX_CONCURRENCY", "10"))
+OUTBOX_POLL_INTERVAL = float(os.getenv("OUTBOX_POLL_INTERVAL", "5"))
+# Tope total por lote: lo que no terminó cuenta como intento fallido y se reintenta con backoff
+OUTBOX_DELIVERY_DEADLINE = float(os.getenv("OUTBOX_DELIVERY_DEADLINE", "60"))
+# Días que se conservan las filas entregadas (y los registros ya intentados) / las dead-letter
+OUTBOX_RETENTION_DAYS = float(os.getenv("OUTBOX_RETENTION_DAYS", "7"))
+OUTBOX_DEAD_RETENTION_DAYS = float(os.getenv("OUTBOX_DEAD_RETENTION_DAYS", "30"))
+OUTBOX_PURGE_INTERVAL = float(os.getenv("OUTBOX_PURGE_INTERVAL", "3600"))
+
+PENDING, DELIVERED, DEAD = "pending", "delivered", "dead"
+# Estados de outbox_registrations
+REGISTERED, FAILED = "registered", "failed"
+
+# Del encolado a la entrega: con reintentos llega a minutos u horas
+delivery_seconds = register(HistogramFamily(
+    "vanessa_outbox_delivery_seconds", "Time from enqueue to the final outcome of an outbox row.", ("outcome",),
+    buckets=(0.1, 0.5, 1.0, 5.0, 15.0, 60.0, 300.0, 900.0, 1800.0, 3600.0, 7200.0, 21600.0),
+))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS webhook_outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    url TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    headers TEXT,
+    timeout REAL NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL,
+    last_error TEXT,
+    created_at REAL NOT NULL,
+    delivered_at REAL
+);
+CREATE INDEX IF NOT EXISTS ix_webhook_outbox_due ON webhook_outbox (status, next_attempt_at);
+CREATE INDEX IF NOT EXISTS ix_webhook_outbox_created ON webhook_outbox (status, created_at);
+CREATE TABLE IF NOT EXISTS outbox_registrations (
+    chat_id TEXT PRIMARY KEY,
+    user_data TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    created_at REAL NOT NULL,
+    attempted_at REAL
+);
+CREATE INDEX IF NOT EXISTS ix_outbox_registrations_status ON outbox_registrations (status, created_at);
+"""
+
+
+def backoff_delay(attempts: int, base: float = OUTBOX_BASE_BACKOFF, cap: float = OUTBOX_MAX_BACKOFF) -> float:
+    """Exponential backoff with full jitter for the given number of failed attempts."""
+    return random.uniform(0, min(cap, base * (2 ** max(0, attempts - 1))))
+
+
+class OutboxStore:
+    """SQLite-backed table of pending webhook deliveries (blocking; use through run_db)."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def enqueue(self, urls: list, payload: dict, headers: dict = None, timeout: float = 20,
+                registration: dict = None) -> int:
+        """Stores one pending delivery per URL in a single transaction; returns rows written.
+
+        `registration` (the register_user data, keyed by its metadata.chat_id) is stored in the
+        same transaction as a pending row of outbox_registrations; see mark_registration.
+        """
+        urls = [u.strip() for u in urls if u and u.strip()]
+        chat_id = ((registration or {}).get("metadata") or {}).get("chat_id")
+        if not urls and not chat_id:
+            return 0
+        now = time.time()
+        body = json.dumps(payload, default=str, ensure_ascii=False)
+        headers_json = json.dumps(headers) if headers else None
+        rows = [(url, body, headers_json, timeout, now, now) for url in urls]
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.execute("BEGIN")
+                conn.executemany(
+                    "INSERT INTO webhook_outbox (url, payload, headers, timeout, next_attempt_at, created_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    rows,
+                )
+                if chat_id:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO outbox_registrations (chat_id, user_data, status, created_at) "
+                        "VALUES (?, ?, ?, ?)",
+                        (str(chat_id), json.dumps(registration, default=str, ensure_ascii=False), PENDING, now),
+                    )
+        return len(rows)
+
+    def fetch_due(self, limit: int) -> list:
+        with self._lock:
+            cur = self._connection().execute(
+                "SELECT id, url, payload, headers, timeout, attempts, created_at FROM webhook_outbox "
+                "WHERE status = ? AND next_attempt_at <= ? ORDER BY next_attempt_at LIMIT ?",
+                (PENDING, time.time(), limit),
+            )
+            return cur.fetchall()
+
+    def record_outcomes(self, outcomes: list):
+        """Applies (id, status, attempts, next_attempt_at, last_error) tuples in one transaction."""
+        if not outcomes:
+            return
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.execute("BEGIN")
+                conn.executemany(
+                    "UPDATE webhook_outbox SET status = ?, attempts = ?, next_attempt_at = ?, last_error = ?, "
+                    "delivered_at = CASE WHEN ? = 'delivered' THEN ? ELSE delivered_at END WHERE id = ?",
+                    [(status, attempts, next_at, error, status, now, row_id) for row_id, status, attempts, next_at, error in outcomes],
+                )
+
+    def mark_registration(self, chat_id, status: str):
+        """Records the outcome (REGISTERED / FAILED) of the register_user attempt for `chat_id`."""
+        with self._lock:
+            self._connection().execute(
+                "UPDATE outbox_registrations SET status = ?, attempted_at = ? WHERE chat_id = ?",
+                (status, time.time(), str(chat_id)),
+            )
+
+    def unattempted_registrations(self, since: float) -> list:
+        """(chat_id, user_data) stored since `since` whose register_user never ran to completion."""
+        with self._lock:
+            cur = self._connection().execute(
+                "SELECT chat_id, user_data FROM outbox_registrations WHERE status = ? AND created_at >= ?",
+                (PENDING, since),
+            )
+            return [(chat_id, json.loads(user_data)) for chat_id, user_data in cur.fetchall()]
+
+    def purge(self, retention_days: float = OUTBOX_RETENTION_DAYS,
+              dead_retention_days: float = OUTBOX_DEAD_RETENTION_DAYS) -> int:
+        """Deletes delivered rows and attempted registrations older than `retention_days`, and
+        dead rows older than `dead_retention_days`; returns rows deleted."""
+        now = time.time()
+        delivered_before = now - retention_days * 86400
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.execute("BEGIN")
+                deleted = conn.execute(
+                    "DELETE FROM webhook_outbox WHERE status = ? AND created_at < ?", (DELIVERED, delivered_before),
+                ).rowcount
+                deleted += conn.execute(
+                    "DELETE FROM webhook_outbox WHERE status = ? AND created_at < ?",
+                    (DEAD, now - dead_retention_days * 86400),
+                ).rowcount
+                deleted += conn.execute(
+                    "DELETE FROM outbox_registrations WHERE status != ? AND created_at < ?", (PENDING, delivered_before),
+                ).rowcount
+        return deleted
+
+    def counts(self) -> dict:
+        with self._lock:
+            cur = self._connection().execute("SELECT status, COUNT(*) FROM webhook_outbox GROUP BY status")
+            counts = {PENDING: 0, DELIVERED: 0, DEAD: 0}
+            counts.update(dict(cur.fetchall()))
+            return counts
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+class OutboxWorker:
+    """Delivers due outbox rows with bounded concurrency, backoff and a dead-letter state."""
+
+    def __init__(self, store: OutboxStore, batch_size: int = OUTBOX_BATCH_SIZE, concurrency: int = OUTBOX_CONCURRENCY,
+                 max_attempts: int = OUTBOX_MAX_ATTEMPTS, poll_interval: float = OUTBOX_POLL_INTERVAL,
+                 base_backoff: float = OUTBOX_BASE_BACKOFF, max_backoff: float = OUTBOX_MAX_BACKOFF,
+                 deadline: float = OUTBOX_DELIVERY_DEADLINE):
+        self.store = store
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.poll_interval = poll_interval
+        self.deadline = deadline
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._wakeup = asyncio.Event()
+        self._task = None
+        self._started_at = None
+        self._next_purge = 0.0
+        self.stats = {"delivered": 0, "retried": 0, "dead": 0, "purged": 0, "deadline_exceeded": 0}
+
+    def start(self):
+        if self._task is None:
+            self._started_at = time.monotonic()
+            self._task = asyncio.create_task(self._run(), name="webhook-outbox")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def wake(self):
+        self._wakeup.set()
+
+    def throughput(self) -> float:
+        """Delivered rows per second since the worker started."""
+        if not self._started_at:
+            return 0.0
+        elapsed = time.monotonic() - self._started_at
+        return self.stats["delivered"] / elapsed if elapsed > 0 else 0.0
+
+    async def _purge_if_due(self):
+        # La retención corre a lo más cada OUTBOX_PURGE_INTERVAL segundos, entre lotes
+        if time.monotonic() < self._next_purge:
+            return
+        self._next_purge = time.monotonic() + OUTBOX_PURGE_INTERVAL
+        deleted = await run_db(self.store.purge)
+        self.stats["purged"] += deleted
+        if deleted:
+            logging.info(f"Outbox retention purged {deleted} rows.")
+
+    async def _run(self):
+        while True:
+            try:
+                await self._purge_if_due()
+                due = await run_db(self.store.fetch_due, self.batch_size)
+                if due:
+                    await self.deliver(due)
+                    continue
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                logging.error(f"Outbox worker error: {exc}")
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    async def deliver(self, rows: list):
+        """Delivers one batch within `deadline` seconds; rows still in flight are cancelled and retried."""
+        if not rows:
+            return
+        tasks = [asyncio.create_task(self._deliver_one(row)) for row in rows]
+        done, late = await asyncio.wait(tasks, timeout=self.deadline)
+        for task in late:
+            task.cancel()
+        if late:
+            self.stats["deadline_exceeded"] += len(late)
+            await asyncio.wait(late)
+        outcomes = []
+        for task, row in zip(tasks, rows):
+            if task in late:
+                outcomes.append(self._failed(row, f"deadline of {self.deadline:g}s exceeded"))
+            elif task.exception() is not None:
+                outcomes.append(self._failed(row, repr(task.exception())))
+            else:
+                outcomes.append(task.result())
+        _report(rows, outcomes)
+        await run_db(self.store.record_outcomes, outcomes)
+
+    async def _deliver_one(self, row):
+        row_id, url, payload, headers, timeout, attempts, created_at = row
+        async with self._semaphore:
+            result = await post_webhook(url, json.loads(payload), timeout=timeout, headers=json.loads(headers) if headers else None)
+        if result.ok:
+            self.stats["delivered"] += 1
+            delivery_seconds.observe(time.time() - created_at, DELIVERED)
+            return (row_id, DELIVERED, attempts + 1, time.time(), None)
+        return self._failed(row, result.error)
+
+    def _failed(self, row, error: str):
+        """Outcome of a failed attempt: retry with backoff, or dead-letter after max_attempts."""
+        row_id, url, _payload, _headers, _timeout, attempts, created_at = row
+        attempts += 1
+        if attempts >= self.max_attempts:
+            self.stats["dead"] += 1
+            delivery_seconds.observe(time.time() - created_at, DEAD)
+            logging.error(f"Outbox entry {row_id} to {url} moved to dead-letter after {attempts} attempts.")
+            return (row_id, DEAD, attempts, time.time(), error)
+        self.stats["retried"] += 1
+        return (row_id, PENDING, attempts, time.time() + backoff_delay(attempts, self.base_backoff, self.max_backoff), error)
+
+
+def _report(rows: list, outcomes: list):
+    """Logs, per URL, how many rows of the batch failed and the last error."""
+    failed = {}
+    for row, (_row_id, status, _attempts, _next_at, error) in zip(rows, outcomes):
+        url = row[1]
+        total, errors, last_error = failed.get(url, (0, 0, None))
+        failed[url] = (total + 1, errors + (status != DELIVERED), error or last_error)
+    for url, (total, errors, last_error) in failed.items():
+        if errors:
+            logging.warning(f"Outbox batch to {url}: {errors}/{total} failed (last error: {last_error}).")
+
+
+outbox_store = OutboxStore(OUTBOX_PATH)
+_worker = None
+
+
+def enqueue_webhooks(urls: list, payload: dict, headers: dict = None, timeout: float = 20,
+                     registration: dict = None) -> int:
+    """Durably stores the payload for every URL (blocking; call it inside the same run_db step as the DB write)."""
+    try:
+        return outbox_store.enqueue(urls, payload, headers=headers, timeout=timeout, registration=registration)
+    except Exception as exc:
+        logging.error(f"Could not write webhook to outbox: {exc}")
+        return 0
+
+
+async def enqueue_webhooks_async(urls: list, payload: dict, headers: dict = None, timeout: float = 20) -> int:
+    """Awaitable version of enqueue_webhooks; wakes the worker so delivery starts right away."""
+    count = await run_db(enqueue_webhooks, urls, payload, headers, timeout)
+    if count:
+        wake_outbox()
+    return count
+
+
+def wake_outbox():
+    if _worker is not None:
+        _worker.wake()
+
+
+def start_outbox_worker():
+    """Starts the delivery worker on the running loop (called from Application post_init)."""
+    global _worker
+    if _worker is None:
+        _worker = OutboxWorker(outbox_store)
+    _worker.start()
+
+
+async def stop_outbox_worker():
+    global _worker
+    if _worker is not None:
+        await _worker.stop()
+        _worker = None
+
+
+def outbox_stats() -> dict:
+    """Queue depth per status plus delivery counters and throughput of this process."""
+    try:
+        counts = outbox_store.counts()
+    except Exception as exc:
+        logging.error(f"Could not read outbox counts: {exc}")
+        counts = {}
+    worker_stats = dict(_worker.stats) if _worker else {
+        "delivered": 0, "retried": 0, "dead": 0, "purged": 0, "deadline_exceeded": 0,
+    }
+    return {
+        "depth": counts,
+        **{f"worker_{k}": v for k, v in worker_stats.items()},
+        "deliveries_per_sec": _worker.throughput() if _worker else 0.0,
+    }
+
+
+register(StatsFamily(
+    "vanessa_outbox",
+    "Webhook outbox: rows per status and deliveries/s; worker delivered, retried, dead, purged and past the deadline.",
+    outbox_stats,
+    counters=("worker_delivered", "worker_retried", "worker_dead", "worker_purged", "worker_deadline_exceeded"),
+))
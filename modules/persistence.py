@@ -0,0 +1,270 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+from telegram.ext import BasePersistence, PersistenceInput
+
+from modules.database import run_db
+from modules.metrics import Histogram
+
+# --- PERSISTENCIA DE CONVERSACIONES ---
+# user_data (respuestas del onboarding, fechas de vacaciones/permiso, current_state de los
+# flujos) y el estado de cada ConversationHandler se guardan en un SQLite local: un deploy o
+# un reinicio ya no hace perder el avance de la usuaria. PERSISTENCE_PATH vacío lo desactiva.
+PERSISTENCE_PATH = os.getenv("PERSISTENCE_PATH", "storage/conversations.sqlite3")
+# Segundos entre escrituras agrupadas (PTB llama a update_persistence con este intervalo)
+PERSISTENCE_FLUSH_INTERVAL = float(os.getenv("PERSISTENCE_FLUSH_INTERVAL", "5"))
+PERSISTENCE_ENABLED = bool(PERSISTENCE_PATH)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS user_data (
+    user_id INTEGER PRIMARY KEY,
+    data BLOB NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS conversations (
+    name TEXT NOT NULL,
+    conv_key TEXT NOT NULL,
+    state BLOB NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (name, conv_key)
+);
+"""
+
+
+def _digest(blob: bytes) -> bytes:
+    return hashlib.blake2b(blob, digest_size=16).digest()
+
+
+class ConversationStore:
+    """SQLite tables for user_data and conversation states (blocking; use through run_db)."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def load_user(self, user_id: int):
+        with self._lock:
+            row = self._connection().execute("SELECT data FROM user_data WHERE user_id = ?", (user_id,)).fetchone()
+        return row[0] if row else None
+
+    def load_conversations(self, name: str) -> list:
+        with self._lock:
+            cur = self._connection().execute("SELECT conv_key, state FROM conversations WHERE name = ?", (name,))
+            return cur.fetchall()
+
+    def write(self, users: dict, dropped: set, conversations: dict):
+        """Applies one flush in a single transaction.
+
+        users: {user_id: pickled bytes}; dropped: user ids to delete;
+        conversations: {(name, conv_key): pickled state or None to delete}.
+        """
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.execute("BEGIN")
+                if users:
+                    conn.executemany(
+                        "INSERT INTO user_data (user_id, data, updated_at) VALUES (?, ?, ?) "
+                        "ON CONFLICT(user_id) DO UPDATE SET data = excluded.data, updated_at = excluded.updated_at",
+                        [(user_id, blob, now) for user_id, blob in users.items()],
+                    )
+                if dropped:
+                    conn.executemany("DELETE FROM user_data WHERE user_id = ?", [(user_id,) for user_id in dropped])
+                upserts = [(name, key, state, now) for (name, key), state in conversations.items() if state is not None]
+                deletes = [(name, key) for (name, key), state in conversations.items() if state is None]
+                if upserts:
+                    conn.executemany(
+                        "INSERT INTO conversations (name, conv_key, state, updated_at) VALUES (?, ?, ?, ?) "
+                        "ON CONFLICT(name, conv_key) DO UPDATE SET state = excluded.state, updated_at = excluded.updated_at",
+                        upserts,
+                    )
+                if deletes:
+                    conn.executemany("DELETE FROM conversations WHERE name = ? AND conv_key = ?", deletes)
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+class SQLitePersistence(BasePersistence):
+    """BasePersistence for user_data and ConversationHandler states.
+
+    * user_data is loaded lazily: nothing at startup, each user's row the first time an
+      update from that user arrives (refresh_user_data).
+    * Writes are staged in memory and committed in one transaction per update_interval;
+      data whose pickled content did not change since the last write is skipped.
+    """
+
+    def __init__(self, path: str = PERSISTENCE_PATH, update_interval: float = PERSISTENCE_FLUSH_INTERVAL):
+        super().__init__(
+            store_data=PersistenceInput(bot_data=False, chat_data=False, user_data=True, callback_data=False),
+            update_interval=update_interval,
+        )
+        self.store = ConversationStore(path)
+        self._loaded_users = set()
+        self._digests = {}
+        self._pending_users = {}
+        self._pending_drops = set()
+        self._pending_conversations = {}
+        self._flush_task = None
+        self._flush_lock = asyncio.Lock()
+        self.flush_histogram = Histogram()
+        self.stats = {"flushes": 0, "rows_written": 0, "bytes_written": 0, "unchanged_skipped": 0, "users_loaded": 0}
+
+    # --- lectura ---
+    async def get_user_data(self) -> dict:
+        return {}
+
+    async def get_chat_data(self) -> dict:
+        return {}
+
+    async def get_bot_data(self) -> dict:
+        return {}
+
+    async def get_callback_data(self):
+        return None
+
+    async def get_conversations(self, name: str) -> dict:
+        rows = await run_db(self.store.load_conversations, name)
+        conversations = {}
+        for conv_key, blob in rows:
+            key = tuple(json.loads(conv_key))
+            conversations[key] = pickle.loads(blob)
+            self._digests[("conv", name, conv_key)] = _digest(blob)
+        return conversations
+
+    async def refresh_user_data(self, user_id: int, user_data: dict) -> None:
+        if user_id in self._loaded_users:
+            return
+        self._loaded_users.add(user_id)
+        blob = await run_db(self.store.load_user, user_id)
+        if blob is None:
+            return
+        self._digests[("user", user_id)] = _digest(blob)
+        for key, value in pickle.loads(blob).items():
+            user_data.setdefault(key, value)
+        self.stats["users_loaded"] += 1
+
+    async def refresh_chat_data(self, chat_id: int, chat_data: dict) -> None:
+        pass
+
+    async def refresh_bot_data(self, bot_data: dict) -> None:
+        pass
+
+    # --- escritura (se acumula y se escribe por lote) ---
+    def _stage_changed(self, digest_key, blob: bytes) -> bool:
+        digest = _digest(blob)
+        if self._digests.get(digest_key) == digest:
+            self.stats["unchanged_skipped"] += 1
+            return False
+        self._digests[digest_key] = digest
+        return True
+
+    async def update_user_data(self, user_id: int, data: dict) -> None:
+        blob = pickle.dumps(dict(data), protocol=pickle.HIGHEST_PROTOCOL)
+        if self._stage_changed(("user", user_id), blob):
+            self._pending_drops.discard(user_id)
+            self._pending_users[user_id] = blob
+            self._schedule_flush()
+
+    async def drop_user_data(self, user_id: int) -> None:
+        self._digests.pop(("user", user_id), None)
+        self._pending_users.pop(user_id, None)
+        self._pending_drops.add(user_id)
+        self._schedule_flush()
+
+    async def update_conversation(self, name: str, key, new_state) -> None:
+        conv_key = json.dumps(list(key))
+        if new_state is None:
+            self._digests.pop(("conv", name, conv_key), None)
+            self._pending_conversations[(name, conv_key)] = None
+        else:
+            blob = pickle.dumps(new_state, protocol=pickle.HIGHEST_PROTOCOL)
+            if not self._stage_changed(("conv", name, conv_key), blob):
+                return
+            self._pending_conversations[(name, conv_key)] = blob
+        self._schedule_flush()
+
+    async def update_chat_data(self, chat_id: int, data) -> None:
+        pass
+
+    async def drop_chat_data(self, chat_id: int) -> None:
+        pass
+
+    async def update_bot_data(self, data) -> None:
+        pass
+
+    async def update_callback_data(self, data) -> None:
+        pass
+
+    def _schedule_flush(self):
+        # update_persistence llama a todos los update_* a la vez; un solo flush los agrupa
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_pending(), name="persistence-flush")
+
+    async def _flush_pending(self):
+        await asyncio.sleep(0)
+        async with self._flush_lock:
+            users, self._pending_users = self._pending_users, {}
+            dropped, self._pending_drops = self._pending_drops, set()
+            conversations, self._pending_conversations = self._pending_conversations, {}
+            if not (users or dropped or conversations):
+                return
+            start = time.perf_counter()
+            try:
+                await run_db(self.store.write, users, dropped, conversations)
+            except Exception as exc:
+                logging.error(f"Could not persist conversation state: {exc}")
+                # Se reintenta en el siguiente flush sin pisar lo que llegó mientras tanto
+                for user_id, blob in users.items():
+                    self._pending_users.setdefault(user_id, blob)
+                self._pending_drops |= dropped - set(self._pending_users)
+                for key, blob in conversations.items():
+                    self._pending_conversations.setdefault(key, blob)
+                for user_id in users:
+                    self._digests.pop(("user", user_id), None)
+                return
+            self.flush_histogram.observe(time.perf_counter() - start)
+            self.stats["flushes"] += 1
+            self.stats["rows_written"] += len(users) + len(dropped) + len(conversations)
+            self.stats["bytes_written"] += sum(map(len, users.values())) + sum(
+                len(blob) for blob in conversations.values() if blob is not None
+            )
+
+    async def flush(self) -> None:
+        """Called by Application.stop(): writes whatever is still staged."""
+        if self._flush_task is not None:
+            await self._flush_task
+            self._flush_task = None
+        await self._flush_pending()
+
+    def persistence_stats(self) -> dict:
+        return {**self.stats, "flush_latency": self.flush_histogram.snapshot()}
+
+
+def build_persistence():
+    """Persistence for the Application, or None when PERSISTENCE_PATH is empty."""
+    return SQLitePersistence(PERSISTENCE_PATH) if PERSISTENCE_ENABLED else None
@@ -0,0 +1,123 @@
+import json
+import logging
+import math
+import os
+import threading
+import unicodedata
+from collections import Counter, defaultdict
+
+# Clasificador local (sin red) de motivos de permiso: Naive Bayes multinomial sobre
+# palabras + n-gramas de caracteres, entrenado con el corpus etiquetado en data/.
+# Se usa como primer filtro; sólo los motivos dudosos llegan a Gemini.
+LOCAL_CLASSIFIER_DATA = os.getenv(
+    "LOCAL_CLASSIFIER_DATA",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "motivos_permiso.jsonl"),
+)
+
+NGRAM_RANGE = (3, 4)
+ALPHA = 0.5
+
+
+def normalize_reason(text: str) -> str:
+    """Lowercases, strips accents and collapses whitespace so equivalent reasons compare equal."""
+    folded = unicodedata.normalize("NFKD", (text or "").lower())
+    folded = "".join(ch for ch in folded if not unicodedata.combining(ch))
+    return " ".join(folded.split())
+
+
+def _features(normalized: str) -> Counter:
+    """Word tokens plus char n-grams of each padded word (input must already be normalized)."""
+    feats = Counter()
+    for word in normalized.split():
+        word = word.strip(".,;:!?¡¿()\"'")
+        if not word:
+            continue
+        feats["w:" + word] += 1
+        padded = f" {word} "
+        for n in range(NGRAM_RANGE[0], NGRAM_RANGE[1] + 1):
+            for i in range(len(padded) - n + 1):
+                feats["c:" + padded[i:i + n]] += 1
+    return feats
+
+
+class ReasonClassifier:
+    """Multinomial Naive Bayes over normalized reason text."""
+
+    def __init__(self, examples: list, alpha: float = ALPHA):
+        self.alpha = alpha
+        doc_counts = Counter()
+        feature_counts = defaultdict(Counter)
+        for text, label in examples:
+            doc_counts[label] += 1
+            feature_counts[label].update(_features(normalize_reason(text)))
+
+        self.labels = sorted(doc_counts)
+        vocabulary = set()
+        for counts in feature_counts.values():
+            vocabulary.update(counts)
+        vocab_size = len(vocabulary)
+        total_docs = sum(doc_counts.values())
+
+        # Tablas precalculadas de log-probabilidades: predecir es sólo sumar
+        self._log_prior = {label: math.log(doc_counts[label] / total_docs) for label in self.labels}
+        self._log_likelihood = {}
+        self._log_unseen = {}
+        for label in self.labels:
+            denom = sum(feature_counts[label].values()) + alpha * vocab_size
+            self._log_likelihood[label] = {f: math.log((c + alpha) / denom) for f, c in feature_counts[label].items()}
+            self._log_unseen[label] = math.log(alpha / denom)
+        self._vocabulary = frozenset(vocabulary)
+
+    @classmethod
+    def from_file(cls, path: str = LOCAL_CLASSIFIER_DATA):
+        """Trains from a JSONL file of {"texto": ..., "categoria": ...} rows."""
+        examples = []
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    row = json.loads(line)
+                    examples.append((row["texto"], row["categoria"]))
+        return cls(examples)
+
+    def predict(self, text: str):
+        """Returns (category, confidence); confidence is the posterior of the winning class."""
+        feats = {f: c for f, c in _features(normalize_reason(text)).items() if f in self._vocabulary}
+        if not feats:
+            return None, 0.0
+        scores = {}
+        for label in self.labels:
+            table = self._log_likelihood[label]
+            unseen = self._log_unseen[label]
+            scores[label] = self._log_prior[label] + sum(c * table.get(f, unseen) for f, c in feats.items())
+        best = max(scores, key=scores.get)
+        # NB sobreestima su confianza con textos largos: se atempera por sqrt(#features)
+        temperature = max(1.0, math.sqrt(sum(feats.values())))
+        top = scores[best]
+        norm = sum(math.exp((s - top) / temperature) for s in scores.values())
+        return best, 1.0 / norm
+
+
+_classifier = None
+_classifier_lock = threading.Lock()
+
+
+def get_local_classifier():
+    """Lazily trains the bundled classifier; returns None if the corpus is missing."""
+    global _classifier
+    with _classifier_lock:
+        if _classifier is None:
+            try:
+                _classifier = ReasonClassifier.from_file(LOCAL_CLASSIFIER_DATA)
+            except Exception as exc:
+                logging.error(f"Local reason classifier disabled: {exc}")
+                _classifier = False
+    return _classifier or None
+
+
+def classify_local(text: str):
+    """Offline first tier: (category, confidence), or (None, 0.0) when unavailable."""
+    classifier = get_local_classifier()
+    if not classifier:
+        return None, 0.0
+    return classifier.predict(text)
@@ -1,13 +1,14 @@
 import os
-import requests
 import secrets
 import string
 from datetime import datetime, date
 from telegram import ReplyKeyboardMarkup, ReplyKeyboardRemove, Update
 from telegram.ext import CommandHandler, ContextTypes, ConversationHandler, MessageHandler, filters
-from modules.logger import log_request
+from modules.logger import log_request_async
 from modules.ui import main_actions_keyboard
-from modules.ai import classify_reason
+from modules.ai import classify_reason_async
+from modules.outbox import enqueue_webhooks_async
+from modules.persistence import PERSISTENCE_ENABLED
 
 # IDs cortos para correlación y trazabilidad
 def _short_id(length: int = 11) -> str:
@@ -19,16 +20,9 @@ def _get_webhook_list(env_name: str) -> list:
     raw = os.getenv(env_name, "")
     return [w.strip() for w in raw.split(",") if w.strip()]
 
-def _send_webhooks(urls: list, payload: dict):
-    enviados = 0
-    for url in urls:
-        try:
-            res = requests.post(url, json=payload, timeout=15)
-            res.raise_for_status()
-            enviados += 1
-        except Exception as e:
-            print(f"[webhook] Error enviando a {url}: {e}")
-    return enviados
+async def _send_webhooks(urls: list, payload: dict):
+    # Se guarda en el outbox y se entrega en segundo plano con reintentos
+    return await enqueue_webhooks_async(urls, payload, timeout=15)
 
 # Estados de conversación
 (
@@ -122,7 +116,7 @@ def _fmt_fecha(fecha_iso: str) -> str:
 # --- Vacaciones ---
 async def start_vacaciones(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     user = update.effective_user
-    log_request(user.id, user.username, "vacaciones", update.message.text)
+    await log_request_async(user.id, user.username, "vacaciones", update.message.text)
     context.user_data.clear()
     context.user_data['tipo'] = 'VACACIONES'
     await update.message.reply_text(
@@ -134,7 +128,7 @@ async def start_vacaciones(update: Update, context: ContextTypes.DEFAULT_TYPE) -
 # --- Permiso ---
 async def start_permiso(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     user = update.effective_user
-    log_request(user.id, user.username, "permiso", update.message.text)
+    await log_request_async(user.id, user.username, "permiso", update.message.text)
     context.user_data.clear()
     context.user_data['tipo'] = 'PERMISO'
     await update.message.reply_text(
@@ -292,7 +286,7 @@ async def recibir_motivo_fin(update: Update, context: ContextTypes.DEFAULT_TYPE)
     webhooks = []
     if datos['tipo'] == 'PERMISO':
         webhooks = _get_webhook_list("WEBHOOK_PERMISOS")
-        categoria = classify_reason(motivo)
+        categoria = await classify_reason_async(motivo)
         payload["categoria_detectada"] = categoria
         payload["horario"] = datos.get("horario", "N/A")
         await update.message.reply_text(f"Categoría detectada → **{categoria}** 🚨")
@@ -332,7 +326,7 @@ async def recibir_motivo_fin(update: Update, context: ContextTypes.DEFAULT_TYPE)
             await update.message.reply_text("🤔 No entendí las fechas. Por favor, comparte día y mes otra vez con /vacaciones.")
 
     try:
-        enviados = _send_webhooks(webhooks, payload) if webhooks else 0
+        enviados = await _send_webhooks(webhooks, payload) if webhooks else 0
         tipo_solicitud_texto = "Permiso" if datos['tipo'] == 'PERMISO' else 'Vacaciones'
         inicio_txt = _fmt_fecha(payload["fechas"]["inicio"])
         fin_txt = _fmt_fecha(payload["fechas"]["fin"])
@@ -394,7 +388,9 @@ vacaciones_handler = ConversationHandler(
         MOTIVO: [MessageHandler(filters.TEXT & ~filters.COMMAND, recibir_motivo_fin)]
     },
     fallbacks=[CommandHandler("cancelar", cancelar)],
-    allow_reentry=True
+    allow_reentry=True,
+    name="vacaciones",
+    persistent=PERSISTENCE_ENABLED,
 )
 
 permiso_handler = ConversationHandler(
@@ -410,5 +406,7 @@ permiso_handler = ConversationHandler(
         MOTIVO: [MessageHandler(filters.TEXT & ~filters.COMMAND, recibir_motivo_fin)]
     },
     fallbacks=[CommandHandler("cancelar", cancelar)],
-    allow_reentry=True
+    allow_reentry=True,
+    name="permiso",
+    persistent=PERSISTENCE_ENABLED,
 )
@@ -0,0 +1,80 @@
+import logging
+import os
+import zlib
+from typing import Optional
+
+import httpx
+from telegram import Update
+
+# --- SHARDING POR CHAT ---
+# Varias réplicas detrás de un solo webhook: cada update pertenece a la réplica
+# crc32(chat_id) % len(SHARD_URLS). Si llega a otra, ésta lo reenvía tal cual a su dueña.
+# Así el estado por proceso (conversaciones, cachés, orden por chat) sigue siendo coherente.
+SHARD_URLS = [u.strip() for u in os.getenv("SHARD_URLS", "").split(",") if u.strip()]
+SHARD_INDEX = int(os.getenv("SHARD_INDEX", "0"))
+SHARD_FORWARD_TIMEOUT = float(os.getenv("SHARD_FORWARD_TIMEOUT", "10"))
+
+FORWARDED_HEADER = "X-Vanessa-Forwarded-By"
+
+
+def shard_for(key, shards: int) -> int:
+    """Stable owner index for a chat id (same result in every process, unlike hash())."""
+    return zlib.crc32(str(key).encode()) % shards
+
+
+def update_shard_key(update: Update):
+    if update.effective_chat is not None:
+        return update.effective_chat.id
+    if update.effective_user is not None:
+        return update.effective_user.id
+    return None
+
+
+class ShardRouter:
+    """Decides which replica owns an update and forwards it there."""
+
+    def __init__(self, urls: list, index: int, timeout: float = SHARD_FORWARD_TIMEOUT):
+        if urls and not 0 <= index < len(urls):
+            raise ValueError(f"SHARD_INDEX {index} out of range for {len(urls)} SHARD_URLS")
+        self.urls = list(urls)
+        self.index = index
+        self.timeout = timeout
+        self._client: Optional[httpx.AsyncClient] = None
+        self.stats = {"local": 0, "forwarded": 0, "forward_errors": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return len(self.urls) > 1
+
+    def owner(self, update: Update) -> int:
+        key = update_shard_key(update)
+        if not self.enabled or key is None:
+            return self.index
+        return shard_for(key, len(self.urls))
+
+    async def forward(self, owner: int, body: bytes, headers: dict) -> int:
+        """POSTs the raw update to its owner; returns the HTTP status to answer Telegram with."""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(timeout=self.timeout)
+        try:
+            res = await self._client.post(
+                self.urls[owner],
+                content=body,
+                headers={**headers, "Content-Type": "application/json", FORWARDED_HEADER: str(self.index)},
+            )
+            self.stats["forwarded"] += 1
+            return res.status_code
+        except Exception as exc:
+            self.stats["forward_errors"] += 1
+            logging.error(f"Could not forward update to shard {owner} ({self.urls[owner]}): {exc!r}")
+            # 503 hace que Telegram reintente más tarde
+            return 503
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+def build_shard_router() -> ShardRouter:
+    return ShardRouter(SHARD_URLS, SHARD_INDEX)
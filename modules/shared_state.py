@@ -0,0 +1,213 @@
+import abc
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+# --- ESTADO COMPARTIDO ENTRE RÉPLICAS ---
+# Interfaz mínima clave/valor con TTL. "memory" es un fake en proceso (tests, una sola
+# réplica); "sqlite" comparte un archivo entre procesos del mismo host/volumen. Un store de
+# red (Redis, MySQL...) se conecta implementando StateBackend y registrándolo en STATE_BACKENDS.
+STATE_BACKEND = os.getenv("STATE_BACKEND", "memory").strip().lower()
+STATE_BACKEND_PATH = os.getenv("STATE_BACKEND_PATH", "storage/shared_state.sqlite3")
+STATE_MEMORY_MAXSIZE = int(os.getenv("STATE_MEMORY_MAXSIZE", "50000"))
+# Cada cuántos segundos se borran las claves vencidas (<= 0 lo desactiva)
+STATE_PURGE_INTERVAL = float(os.getenv("STATE_PURGE_INTERVAL", "600"))
+
+
+class StateBackend(abc.ABC):
+    """Key/value store with per-key TTL; values must be JSON-serializable. Blocking API."""
+
+    # Visible para otros procesos; los cachés de segundo nivel sólo se activan si lo es
+    shared = True
+
+    @abc.abstractmethod
+    def get(self, key: str):
+        ...
+
+    @abc.abstractmethod
+    def set(self, key: str, value, ttl: float = None):
+        ...
+
+    @abc.abstractmethod
+    def delete(self, key: str):
+        ...
+
+    def purge_expired(self) -> int:
+        """Deletes expired keys; returns how many. Backends that expire on their own keep the default."""
+        return 0
+
+    def close(self):
+        pass
+
+
+class MemoryStateBackend(StateBackend):
+    """In-process stand-in (bounded LRU); shares nothing between processes."""
+
+    shared = False
+
+    def __init__(self, maxsize: int = STATE_MEMORY_MAXSIZE):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[1] is not None and entry[1] <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return json.loads(entry[0])
+
+    def set(self, key: str, value, ttl: float = None):
+        expires_at = time.time() + ttl if ttl else None
+        with self._lock:
+            self._entries[key] = (json.dumps(value), expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def purge_expired(self) -> int:
+        now = time.time()
+        with self._lock:
+            expired = [key for key, (_, expires_at) in self._entries.items() if expires_at is not None and expires_at <= now]
+            for key in expired:
+                del self._entries[key]
+        return len(expired)
+
+
+class SQLiteStateBackend(StateBackend):
+    """Shared by every process that opens the same file (WAL mode)."""
+
+    def __init__(self, path: str = STATE_BACKEND_PATH):
+        self.path = path
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS shared_state (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL)"
+            )
+            self._conn = conn
+        return self._conn
+
+    def get(self, key: str):
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT value FROM shared_state WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)",
+                (key, time.time()),
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set(self, key: str, value, ttl: float = None):
+        expires_at = time.time() + ttl if ttl else None
+        with self._lock:
+            self._connection().execute(
+                "INSERT INTO shared_state (key, value, expires_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = excluded.value, expires_at = excluded.expires_at",
+                (key, json.dumps(value), expires_at),
+            )
+
+    def delete(self, key: str):
+        with self._lock:
+            self._connection().execute("DELETE FROM shared_state WHERE key = ?", (key,))
+
+    def purge_expired(self) -> int:
+        with self._lock:
+            cur = self._connection().execute("DELETE FROM shared_state WHERE expires_at <= ?", (time.time(),))
+            return cur.rowcount
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+STATE_BACKENDS = {
+    "memory": lambda: MemoryStateBackend(),
+    "sqlite": lambda: SQLiteStateBackend(STATE_BACKEND_PATH),
+}
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_state_backend() -> StateBackend:
+    """Process-wide backend selected by STATE_BACKEND (falls back to memory if unknown)."""
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            factory = STATE_BACKENDS.get(STATE_BACKEND)
+            if factory is None:
+                logging.error(f"Unknown STATE_BACKEND '{STATE_BACKEND}'; using the in-memory backend.")
+                factory = STATE_BACKENDS["memory"]
+            _backend = factory()
+    return _backend
+
+
+def shared_state_backend() -> Optional[StateBackend]:
+    """The configured backend if other processes see it, else None (memory would only copy a per-process cache)."""
+    backend = get_state_backend()
+    return backend if backend.shared else None
+
+
+def set_state_backend(backend: StateBackend):
+    """Replaces the process-wide backend (tests, benchmarks, custom network stores)."""
+    global _backend
+    with _backend_lock:
+        _backend = backend
+
+
+async def _purge_periodically(interval: float):
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            # Hilo propio: el DELETE no ocupa un worker del executor de DB
+            purged = await asyncio.to_thread(get_state_backend().purge_expired)
+        except Exception as exc:
+            logging.error(f"State backend purge error: {exc}")
+            continue
+        if purged:
+            logging.info(f"State backend purged {purged} expired keys.")
+
+
+_purge_task = None
+
+
+def start_state_purger(interval: float = None):
+    """Periodically deletes expired keys (called from Application post_init; interval <= 0 disables it)."""
+    global _purge_task
+    interval = STATE_PURGE_INTERVAL if interval is None else interval
+    if interval > 0 and _purge_task is None:
+        _purge_task = asyncio.create_task(_purge_periodically(interval), name="state-purger")
+
+
+async def stop_state_purger():
+    global _purge_task
+    if _purge_task is not None:
+        _purge_task.cancel()
+        try:
+            await _purge_task
+        except asyncio.CancelledError:
+            pass
+        _purge_task = None
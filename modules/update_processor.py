@@ -0,0 +1,96 @@
+import asyncio
+import os
+import time
+
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+from modules.metrics import Histogram
+
+# --- PROCESAMIENTO CONCURRENTE ORDENADO POR CHAT ---
+# Chats distintos se atienden en paralelo (hasta UPDATE_CONCURRENCY a la vez), pero los
+# updates de un mismo chat se procesan uno tras otro y en el orden en que llegaron: los
+# ConversationHandlers de onboarding, rh_requests y flow_builder ven la misma secuencia que
+# con procesamiento secuencial, y una usuaria esperando un webhook ya no frena a las demás.
+UPDATE_CONCURRENCY = int(os.getenv("UPDATE_CONCURRENCY", "32"))
+
+
+def _chat_key(update: object):
+    if isinstance(update, Update):
+        if update.effective_chat is not None:
+            return update.effective_chat.id
+        if update.effective_user is not None:
+            return update.effective_user.id
+    return None
+
+
+class _ChatQueue:
+    __slots__ = ("lock", "pending")
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self.pending = 0
+
+
+class ChatOrderedUpdateProcessor(BaseUpdateProcessor):
+    """Global concurrency limit plus strict FIFO order per chat.
+
+    Application creates one task per update in arrival order; each task takes its chat's
+    lock (asyncio.Lock is FIFO) *before* a global slot, so a chat with a backlog never
+    holds more than one of the `max_concurrent_updates` slots.
+    """
+
+    def __init__(self, max_concurrent_updates: int = UPDATE_CONCURRENCY):
+        super().__init__(max_concurrent_updates)
+        self._chats = {}
+        self.wait_histogram = Histogram()
+        self.stats = {"processed": 0, "max_chat_depth": 0}
+
+    async def process_update(self, update: object, coroutine) -> None:
+        key = _chat_key(update)
+        if key is None:
+            await super().process_update(update, coroutine)
+            self.stats["processed"] += 1
+            return
+
+        queue = self._chats.get(key)
+        if queue is None:
+            queue = self._chats[key] = _ChatQueue()
+        queue.pending += 1
+        if queue.pending > self.stats["max_chat_depth"]:
+            self.stats["max_chat_depth"] = queue.pending
+        enqueued = time.perf_counter()
+        try:
+            async with queue.lock:
+                async with self._semaphore:
+                    self.wait_histogram.observe(time.perf_counter() - enqueued)
+                    await self.do_process_update(update, coroutine)
+        finally:
+            queue.pending -= 1
+            if queue.pending == 0:
+                del self._chats[key]
+            self.stats["processed"] += 1
+
+    async def do_process_update(self, update: object, coroutine) -> None:
+        await coroutine
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
+
+    def queue_depths(self) -> dict:
+        """Updates waiting or running per chat (only chats with pending work)."""
+        return {chat_id: queue.pending for chat_id, queue in self._chats.items()}
+
+    def processor_stats(self) -> dict:
+        depths = self.queue_depths().values()
+        return {
+            **self.stats,
+            "max_concurrent": self.max_concurrent_updates,
+            "in_flight": self.current_concurrent_updates,
+            "active_chats": len(depths),
+            "queued": sum(depths),
+            "wait_latency": self.wait_histogram.snapshot(),
+        }
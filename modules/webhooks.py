@@ -0,0 +1,65 @@
+import logging
+import os
+import time
+from typing import NamedTuple, Optional
+
+import httpx
+
+from modules.instrumentation import record_webhook_post
+
+# Cliente HTTP compartido: httpx mantiene un pool keep-alive por host,
+# así cada webhook reutiliza la conexión TLS en lugar de abrir una nueva.
+WEBHOOK_MAX_CONNECTIONS = int(os.getenv("WEBHOOK_MAX_CONNECTIONS", "20"))
+WEBHOOK_KEEPALIVE = int(os.getenv("WEBHOOK_KEEPALIVE", "10"))
+WEBHOOK_TIMEOUT = float(os.getenv("WEBHOOK_TIMEOUT", "15"))
+
+DEFAULT_HEADERS = {"Content-Type": "application/json", "User-Agent": "Vanessa-Bot"}
+
+_client: Optional[httpx.AsyncClient] = None
+
+
+class WebhookResult(NamedTuple):
+    url: str
+    ok: bool
+    status: Optional[int]
+    error: Optional[str]
+    elapsed: float
+
+
+def _get_client() -> httpx.AsyncClient:
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            headers=DEFAULT_HEADERS,
+            limits=httpx.Limits(
+                max_connections=WEBHOOK_MAX_CONNECTIONS,
+                max_keepalive_connections=WEBHOOK_KEEPALIVE,
+            ),
+        )
+    return _client
+
+
+async def post_webhook(url: str, payload: dict, timeout: float = WEBHOOK_TIMEOUT, headers: Optional[dict] = None) -> WebhookResult:
+    """POSTs a JSON payload to one URL; never raises, the outcome is in the result."""
+    start = time.perf_counter()
+    try:
+        res = await _get_client().post(url, json=payload, headers=headers, timeout=timeout)
+        res.raise_for_status()
+        elapsed = time.perf_counter() - start
+        record_webhook_post(elapsed, True)
+        logging.info(f"Webhook sent successfully to: {url} ({elapsed:.2f}s)")
+        return WebhookResult(url, True, res.status_code, None, elapsed)
+    except Exception as exc:
+        elapsed = time.perf_counter() - start
+        status = exc.response.status_code if isinstance(exc, httpx.HTTPStatusError) else None
+        record_webhook_post(elapsed, False)
+        logging.error(f"Error sending webhook to {url}: {exc!r}")
+        return WebhookResult(url, False, status, repr(exc), elapsed)
+
+
+async def close_webhook_client():
+    """Closes pooled connections (called on application shutdown)."""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
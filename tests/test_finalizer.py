@@ -0,0 +1,54 @@
+import asyncio
+import builtins
+import os
+from types import SimpleNamespace
+
+from modules import finalizer
+from modules.flow_builder import FLOW_REGISTRY, reload_flows
+
+FLOW_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "conv-flows")
+
+
+class _Message:
+    def __init__(self, text):
+        self.text = text
+        self.replies = []
+
+    async def reply_text(self, text, **kwargs):
+        self.replies.append(text)
+
+
+def test_finalize_flow_opens_no_files(monkeypatch):
+    reload_flows(FLOW_DIR)
+    flow = FLOW_REGISTRY["horario"]
+    state = next(key for key, step in flow.steps.items() if step.variable == "SATURDAY_IN")
+
+    received = {}
+
+    async def fake_finalizer(telegram_id, data):
+        received.update(data, telegram_id=telegram_id)
+        return True
+
+    monkeypatch.setitem(finalizer.FINALIZATION_MAP, "horario", fake_finalizer)
+
+    opened = []
+
+    def _record(name):
+        def fail(*args, **kwargs):
+            opened.append((name, args[0] if args else None))
+            raise AssertionError(f"{name} called during finalize_flow: {args[:1]}")
+        return fail
+
+    update = SimpleNamespace(effective_user=SimpleNamespace(id=4242), message=_Message("10:00 AM"))
+    context = SimpleNamespace(user_data={"flow_name": "horario", "current_state": state})
+
+    # Con el flujo ya compilado, terminarlo no debe leer conv-flows/ (ni ningún otro archivo)
+    monkeypatch.setattr(builtins, "open", _record("open"))
+    monkeypatch.setattr(os, "open", _record("os.open"))
+    asyncio.run(finalizer.finalize_flow(update, context, flow=flow))
+    monkeypatch.undo()
+
+    assert opened == []
+    assert received["SATURDAY_IN"] == "10:00 AM"
+    assert received["telegram_id"] == 4242
+    assert update.message.replies == ["¡Horario guardado con éxito! 👍"]